@@ -1,14 +1,15 @@
 from django.contrib import admin
-from .models import UserProfile, Category, Product, Transaction
+from .models import UserProfile, Category, Product, Transaction, DailySales, InventorySnapshot, Job, Tombstone
 
 # admin.site.register(UserProfile)
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ('id', 'product_name', 'user', 'category', 'unit_price', 'quantity')
+    list_display = ('id', 'product_name', 'user', 'category', 'unit_price', 'quantity', 'reorder_level')
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name', 'slug')
+    list_display = ('id', 'name', 'slug', 'parent', 'path')
+    search_fields = ('name', 'path')
 
 @admin.register(UserProfile)
 class UserAdmin(admin.ModelAdmin):
@@ -16,4 +17,22 @@ class UserAdmin(admin.ModelAdmin):
 
 @admin.register(Transaction)
 class TransactionAdmin(admin.ModelAdmin):
-    list_display = ('id', 'user', 'customer', 'product', 'quantity', 'total_price', 'status', 'payment_method', 'transaction_date')
+    list_display = ('id', 'user', 'customer', 'product', 'quantity', 'total_price', 'status', 'payment_method', 'transaction_date', 'updated_at')
+
+@admin.register(DailySales)
+class DailySalesAdmin(admin.ModelAdmin):
+    list_display = ('day', 'user', 'product', 'status', 'payment_method', 'transactions', 'units', 'revenue')
+
+@admin.register(InventorySnapshot)
+class InventorySnapshotAdmin(admin.ModelAdmin):
+    list_display = ('day', 'user', 'product', 'quantity')
+
+@admin.register(Tombstone)
+class TombstoneAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'kind', 'object_id', 'deleted_at')
+    list_filter = ('kind',)
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'max_attempts', 'run_at', 'created_at')
+    list_filter = ('status', 'name')
@@ -0,0 +1,242 @@
+"""
+ASGI-native counterparts of the views in views.py, used instead of them when
+settings.ASYNC_VIEWS is on. They are plain Django async views returning the
+same JSON, since DRF's APIView can only run synchronously.
+"""
+import json
+import math
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.http import HttpResponseNotModified, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import AuthenticationFailed, NotFound, Throttled, ValidationError
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .authentication import token_user
+from .cache import etag_matches, product_list_key
+from .idempotency import HEADER as IDEMPOTENCY_HEADER, KEY_REUSED_ERROR, KeyReused, fingerprint, key_error, run_once
+from .login import acheck_password, aget_login_user, login_result
+from .renderers import FastJsonResponse as JsonResponse
+from .routers import aread_alias, ause_read_alias, reads_from
+from .serializers import ProductSerializer
+from .throttling import aconsume, client_ip
+from .views import ApiProductView, ApiTransactionView, product_page
+
+_jwt = JWTAuthentication()
+
+
+def parse_request_data(request):
+    """Return the JSON or form body as a mapping, or None when the JSON is malformed."""
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    return request.POST
+
+
+def parse_error():
+    return JsonResponse({'detail': 'JSON parse error'}, status=400)
+
+
+async def aauthenticate(request):
+    """Async equivalent of JWTAuthentication: the token's active user, or None."""
+    header = _jwt.get_header(request)
+    try:
+        raw_token = _jwt.get_raw_token(header) if header else None
+        if raw_token is None:
+            return None
+        token = _jwt.get_validated_token(raw_token)
+        if settings.JWT_STATELESS and jwt_settings.USER_ID_FIELD == User._meta.pk.attname:
+            return token_user(token)
+        user = await User.objects.aget(**{jwt_settings.USER_ID_FIELD: token[jwt_settings.USER_ID_CLAIM]})
+    except (AuthenticationFailed, InvalidToken, KeyError, User.DoesNotExist):
+        return None
+    return user if user.is_active else None
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncAPIView(View):
+    """
+    Base class for authenticated async views (JWT auth + IsAuthenticated).
+    ``replica_reads`` lets GETs read from a replica, like ReplicaReadsMixin.
+    """
+    replica_reads = False
+
+    async def dispatch(self, request, *args, **kwargs):
+        request.user = await aauthenticate(request)
+        if request.user is None:
+            return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+        alias = None
+        if self.replica_reads and request.method in SAFE_METHODS:
+            alias = await aread_alias(request.user.id)
+        with reads_from(alias):
+            return await super().dispatch(request, *args, **kwargs)
+
+
+async def idempotent_response(request, data, create):
+    """
+    Run the sync ``create() -> (status, payload)`` on a worker thread,
+    honouring the Idempotency-Key header like the @idempotent DRF views.
+    """
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if key is None:
+        status, payload = await sync_to_async(create)()
+        return JsonResponse(payload, status=status)
+    error = key_error(key)
+    if error:
+        return JsonResponse({'error': error}, status=400)
+
+    try:
+        status, payload, replayed = await sync_to_async(run_once)(
+            request.user.id, key, fingerprint(request.method, request.path, data), create)
+    except KeyReused:
+        return JsonResponse({'error': KEY_REUSED_ERROR}, status=422)
+    response = JsonResponse(payload, status=status)
+    if replayed:
+        response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def etag_response(request, etag, payload):
+    """304 when the client has ``etag``, else ``payload`` (or ``payload()``) as JSON."""
+    if etag_matches(request, etag):
+        response = HttpResponseNotModified()
+    else:
+        response = JsonResponse(payload() if callable(payload) else payload)
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+# -----------------------------
+# Login View
+# -----------------------------
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncLoginView(View):
+    http_method_names = ['post']
+
+    async def post(self, request, *args, **kwargs):
+        data = parse_request_data(request)
+        if data is None:
+            return parse_error()
+
+        # Same limits as LoginView's throttles, checked before any lookup or hashing
+        email = data.get('email') if isinstance(data.get('email'), str) else None
+        wait = max(await aconsume('login_ip', client_ip(request)), await aconsume('login_account', email))
+        if wait:
+            response = JsonResponse({'detail': str(Throttled(wait).detail)}, status=429)
+            response['Retry-After'] = str(math.ceil(wait))
+            return response
+
+        user = await aget_login_user(data.get('email'))
+        # PBKDF2 runs on the hashing pool, the event loop keeps serving other requests
+        status, payload = login_result(user, user is not None and await acheck_password(user, data.get('password')))
+        return JsonResponse(payload, status=status)
+
+
+# -----------------------------
+# Product API View
+# -----------------------------
+class AsyncProductView(AsyncAPIView):
+    replica_reads = True
+
+    async def get(self, request, product_id=None, *args, **kwargs):
+        try:
+            fields = ProductSerializer.requested_fields(request.GET)
+        except ValidationError as exc:
+            return JsonResponse(exc.detail, status=400)
+        products = ApiProductView.get_queryset(request, fields)
+        if product_id is not None:
+            return await self.get_detail(request, products.filter(id=product_id), fields)
+
+        # Same per-seller page cache and ETag as ApiProductView.get; the page is built on a worker thread
+        cache_key = await sync_to_async(product_list_key)(request.user.id, request.build_absolute_uri())
+        cached = await cache.aget(cache_key)
+        if cached is None:
+            try:
+                cached = await sync_to_async(product_page)(Request(request), products, fields, cache_key)
+            except NotFound as exc:
+                return JsonResponse({'detail': str(exc.detail)}, status=404)
+            await cache.aset(cache_key, cached, settings.PRODUCT_LIST_CACHE_TIMEOUT)
+        return etag_response(request, *cached)
+
+    @staticmethod
+    async def get_detail(request, products, fields):
+        product = await products.afirst()
+        if product is None:
+            return JsonResponse({'error': 'Product not found.'}, status=404)
+        return etag_response(request, ApiProductView.detail_etag(request, product),
+                             lambda: ProductSerializer(product, fields=fields).data)
+
+    async def post(self, request, *args, **kwargs):
+        data = parse_request_data(request)
+        if data is None:
+            return parse_error()
+        # Validation runs uniqueness/foreign key queries, which are sync-only
+        return await idempotent_response(request, data, lambda: ApiProductView.create(request.user, data))
+
+    async def put(self, request, *args, **kwargs):
+        return await sync_to_async(self.change)(request, 'edit', ApiProductView.update)
+
+    async def delete(self, request, *args, **kwargs):
+        return await sync_to_async(self.change)(request, 'delete', lambda product, data: ApiProductView.remove(product))
+
+    @staticmethod
+    def change(request, action, apply):
+        product, error = ApiProductView.get_own_product(request.user, request.GET.get('id'), action)
+        if error is None:
+            data = parse_request_data(request)
+            if data is None:
+                return parse_error()
+            error = apply(product, data)
+        status, payload = error
+        return JsonResponse(payload, status=status)
+
+
+# -----------------------------
+# transaction views
+# -----------------------------
+class AsyncTransactionView(AsyncAPIView):
+    replica_reads = True
+
+    async def get(self, request, *args, **kwargs):
+        view = ApiTransactionView(request=request)
+        try:
+            rows, transactions = view.list_rows(request.GET)
+        except ValidationError as exc:
+            return JsonResponse(exc.detail, status=400)
+
+        if request.GET.get('stream') == 'ndjson':
+            values = view.stream_rows(rows, transactions).aiterator(chunk_size=view.STREAM_CHUNK_SIZE)
+            return StreamingHttpResponse(ause_read_alias(self.ndjson(values, rows)),
+                                         content_type='application/x-ndjson')
+
+        if request.GET.get('pagination') == 'cursor':
+            return JsonResponse(await sync_to_async(view.cursor_page)(Request(request), rows, transactions))
+
+        data = rows.many([row async for row in rows.values(transactions)])
+        return JsonResponse(view.list_payload(data), status=200, safe=False)
+
+    @staticmethod
+    async def ndjson(values, rows):
+        async for row in values:
+            yield ApiTransactionView.ndjson_line(rows, row)
+
+    async def post(self, request, *args, **kwargs):
+        data = parse_request_data(request)
+        if data is None:
+            return parse_error()
+
+        # The stock reservation needs a DB transaction, which the async ORM doesn't offer
+        return await idempotent_response(request, data, lambda: ApiTransactionView.create(request, data))
@@ -0,0 +1,692 @@
+"""
+Benchmark scenarios run by ``manage.py benchmark``.
+
+Each scenario seeds its own data inside a transaction that is rolled back
+afterwards, so it can be pointed at any database without leaving rows behind.
+A scenario returns a list of result rows (plain dicts) that the command prints.
+"""
+import base64
+import http.client
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from decimal import Decimal
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, connections, transaction
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import Category, Product, Transaction
+from .seed import SEED_PASSWORD, seed
+
+SCENARIOS = {}
+
+
+def scenario(name):
+    """Register a benchmark function under ``name``."""
+    def register(func):
+        SCENARIOS[name] = func
+        return func
+    return register
+
+
+class _Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rolled_back():
+    """Run the block in a transaction that is always rolled back."""
+    try:
+        with transaction.atomic():
+            yield
+            raise _Rollback
+    except _Rollback:
+        pass
+
+
+# Result fields compared by ``benchmark --compare``. Higher is worse unless listed in HIGHER_IS_BETTER;
+# query counts are exact, so any increase counts as a regression.
+COMPARED_FIELDS = ('p50_ms', 'p95_ms', 'queries', 'peak_alloc_kb', 'server_peak_rss_kb', 'rows_per_sec',
+                   'checkouts_per_sec', 'logins_per_sec')
+HIGHER_IS_BETTER = ('rows_per_sec', 'checkouts_per_sec', 'logins_per_sec')
+
+
+def _row_key(row):
+    return tuple((key, value) for key, value in row.items() if key not in COMPARED_FIELDS and
+                 not key.endswith(('_ms', '_kb', '_per_sec')))
+
+
+def compare(baseline, current, tolerance):
+    """
+    Compare two ``benchmark --json`` reports and return one message per
+    regression: a field more than ``tolerance`` (a fraction) worse than the
+    baseline, or any increase in queries per request.
+    """
+    regressions = []
+    for name, rows in current['results'].items():
+        old_rows = {_row_key(row): row for row in baseline['results'].get(name, [])}
+        for row in rows:
+            old = old_rows.get(_row_key(row))
+            if old is None:
+                continue
+            label = ' '.join(str(value) for _, value in _row_key(row))
+            for field in COMPARED_FIELDS:
+                before, after = old.get(field), row.get(field)
+                if before is None or after is None:
+                    continue
+                if field == 'queries':
+                    worse = after > before
+                elif field in HIGHER_IS_BETTER:
+                    worse = after < before * (1 - tolerance)
+                else:
+                    worse = after > before * (1 + tolerance)
+                if worse:
+                    regressions.append(f'{name} [{label}] {field}: {before} -> {after}')
+    return regressions
+
+
+def count_queries(func):
+    """Call ``func`` once and return the number of queries it ran."""
+    count = 0
+
+    def counter(execute, sql, params, many, context):
+        nonlocal count
+        count += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(counter):
+        func()
+    return count
+
+
+def measure(func, repeat):
+    """Call ``func`` ``repeat`` times and return the wall time of each call in ms."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        'p50_ms': round(statistics.median(ordered), 3),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        'p99_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))], 3),
+        'mean_ms': round(statistics.fmean(ordered), 3),
+    }
+
+
+def _require_shared_database():
+    if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+        raise RuntimeError('Multi-threaded scenarios need a file-based SQLite or a PostgreSQL database.')
+
+
+@contextmanager
+def committed_user(username):
+    """
+    Yield a committed user for scenarios that spread work over several
+    threads (and therefore connections); its data is deleted afterwards.
+    """
+    _require_shared_database()
+    user = make_user(username)
+    try:
+        yield user
+    finally:
+        user.delete()
+
+
+@contextmanager
+def committed_seed(prefix, products, transactions):
+    """Like committed_user, for a seeded seller that other processes can see too."""
+    _require_shared_database()
+    User.objects.filter(username__startswith=f'{prefix}-').delete()  # left over from an interrupted run
+    user = seed(users=1, products=products, transactions=transactions, prefix=prefix)[0]
+    try:
+        yield user
+    finally:
+        User.objects.filter(username__startswith=f'{prefix}-').delete()
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(('127.0.0.1', port)) == 0:
+                return
+        time.sleep(0.2)
+    raise TimeoutError(f'Server did not start listening on port {port}')
+
+
+def peak_rss_kb(pid):
+    """High-water mark of a process's resident memory, from /proc (Linux only)."""
+    try:
+        with open(f'/proc/{pid}/status') as status:
+            return next(int(line.split()[1]) for line in status if line.startswith('VmHWM:'))
+    except (OSError, StopIteration):
+        return None
+
+
+def make_user(username):
+    return User.objects.create_user(username=username, email=f'{username}@bench.local', password='bench-pass')
+
+
+def make_products(user, count, category=None, batch_size=1000):
+    category = category or Category.objects.get_or_create(name='bench')[0]
+    Product.objects.bulk_create(
+        (Product(user=user, category=category, product_name=f'{user.username} product {i}',
+                 sku=f'{user.username}-{i}', unit_price=Decimal('9.99'), quantity=100)
+         for i in range(count)),
+        batch_size=batch_size,
+    )
+    return category
+
+
+def authenticated_client(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+def cursor_token(position):
+    """Build a DRF cursor token pointing just after ``position``."""
+    return base64.b64encode(urlencode({'p': position}).encode('ascii')).decode('ascii')
+
+
+@scenario('product-pages')
+def product_pages(repeat=20, sizes=(1000, 10000, 50000), page_size=10):
+    """Latency of the first and the last product page, offset vs cursor pagination."""
+    rows = []
+    for size in sizes:
+        with rolled_back():
+            user = make_user(f'bench-pages-{size}')
+            make_products(user, size)
+            client = authenticated_client(user)
+            last_page = size // page_size
+            deep_id = Product.objects.filter(user=user).order_by('id').values_list('id', flat=True)[
+                (last_page - 1) * page_size - 1]
+
+            urls = {
+                'offset first': f'/api/products/?page_size={page_size}',
+                'offset last': f'/api/products/?page_size={page_size}&page={last_page}',
+                'cursor first': f'/api/products/?pagination=cursor&page_size={page_size}',
+                'cursor last': f'/api/products/?pagination=cursor&page_size={page_size}'
+                               f'&cursor={cursor_token(deep_id)}',
+            }
+
+            def uncached_get(url):
+                cache.clear()  # measure the query path, not the listing cache
+                return client.get(url)
+
+            for label, url in urls.items():
+                assert client.get(url).status_code == 200, url
+                rows.append({'catalog': size, 'request': label,
+                             **summarize(measure(lambda: uncached_get(url), repeat))})
+    return rows
+
+
+@scenario('product-bulk')
+def product_bulk(repeat=20, rows=1000):
+    """Rows/sec for inserting a catalog through POST /products/ one by one vs POST /products/bulk/."""
+    results = []
+    with rolled_back():
+        user = make_user('bench-bulk')
+        client = authenticated_client(user)
+        category = Category.objects.get_or_create(name='bench')[0]
+
+        def payload(prefix):
+            return [{'product_name': f'{prefix} {i}', 'category': category.id, 'sku': f'{prefix}-{i}',
+                     'unit_price': '9.99', 'quantity': 10} for i in range(rows)]
+
+        start = time.perf_counter()
+        for row in payload('single'):
+            assert client.post('/api/products/', row, format='json').status_code == 201
+        elapsed = time.perf_counter() - start
+        results.append({'endpoint': 'per-item', 'rows': rows, 'rows_per_sec': round(rows / elapsed)})
+
+        # The second pass hits existing SKUs and exercises the update path
+        for label in ('bulk insert', 'bulk upsert'):
+            start = time.perf_counter()
+            assert client.post('/api/products/bulk/', payload('bulk'), format='json').status_code == 200
+            elapsed = time.perf_counter() - start
+            results.append({'endpoint': label, 'rows': rows, 'rows_per_sec': round(rows / elapsed)})
+    return results
+
+
+@scenario('checkout-race')
+def checkout_race(repeat=20, threads=8, stock=200, buyers_per_thread=50):
+    """Parallel buyers of one hot product: no overselling, and checkouts/sec."""
+    with committed_user('bench-checkout') as user:
+        make_products(user, 1)
+        product = Product.objects.get(user=user)
+        Product.objects.filter(id=product.id).update(quantity=stock)
+        order = {'customer': 'Buyer', 'email': 'buyer@bench.local', 'product': product.id, 'quantity': 1,
+                 'status': 'completed'}
+        codes = []
+
+        def buy():
+            client = authenticated_client(user)
+            try:
+                for _ in range(buyers_per_thread):
+                    codes.append(client.post('/api/transactions/', order, format='json').status_code)
+            finally:
+                connection.close()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            for future in [pool.submit(buy) for _ in range(threads)]:
+                future.result()
+        elapsed = time.perf_counter() - start
+
+        product.refresh_from_db()
+        sold = Transaction.objects.filter(product=product).count()
+        return [{
+            'threads': threads,
+            'attempts': len(codes),
+            'created': codes.count(201),
+            'rejected': codes.count(409),
+            'errors': len(codes) - codes.count(201) - codes.count(409),
+            'stock_left': product.quantity,
+            'oversold': sold > stock,
+            'checkouts_per_sec': round(len(codes) / elapsed),
+        }]
+
+
+@scenario('login')
+def login(repeat=20):
+    """Login latency against the cost of a single password hash verification."""
+    # Repeated logins to one account would otherwise be throttled after the first few
+    with rolled_back(), override_settings(THROTTLE_ENABLED=False):
+        user = make_user('bench-login')
+        client = APIClient()
+        credentials = {'email': user.email, 'password': 'bench-pass'}
+        assert client.post('/api/login/', credentials, format='json').status_code == 200
+        hash_samples = measure(lambda: user.check_password('bench-pass'), repeat)
+        login_samples = measure(lambda: client.post('/api/login/', credentials, format='json'), repeat)
+    login_summary = summarize(login_samples)
+    return [
+        {'step': 'check_password', **summarize(hash_samples)},
+        {'step': 'POST /api/login/', **login_summary,
+         'logins_per_sec': round(1000 / login_summary['mean_ms'])},
+    ]
+
+
+@scenario('db-connect')
+def db_connect(repeat=20):
+    """Cost of a cheap query on a new connection vs a reused (persistent or pooled) one."""
+    def query():
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+
+    def reconnect_and_query():
+        connection.close()
+        query()
+
+    config = connection.settings_dict
+    mode = ('pool' if config['OPTIONS'].get('pool') else
+            f'CONN_MAX_AGE={config["CONN_MAX_AGE"]} CONN_HEALTH_CHECKS={config["CONN_HEALTH_CHECKS"]}')
+    query()
+    rows = [
+        {'connection': 'new per request', **summarize(measure(reconnect_and_query, repeat))},
+        {'connection': 'reused', **summarize(measure(query, repeat))},
+    ]
+    for row in rows:
+        row['settings'] = mode
+    return rows
+
+
+SEARCH_WORDS = ('silk', 'hair', 'serum', 'argan', 'keratin', 'shampoo', 'conditioner', 'mask', 'oil', 'spray',
+                'curl', 'cream', 'gloss', 'repair', 'volume', 'smooth', 'shine', 'color', 'protect', 'scalp',
+                'brush', 'comb', 'clip', 'wig', 'extension', 'braid', 'wave', 'tonic', 'balm', 'mousse')
+
+
+@scenario('product-search')
+def product_search(repeat=20, catalog=100000):
+    """Typeahead and full-text search latency on a large seller catalog."""
+    import random
+    rng = random.Random(42)
+    rows = []
+    with rolled_back():
+        user = make_user('bench-search')
+        category = Category.objects.get_or_create(name='bench')[0]
+        Product.objects.bulk_create(
+            (Product(user=user, category=category, sku=f'SH-{i:06d}', unit_price=Decimal('9.99'), quantity=10,
+                     product_name=' '.join(rng.sample(SEARCH_WORDS, 3)).title(),
+                     description=' '.join(rng.sample(SEARCH_WORDS, 8)))
+             for i in range(catalog)),
+            batch_size=2000,
+        )
+        client = authenticated_client(user)
+        requests = {
+            'typeahead name': lambda: f'/api/products/typeahead/?q={rng.choice(SEARCH_WORDS)[:rng.randint(2, 4)]}',
+            'typeahead sku': lambda: f'/api/products/typeahead/?q=SH-{rng.randint(0, 999):03d}',
+            'search 1 word': lambda: f'/api/products/search/?q={rng.choice(SEARCH_WORDS)}',
+            'search 2 words': lambda: f'/api/products/search/?q={"+".join(rng.sample(SEARCH_WORDS, 2))}',
+        }
+        for label, make_url in requests.items():
+            assert client.get(make_url()).status_code == 200
+            rows.append({'catalog': catalog, 'request': label,
+                         **summarize(measure(lambda: client.get(make_url()), repeat))})
+    return rows
+
+
+def endpoint_calls(user, product_ids, repeat):
+    """
+    The requests benchmarked by the endpoint scenarios, as
+    ``(label, needs_auth, make_request)``; ``make_request(n)`` returns
+    ``(method, path, body)`` for the n-th call, so writes never collide.
+    """
+    refresh = str(RefreshToken.for_user(user))
+    hot = product_ids[0]
+    # Enough products to delete one per call (warm-up, query count and memory runs included)
+    deletable = product_ids[-(repeat + 3):]
+    Product.objects.filter(id=hot).update(quantity=10 ** 9)
+    category = Category.objects.values_list('id', flat=True).first()
+
+    return [
+        ('POST /api/signup/', False, lambda n: ('POST', '/api/signup/', {
+            # Named after the seeded seller so committed_seed() cleans them up too
+            'username': f'{user.username}-signup-{n}', 'email': f'{user.username}-signup-{n}@bench.local',
+            'password': 'bench-pass'})),
+        ('POST /api/login/', False, lambda n: ('POST', '/api/login/', {
+            'email': user.email, 'password': SEED_PASSWORD})),
+        ('POST /api/token/refresh/', False, lambda n: ('POST', '/api/token/refresh/', {'refresh': refresh})),
+        ('GET /api/products/', True, lambda n: ('GET', f'/api/products/?page={n % 50 + 1}', None)),
+        ('GET /api/products/ cursor', True, lambda n: ('GET', '/api/products/?pagination=cursor', None)),
+        ('POST /api/products/', True, lambda n: ('POST', '/api/products/', {
+            'product_name': f'Bench product {n}', 'category': category, 'sku': f'{user.username}-new-{n}',
+            'unit_price': '9.99', 'quantity': 10})),
+        ('PUT /api/products/', True, lambda n: ('PUT', f'/api/products/?id={hot}', {'unit_price': f'{n % 90 + 10}.00'})),
+        ('DELETE /api/products/', True, lambda n: ('DELETE', f'/api/products/?id={deletable[n]}', None)),
+        ('GET /api/transactions/ cursor', True, lambda n: ('GET', '/api/transactions/?pagination=cursor', None)),
+        ('GET /api/transactions/ filtered', True, lambda n: ('GET', f'/api/transactions/?product={hot}', None)),
+        ('POST /api/transactions/', True, lambda n: ('POST', '/api/transactions/', {
+            'customer': 'Bench', 'email': 'buyer@bench.local', 'product': hot, 'quantity': 1,
+            'status': 'completed'})),
+    ]
+
+
+def _check(status_code, label):
+    assert 200 <= status_code < 300, f'{label} returned {status_code}'
+
+
+@scenario('endpoints')
+def endpoints(repeat=20, products=2000, transactions=20000):
+    """Every main endpoint through the test client: latency, queries per request and peak Python allocations."""
+    rows = []
+    # Repeated signups and logins from one client would otherwise be throttled
+    with rolled_back(), override_settings(THROTTLE_ENABLED=False):
+        user = seed(users=1, products=products, transactions=transactions, prefix='bench-endpoints')[0]
+        product_ids = list(Product.objects.filter(user=user).order_by('id').values_list('id', flat=True))
+        anonymous, authenticated = APIClient(), APIClient()
+        authenticated.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+
+        for label, needs_auth, make_request in endpoint_calls(user, product_ids, repeat):
+            client = authenticated if needs_auth else anonymous
+            calls = iter(range(repeat + 3))
+
+            def call():
+                method, path, body = make_request(next(calls))
+                _check(getattr(client, method.lower())(path, body, format='json').status_code, label)
+
+            call()  # warm-up
+            queries = count_queries(call)
+            tracemalloc.start()
+            call()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            rows.append({'endpoint': label, **summarize(measure(call, repeat)), 'queries': queries,
+                         'peak_alloc_kb': peak // 1024})
+    return rows
+
+
+def _route_queries(metrics_text):
+    """(sum, count) of silkhair_db_queries per (method, route) from a /metrics scrape."""
+    found = {}
+    for kind, method, route, value in re.findall(
+            r'^silkhair_db_queries_(sum|count)\{method="(\w+)",route="([^"]*)"\} (\S+)$', metrics_text, re.M):
+        found.setdefault((method, route), [0.0, 0.0])[kind == 'count'] = float(value)
+    return found
+
+
+@scenario('endpoints-server')
+def endpoints_server(repeat=20, products=2000, transactions=20000, port=8766):
+    """
+    The same requests against a real waitress server in a subprocess:
+    latency over a keep-alive connection, queries per request from its
+    /metrics endpoint and the server's resident memory high-water mark.
+    """
+    rows = []
+    with committed_seed('bench-server', products, transactions) as user:
+        product_ids = list(Product.objects.filter(user=user).order_by('id').values_list('id', flat=True))
+        calls = endpoint_calls(user, product_ids, repeat)
+        access = str(RefreshToken.for_user(user).access_token)
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'waitress', f'--port={port}', '--threads=4', 'backend.wsgi:application'],
+            cwd=settings.BASE_DIR, env={**os.environ, 'ASYNC_VIEWS': 'false', 'THROTTLE_ENABLED': 'false'},
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_for_port(port)
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+
+            def request(method, path, body=None, headers=()):
+                headers = {'Content-Type': 'application/json', **dict(headers)}
+                conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                return response.status
+
+            def scrape():
+                token = {'Authorization': f'Bearer {settings.METRICS_TOKEN}'} if settings.METRICS_TOKEN else {}
+                conn.request('GET', '/metrics', headers=token)
+                return _route_queries(conn.getresponse().read().decode())
+
+            for label, needs_auth, make_request in calls:
+                headers = {'Authorization': f'Bearer {access}'} if needs_auth else {}
+                counter = iter(range(repeat + 1))
+
+                def call():
+                    method, path, body = make_request(next(counter))
+                    _check(request(method, path, body, headers), label)
+
+                call()  # warm-up
+                before = scrape()
+                samples = measure(call, repeat)
+                after = scrape()
+                method = make_request(0)[0]
+                route = next((key for key in after if key[0] == method and key[1] != 'metrics' and
+                              after[key][1] - before.get(key, (0, 0))[1] == repeat), None)
+                queries = (round((after[route][0] - before.get(route, (0, 0))[0]) / repeat, 1)
+                           if route else None)
+                rows.append({'endpoint': label, **summarize(samples), 'queries': queries,
+                             'server_peak_rss_kb': peak_rss_kb(server.pid)})
+            conn.close()
+        finally:
+            server.terminate()
+            server.wait()
+    return rows
+
+
+@scenario('login-attack')
+def login_attack(repeat=20, attackers=8, port=8767):
+    """
+    GET /api/products/ latency on a waitress server, idle and while
+    ``attackers`` threads brute-force one account's password through
+    /api/login/, with and without login throttling.
+    """
+    rows = []
+    with committed_seed('bench-attack', 200, 0) as user:
+        access = str(RefreshToken.for_user(user).access_token)
+        attempt = json.dumps({'email': user.email, 'password': 'wrong-password'})
+        for throttled in (False, True):
+            server = subprocess.Popen(
+                [sys.executable, '-m', 'waitress', f'--port={port}', '--threads=4', 'backend.wsgi:application'],
+                cwd=settings.BASE_DIR,
+                env={**os.environ, 'ASYNC_VIEWS': 'false', 'THROTTLE_ENABLED': str(throttled).lower()},
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                wait_for_port(port)
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+
+                def get_products():
+                    conn.request('GET', '/api/products/', headers={'Authorization': f'Bearer {access}'})
+                    response = conn.getresponse()
+                    response.read()
+                    _check(response.status, 'GET /api/products/')
+
+                def attack():
+                    attacker = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+                    codes = []
+                    while not stop:
+                        attacker.request('POST', '/api/login/', attempt, {'Content-Type': 'application/json'})
+                        response = attacker.getresponse()
+                        response.read()
+                        codes.append(response.status)
+                    attacker.close()
+                    return codes
+
+                get_products()  # warm-up
+                rows.append({'throttled': throttled, 'phase': 'idle', **summarize(measure(get_products, repeat))})
+
+                stop = False
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=attackers) as pool:
+                    futures = [pool.submit(attack) for _ in range(attackers)]
+                    time.sleep(0.5)  # let the attack saturate the server first
+                    samples = measure(get_products, repeat)
+                    stop = True
+                elapsed = time.perf_counter() - start
+                codes = [code for future in futures for code in future.result()]
+                rows.append({'throttled': throttled, 'phase': 'attack', **summarize(samples),
+                             'login_attempts_per_sec': round(len(codes) / elapsed),
+                             'login_rejected_per_sec': round(codes.count(429) / elapsed)})
+                conn.close()
+            finally:
+                server.terminate()
+                server.wait()
+    return rows
+
+
+def copy_to_replicas():
+    """Refresh SQLite replicas from the primary; real replicas are kept up to date by replication."""
+    if connection.vendor != 'sqlite':
+        return
+    connection.ensure_connection()
+    for alias in settings.DATABASE_REPLICAS:
+        connections[alias].ensure_connection()
+        connection.connection.backup(connections[alias].connection)
+
+
+@scenario('replica-isolation')
+def replica_isolation(repeat=20, readers=4, products=2000, transactions=20000, port=8768):
+    """
+    POST /api/transactions/ latency for one seller, idle and while
+    ``readers`` clients of a waitress server run report-style listings of
+    another seller's transactions, with those reads on the primary and then
+    on the replica (DATABASE_REPLICAS).
+    """
+    if not settings.DATABASE_REPLICAS:
+        return [{'skipped': 'no replica: set DB_REPLICA_NAME (e.g. a second SQLite file) or DB_REPLICA_HOST'}]
+    rows = []
+    with committed_seed('bench-replica', products, transactions) as reader, \
+            committed_user('bench-replica-writer') as writer:
+        make_products(writer, 1)
+        product = Product.objects.get(user=writer)
+        Product.objects.filter(id=product.id).update(quantity=10 ** 6)
+        copy_to_replicas()
+        access = str(RefreshToken.for_user(reader).access_token)
+        order = {'customer': 'Buyer', 'email': 'buyer@bench.local', 'product': product.id, 'quantity': 1,
+                 'status': 'completed'}
+        client = authenticated_client(writer)
+
+        def buy():
+            _check(client.post('/api/transactions/', order, format='json').status_code, 'POST /api/transactions/')
+
+        buy()  # warm-up
+        rows.append({'reads_on': None, **summarize(measure(buy, repeat))})
+        for reads_on in ('primary', 'replica'):
+            server = subprocess.Popen(
+                [sys.executable, '-m', 'waitress', f'--port={port}', f'--threads={readers}', 'backend.wsgi:application'],
+                cwd=settings.BASE_DIR,
+                env={**os.environ, 'ASYNC_VIEWS': 'false', 'REPLICA_READS': str(reads_on == 'replica').lower()},
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                wait_for_port(port)
+
+                def read():
+                    # Counting a filter the indexes don't cover scans the seller's rows
+                    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+                    reads = 0
+                    while not stop:
+                        conn.request('GET', '/api/transactions/?payment_method=cash&status=failed',
+                                     headers={'Authorization': f'Bearer {access}'})
+                        response = conn.getresponse()
+                        response.read()
+                        _check(response.status, 'GET /api/transactions/')
+                        reads += 1
+                    conn.close()
+                    return reads
+
+                stop = False
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=readers) as pool:
+                    futures = [pool.submit(read) for _ in range(readers)]
+                    time.sleep(0.5)  # let the readers load the database first
+                    samples = measure(buy, repeat)
+                    stop = True
+                elapsed = time.perf_counter() - start
+                reads = sum(future.result() for future in futures)
+                rows.append({'reads_on': reads_on, **summarize(samples), 'reads_per_sec': round(reads / elapsed)})
+            finally:
+                server.terminate()
+                server.wait()
+    return rows
+
+
+@scenario('serialize-10k')
+def serialize_10k(repeat=20, rows=10000):
+    """Rows/sec rendering 10k-row product and transaction lists: DRF serializers vs the values() fast path."""
+    from rest_framework.renderers import JSONRenderer
+
+    from .renderers import FastJSONRenderer
+    from .serializers import ProductSerializer, RowSerializer, TransactionSerializer
+
+    results = []
+    with rolled_back():
+        user = seed(users=1, products=rows, transactions=rows, prefix='bench-serialize')[0]
+        querysets = {
+            'products': (ProductSerializer, Product.objects.filter(user=user).order_by('id')),
+            'transactions': (TransactionSerializer, Transaction.objects.filter(user=user).select_related('product')
+                             .only(*TransactionSerializer.only_fields(), 'transaction_date')),
+        }
+        for name, (serializer_class, queryset) in querysets.items():
+            def drf():
+                return JSONRenderer().render(serializer_class(queryset.all(), many=True).data)
+
+            def fast():
+                serializer = RowSerializer(serializer_class)
+                return FastJSONRenderer().render(serializer.many(serializer.values(queryset.all())))
+
+            assert drf() == fast(), f'{name}: fast path output differs'
+            for path, func in (('drf serializer + JSONRenderer', drf), ('values() rows + orjson', fast)):
+                summary = summarize(measure(func, min(repeat, 5)))
+                results.append({'list': name, 'path': path, 'rows': rows, **summary,
+                                'rows_per_sec': round(rows / summary['p50_ms'] * 1000)})
+    return results
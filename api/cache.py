@@ -0,0 +1,75 @@
+"""
+Per-seller cache for product and category listings.
+
+Every seller has a version number that is part of their cache keys. Writes
+bump it (after commit), which orphans all of the seller's cached pages at once
+without scanning keys; orphans simply age out of the cache backend. Categories
+are shared by all sellers, so category writes bump a single global version
+that category listings also include.
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import parse_etags
+
+
+CATEGORY_VERSION_KEY = 'categories:version'
+
+
+def _version_key(user_id):
+    return f'products:version:{user_id}'
+
+
+def _version(key):
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock so an evicted counter never reuses an old version
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key, 0)
+    return version
+
+
+def _bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:  # Counter evicted: nothing cached under it can be reached anyway
+        pass
+
+
+def product_list_version(user_id):
+    return _version(_version_key(user_id))
+
+
+def invalidate_product_list(user_id):
+    """Drop the seller's cached product pages once the current transaction commits."""
+    key = _version_key(user_id)
+    transaction.on_commit(lambda: _bump_version(key))
+
+
+def invalidate_categories():
+    """Drop every seller's cached category listings once the current transaction commits."""
+    transaction.on_commit(lambda: _bump_version(CATEGORY_VERSION_KEY))
+
+
+def product_list_key(user_id, url):
+    digest = hashlib.md5(url.encode(), usedforsecurity=False).hexdigest()
+    return f'products:list:{user_id}:{product_list_version(user_id)}:{digest}'
+
+
+def category_list_key(user_id, url):
+    """Category listings hold the seller's product counts, so both versions apply."""
+    digest = hashlib.md5(url.encode(), usedforsecurity=False).hexdigest()
+    return (f'categories:list:{user_id}:{product_list_version(user_id)}:'
+            f'{_version(CATEGORY_VERSION_KEY)}:{digest}')
+
+
+def make_etag(*parts):
+    return '"%s"' % hashlib.md5(':'.join(map(str, parts)).encode(), usedforsecurity=False).hexdigest()
+
+
+def etag_matches(request, etag):
+    """True when the client's If-None-Match already holds ``etag``."""
+    etags = parse_etags(request.headers.get('If-None-Match', ''))
+    return etag in etags or '*' in etags
@@ -0,0 +1,114 @@
+"""
+Exports for accountants: CSV / NDJSON streamed from a server-side cursor, and
+PDF statements and invoices rendered by xhtml2pdf on a process pool. PDFs are
+kept on disk under a name that includes a data version, so unchanged data is
+served straight from the file and changed data gets a fresh render, which
+replaces the file of the previous version.
+"""
+import csv
+import hashlib
+import json
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .pdf import render_pdf
+
+# Rows fetched per round trip while streaming
+EXPORT_CHUNK_SIZE = 2000
+
+
+class _Echo:
+    """File-like object whose write() hands the CSV line back to the generator."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(header, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_ndjson(header, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(header, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+STREAMERS = {
+    'csv': (stream_csv, 'text/csv'),
+    'ndjson': (stream_ndjson, 'application/x-ndjson'),
+}
+
+
+def data_version(rows):
+    """Short digest of the rows a document is built from."""
+    return hashlib.sha1(repr(list(rows)).encode(), usedforsecurity=False).hexdigest()[:16]
+
+
+def export_path(user_id, name):
+    return settings.EXPORT_DIR / str(user_id) / name
+
+
+_pool = None
+_pending = {}
+_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        # Forking a threaded server can copy held locks into the child; render_pdf needs no Django setup
+        _pool = ProcessPoolExecutor(max_workers=settings.EXPORT_PDF_WORKERS,
+                                    mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+
+def _rendered(path, future):
+    # Successful renders are served from the file from now on; failures stay until reported
+    if future.exception() is None and path.exists():
+        with _lock:
+            if _pending.get(path) is future:
+                del _pending[path]
+
+
+def _remove_superseded(path):
+    """Delete the other versions of the document ``path`` (``<name>-<version>.pdf``) names."""
+    name = path.stem.rsplit('-', 1)[0]
+    for other in path.parent.glob(f'{name}-*.pdf'):
+        if other != path and other.stem.rsplit('-', 1)[0] == name:
+            other.unlink(missing_ok=True)
+
+
+def request_pdf(path, build_html):
+    """
+    Make sure ``path`` exists or is being rendered from ``build_html()``.
+
+    Returns ``'ready'``, ``'rendering'`` or ``'failed'``. A failed render is
+    reported once; the next request schedules it again.
+    """
+    if path.exists():
+        return 'ready'
+    with _lock:
+        future = _pending.get(path)
+        if future is not None and future.done():
+            del _pending[path]
+            return 'failed' if future.exception() else 'ready'
+        if future is not None:
+            return 'rendering'
+
+    html = build_html()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with _lock:
+        if path in _pending:
+            return 'rendering'
+        _remove_superseded(path)
+        future = _pending[path] = _get_pool().submit(render_pdf, html, str(path))
+    # Outside the lock: the callback runs right away if the render has already finished
+    future.add_done_callback(lambda done: _rendered(path, done))
+    return 'rendering'
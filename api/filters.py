@@ -0,0 +1,95 @@
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from .models import Transaction
+
+
+def _parse_day(value, param):
+    try:
+        day = parse_date(value)
+    except ValueError:  # well formed but not a real date, e.g. month 13
+        day = None
+    if day is None:
+        raise ValidationError({param: 'Enter a valid ISO date.'})
+    return day
+
+
+def _parse_when(value, param, end_of_day=False):
+    """
+    Parse an ISO date or datetime into ``(aware datetime, is_bare_date)``. A
+    bare date maps to the start of that day, or of the next day when
+    ``end_of_day`` is set, so the filter stays a plain range on the indexed
+    column. Dates are tried first: parse_datetime accepts them too.
+    """
+    try:
+        day = parse_date(value)
+        when = parse_datetime(value) if day is None else None
+    except ValueError:  # well formed but out of range, e.g. month 13
+        day = when = None
+    if day is not None:
+        when = datetime.combine(day + timedelta(days=1) if end_of_day else day, time.min)
+    elif when is None:
+        raise ValidationError({param: 'Enter a valid ISO date or datetime.'})
+    if timezone.is_naive(when):
+        when = timezone.make_aware(when)
+    return when, day is not None
+
+
+def filter_transactions(queryset, params):
+    """
+    Apply the ?status=, ?payment_method=, ?product=, ?date_from= and ?date_to=
+    filters to a Transaction queryset. Invalid values raise a 400.
+    """
+    status = params.get('status')
+    if status:
+        if status not in dict(Transaction.STATUS_CHOICES):
+            raise ValidationError({'status': f'"{status}" is not a valid choice.'})
+        queryset = queryset.filter(status=status)
+
+    payment_method = params.get('payment_method')
+    if payment_method:
+        if payment_method not in dict(Transaction.PAYMENT_METHOD_CHOICES):
+            raise ValidationError({'payment_method': f'"{payment_method}" is not a valid choice.'})
+        queryset = queryset.filter(payment_method=payment_method)
+
+    product = params.get('product')
+    if product:
+        if not product.isdigit():
+            raise ValidationError({'product': 'Product must be an integer ID.'})
+        queryset = queryset.filter(product_id=int(product))
+
+    date_from = params.get('date_from')
+    if date_from:
+        queryset = queryset.filter(transaction_date__gte=_parse_when(date_from, 'date_from')[0])
+
+    date_to = params.get('date_to')
+    if date_to:
+        when, is_date = _parse_when(date_to, 'date_to', end_of_day=True)
+        if is_date:  # the whole day
+            queryset = queryset.filter(transaction_date__lt=when)
+        else:
+            queryset = queryset.filter(transaction_date__lte=when)
+
+    return queryset
+
+
+def filter_daily_sales(queryset, params):
+    """Apply the ?date_from= / ?date_to= (inclusive ISO dates) and ?product= filters to a DailySales queryset."""
+    date_from = params.get('date_from')
+    if date_from:
+        queryset = queryset.filter(day__gte=_parse_day(date_from, 'date_from'))
+
+    date_to = params.get('date_to')
+    if date_to:
+        queryset = queryset.filter(day__lte=_parse_day(date_to, 'date_to'))
+
+    product = params.get('product')
+    if product:
+        if not product.isdigit():
+            raise ValidationError({'product': 'Product must be an integer ID.'})
+        queryset = queryset.filter(product_id=int(product))
+
+    return queryset
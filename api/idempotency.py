@@ -0,0 +1,117 @@
+"""
+Idempotency-Key support for creating requests.
+
+The first request with a key inserts an IdempotencyKey row and runs the view
+in the same database transaction, then stores the response on the row. A
+retry with the key is answered from that row with a single indexed read,
+without running the view again. A concurrent duplicate blocks on the
+(user, key) unique index until the first request commits -- a lock on one
+index entry, not on a table -- and then replays its response; if the first
+request rolled back, the duplicate runs instead. Only 2xx responses are
+stored: any other outcome rolls back and the key can be retried.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = IdempotencyKey._meta.get_field('key').max_length
+KEY_REUSED_ERROR = f'This {HEADER} was already used for a different request.'
+
+
+class KeyReused(Exception):
+    """The key was already used for a different request."""
+
+
+def fingerprint(method, path, data):
+    """A digest of the request a key was sent with; key order in the body doesn't matter."""
+    if hasattr(data, 'lists'):  # QueryDict from a form body
+        data = dict(data.lists())
+    body = json.dumps([method, path, data], cls=DjangoJSONEncoder, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def _replay(record, request_fingerprint):
+    if record.fingerprint != request_fingerprint:
+        raise KeyReused()
+    return record.status_code, record.response, True
+
+
+def run_once(user_id, key, request_fingerprint, handler):
+    """
+    Run ``handler() -> (status, data)`` once per seller and key. Returns
+    ``(status, data, replayed)``; raises KeyReused when the key was first
+    sent with a different request.
+    """
+    now = timezone.now()
+    record = IdempotencyKey.objects.filter(user_id=user_id, key=key, expires_at__gt=now).first()
+    if record is not None:
+        return _replay(record, request_fingerprint)
+
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(user_id=user_id, key=key, fingerprint=request_fingerprint,
+                                                       expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL))
+        except IntegrityError:
+            # Waited for a concurrent request with this key, which committed; or the old row expired
+            if not IdempotencyKey.objects.filter(user_id=user_id, key=key, expires_at__lte=now).delete()[0]:
+                return _replay(IdempotencyKey.objects.get(user_id=user_id, key=key), request_fingerprint)
+            return run_once(user_id, key, request_fingerprint, handler)
+
+        status_code, data = handler()
+        if 200 <= status_code < 300:
+            record.status_code, record.response = status_code, data
+            record.save(update_fields=['status_code', 'response'])
+        else:
+            transaction.set_rollback(True)
+        return status_code, data, False
+
+
+def key_error(key):
+    """The error message for an unusable key, or None."""
+    if not key or len(key) > MAX_KEY_LENGTH:
+        return f'{HEADER} must be 1 to {MAX_KEY_LENGTH} characters.'
+    return None
+
+
+def idempotent(method):
+    """Make a DRF view method honour the Idempotency-Key header."""
+    @wraps(method)
+    def wrapper(view, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return method(view, request, *args, **kwargs)
+        error = key_error(key)
+        if error:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+
+        def handler():
+            response = method(view, request, *args, **kwargs)
+            return response.status_code, response.data
+
+        try:
+            status_code, data, replayed = run_once(
+                request.user.id, key, fingerprint(request.method, request.path, request.data), handler)
+        except KeyReused:
+            return Response({'error': KEY_REUSED_ERROR}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        response = Response(data, status=status_code)
+        if replayed:
+            response['Idempotent-Replayed'] = 'true'
+        return response
+    return wrapper
+
+
+def purge_expired():
+    """Delete keys past their TTL; expired keys are also replaced on reuse."""
+    return IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()[0]
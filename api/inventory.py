@@ -0,0 +1,57 @@
+"""
+Stock levels over time: low-stock lookups and daily inventory snapshots.
+
+Snapshots record every product's stock at the start of each local day, so
+stock history is one indexed read per product instead of a replay of its
+transactions.
+"""
+from datetime import datetime, time, timedelta
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import InventorySnapshot, Product
+
+SNAPSHOT_BATCH_SIZE = 5000
+
+
+def low_stock(products):
+    """Narrow ``products`` to those at or below their reorder level (served by product_low_stock_idx)."""
+    return products.filter(quantity__lte=F('reorder_level'))
+
+
+def take_snapshot(day=None, batch_size=SNAPSHOT_BATCH_SIZE):
+    """
+    Store every product's current quantity as its level for ``day`` (default
+    today). Running it again for the same day overwrites that day's rows.
+    Returns the number of rows written.
+    """
+    day = day or timezone.localdate()
+    levels = Product.objects.values_list('id', 'user_id', 'quantity').order_by().iterator(chunk_size=batch_size)
+    written = 0
+    with transaction.atomic():
+        while batch := list(islice(levels, batch_size)):
+            InventorySnapshot.objects.bulk_create(
+                [InventorySnapshot(product_id=product_id, user_id=user_id, day=day, quantity=quantity)
+                 for product_id, user_id, quantity in batch],
+                update_conflicts=True,
+                unique_fields=['product', 'day'],
+                update_fields=['quantity'],
+            )
+            written += len(batch)
+    return written
+
+
+def next_snapshot_time(now=None):
+    """The next local midnight, when the following day's snapshot is due."""
+    tomorrow = timezone.localdate(now) + timedelta(days=1)
+    return timezone.make_aware(datetime.combine(tomorrow, time.min))
+
+
+def stock_history(product, days):
+    """``product``'s daily levels over the last ``days`` days, oldest first."""
+    since = timezone.localdate() - timedelta(days=days - 1)
+    return list(InventorySnapshot.objects.filter(product=product, day__gte=since)
+                .order_by('day').values('day', 'quantity'))
@@ -0,0 +1,148 @@
+"""
+A small database-backed task queue.
+
+Functions decorated with ``@task`` can be called directly or queued with
+``.delay(*args, **kwargs)``, which inserts a Job row in the caller's
+transaction: the job exists exactly when the write that triggered it was
+committed, and no broker is needed. ``manage.py run_worker`` claims due jobs
+with a conditional UPDATE (safe with several workers on any database) and
+runs them on a thread or process pool, retrying failures with exponential
+backoff.
+"""
+import logging
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+
+class Task:
+    def __init__(self, func, name, max_attempts, backoff):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        """Queue a call; arguments must be JSON-serializable (pass IDs, not instances)."""
+        return Job.objects.create(name=self.name, args=list(args), kwargs=kwargs, max_attempts=self.max_attempts)
+
+    def schedule(self, run_at, *args, **kwargs):
+        """Like delay(), but the job won't run before ``run_at``."""
+        return Job.objects.create(name=self.name, args=list(args), kwargs=kwargs, max_attempts=self.max_attempts,
+                                  run_at=run_at)
+
+    def is_scheduled(self):
+        """True if a run of this task is already queued."""
+        return Job.objects.filter(name=self.name, status='queued').exists()
+
+
+def task(name=None, max_attempts=3, backoff=30):
+    """
+    Register a function as a queueable task. A failed run is retried after
+    ``backoff``, ``2 * backoff``, ``4 * backoff``... seconds, up to
+    ``max_attempts`` runs in total.
+    """
+    def register(func):
+        registered = Task(func, name or f'{func.__module__}.{func.__name__}', max_attempts, backoff)
+        TASKS[registered.name] = registered
+        return registered
+    return register
+
+
+def requeue_stale():
+    """Put back jobs whose worker died mid-run (locked for longer than TASK_LOCK_TIMEOUT)."""
+    cutoff = timezone.now() - timedelta(seconds=settings.TASK_LOCK_TIMEOUT)
+    return Job.objects.filter(status='running', locked_at__lt=cutoff).update(status='queued', locked_at=None)
+
+
+def claim(limit):
+    """Mark up to ``limit`` due jobs as running and return their IDs."""
+    now = timezone.now()
+    candidates = (Job.objects.filter(status='queued', run_at__lte=now)
+                  .order_by('run_at', 'id').values_list('id', flat=True)[:limit])
+    claimed = []
+    for job_id in candidates:
+        # Another worker may have taken it between the SELECT and here
+        if Job.objects.filter(id=job_id, status='queued').update(status='running', locked_at=now):
+            claimed.append(job_id)
+    return claimed
+
+
+def run_job(job_id):
+    """Run one claimed job and record the outcome. Returns True on success."""
+    try:
+        job = Job.objects.get(id=job_id)
+        job.attempts += 1
+        try:
+            TASKS[job.name](*job.args, **job.kwargs)
+        except Exception:
+            job.last_error = traceback.format_exc()
+            if job.attempts < job.max_attempts and job.name in TASKS:
+                delay = TASKS[job.name].backoff * 2 ** (job.attempts - 1)
+                job.status, job.run_at = 'queued', timezone.now() + timedelta(seconds=delay)
+                logger.warning('Job %s (%s) failed, retrying in %ss', job.id, job.name, delay,
+                               extra={'job_id': job.id, 'task': job.name, 'attempts': job.attempts})
+            else:
+                job.status = 'failed'
+                logger.error('Job %s (%s) failed after %s attempt(s)', job.id, job.name, job.attempts,
+                             extra={'job_id': job.id, 'task': job.name, 'attempts': job.attempts})
+            job.locked_at = None
+            job.save(update_fields=['attempts', 'status', 'run_at', 'locked_at', 'last_error'])
+            return False
+        job.delete()
+        return True
+    finally:
+        # Pool threads and processes each hold their own connection; don't leave it idle
+        if not connection.in_atomic_block:
+            connection.close()
+
+
+def run_pending():
+    """Run every due job in the current thread; used by ``run_worker --once`` and tests."""
+    done = 0
+    while ids := claim(100):
+        for job_id in ids:
+            run_job(job_id)
+            done += 1
+    return done
+
+
+def work(workers, processes=False, poll_interval=1.0):
+    """Claim and run jobs on a pool of ``workers`` threads or processes until interrupted."""
+    if processes:
+        import multiprocessing
+
+        import django
+        # Spawned workers start clean: set Django up before unpickling run_job
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=django.setup,
+                                   mp_context=multiprocessing.get_context('spawn'))
+    else:
+        pool = ThreadPoolExecutor(max_workers=workers)
+    running = set()
+    with pool:
+        while True:
+            close_old_connections()
+            requeue_stale()
+            for job_id in claim(workers - len(running)):
+                running.add(pool.submit(run_job, job_id))
+            if not running:
+                time.sleep(poll_interval)
+                continue
+            done, running = wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+            for future in done:
+                future.result()
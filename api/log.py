@@ -0,0 +1,23 @@
+"""
+Structured logging: one JSON object per line, with the ``extra={...}`` fields
+of the call merged in, so log pipelines can filter on them directly.
+"""
+import json
+import logging
+
+# Attributes every LogRecord has; anything else came from ``extra``
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRS)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
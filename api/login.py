@@ -0,0 +1,55 @@
+"""
+Login pipeline shared by the sync and async login views: one indexed user
+lookup by email and exactly one password hash verification per attempt.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password
+from django.contrib.auth.models import User
+from rest_framework_simplejwt.tokens import RefreshToken
+
+# Bounded pool for password hashing under ASGI, so PBKDF2 runs off the event
+# loop and a login burst can't take more than this many cores.
+_hash_pool = ThreadPoolExecutor(max_workers=settings.LOGIN_HASH_WORKERS, thread_name_prefix='password-hash')
+
+
+def login_users(email):
+    # auth_user.email is indexed by migration 0010; the oldest account wins on duplicates
+    return User.objects.filter(email=email).order_by('id')
+
+
+def get_login_user(email):
+    return login_users(email).first() if email else None
+
+
+async def aget_login_user(email):
+    return await login_users(email).afirst() if email else None
+
+
+async def acheck_password(user, password):
+    """Verify ``password`` on the hashing pool without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_pool, check_password, password, user.password)
+
+
+def login_response_data(user):
+    refresh = RefreshToken.for_user(user)
+    return {
+        'message': 'Login successful!',
+        'user_id': user.id,
+        'email': user.email,
+        'username': user.username,
+        'refresh': str(refresh),
+        'access': str(refresh.access_token),
+    }
+
+
+def login_result(user, password_ok):
+    """``(status, payload)`` answering a login attempt; ``user`` is None for an unknown email."""
+    if user is None:
+        return 404, {'error': 'User not found'}
+    if not password_ok:
+        return 401, {'error': 'Invalid credentials'}
+    return 200, login_response_data(user)
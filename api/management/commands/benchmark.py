@@ -0,0 +1,65 @@
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api.benchmarks import SCENARIOS, compare
+
+
+class Command(BaseCommand):
+    help = 'Run API benchmark scenarios against the configured database (all data is rolled back).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenarios', nargs='*',
+                            help=f'Scenarios to run (default: all). One of: {", ".join(sorted(SCENARIOS))}.')
+        parser.add_argument('--repeat', type=int, default=20, help='Samples per measurement.')
+        parser.add_argument('--json', metavar='PATH', help='Also write the results as JSON to PATH.')
+        parser.add_argument('--compare', metavar='BASELINE',
+                            help='Compare with an earlier --json report and fail on regressions.')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Allowed slowdown as a fraction of the baseline (default 0.2 = 20%%).')
+
+    def handle(self, *args, **options):
+        unknown = set(options['scenarios']) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f'Unknown scenario(s): {", ".join(sorted(unknown))}')
+
+        results = {}
+        for name in options['scenarios'] or sorted(SCENARIOS):
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            results[name] = SCENARIOS[name](repeat=options['repeat'])
+            for row in results[name]:
+                self.stdout.write('  ' + '  '.join(f'{key}={value}' for key, value in row.items()))
+
+        report = {'meta': self.metadata(options['repeat']), 'results': results}
+        if options['json']:
+            with open(options['json'], 'w') as output:
+                json.dump(report, output, indent=2)
+
+        if options['compare']:
+            with open(options['compare']) as baseline:
+                regressions = compare(json.load(baseline), report, options['tolerance'])
+            for message in regressions:
+                self.stdout.write(self.style.ERROR(f'REGRESSION {message}'))
+            if regressions:
+                raise CommandError(f'{len(regressions)} regression(s) against {options["compare"]}.')
+            self.stdout.write(self.style.SUCCESS(f'No regressions against {options["compare"]}.'))
+
+    @staticmethod
+    def metadata(repeat):
+        try:
+            commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                                    capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            'commit': commit,
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'repeat': repeat,
+        }
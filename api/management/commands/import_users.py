@@ -0,0 +1,86 @@
+import csv
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.models import UserProfile
+
+REQUIRED_COLUMNS = ('username', 'email', 'password')
+
+
+class Command(BaseCommand):
+    help = ('Create seller accounts from a CSV file with columns username, email, password and optionally '
+            'phone_no, business_name. Existing usernames/emails are skipped.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Password hashing processes (default: one per CPU).')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows hashed and inserted per batch.')
+
+    def handle(self, *args, **options):
+        with open(options['csv_file'], newline='', encoding='utf-8-sig') as source:
+            reader = csv.DictReader(source)
+            missing = set(REQUIRED_COLUMNS) - set(reader.fieldnames or ())
+            if missing:
+                raise CommandError(f'Missing column(s): {", ".join(sorted(missing))}')
+
+            created = skipped = 0
+            seen_usernames, seen_emails = set(), set()
+            # Password hashing is CPU-bound and dominates the import, so spread it over processes
+            with ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup,
+                                     mp_context=multiprocessing.get_context('spawn')) as pool:
+                rows = enumerate(reader, start=2)  # line 1 is the header
+                while batch := list(islice(rows, options['batch_size'])):
+                    accepted = self.accept(batch, seen_usernames, seen_emails)
+                    skipped += len(batch) - len(accepted)
+                    hashes = pool.map(make_password, [row['password'] for _, row in accepted], chunksize=50)
+                    created += self.insert([row for _, row in accepted], hashes)
+
+        self.stdout.write(self.style.SUCCESS(f'Created {created} user(s), skipped {skipped} row(s).'))
+
+    def accept(self, batch, seen_usernames, seen_emails):
+        """Drop incomplete rows and usernames/emails that are taken or repeated in the file."""
+        for _, row in batch:
+            row['email'] = User.objects.normalize_email((row.get('email') or '').strip())
+            row['username'] = (row.get('username') or '').strip()
+        usernames = {row['username'] for _, row in batch}
+        emails = {row['email'] for _, row in batch}
+        taken_usernames = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        taken_emails = set(User.objects.filter(email__in=emails).values_list('email', flat=True))
+
+        accepted = []
+        for line, row in batch:
+            if not all(row.get(column) for column in REQUIRED_COLUMNS):
+                self.stderr.write(f'Line {line}: missing username, email or password, skipped.')
+            elif row['username'] in taken_usernames or row['username'] in seen_usernames:
+                self.stderr.write(f'Line {line}: username {row["username"]} already exists, skipped.')
+            elif row['email'] in taken_emails or row['email'] in seen_emails:
+                self.stderr.write(f'Line {line}: email {row["email"]} already exists, skipped.')
+            else:
+                seen_usernames.add(row['username'])
+                seen_emails.add(row['email'])
+                accepted.append((line, row))
+        return accepted
+
+    @staticmethod
+    def insert(rows, hashes):
+        with transaction.atomic():
+            users = User.objects.bulk_create(
+                User(username=row['username'], email=row['email'], password=password)
+                for row, password in zip(rows, hashes))
+            if not all(user.pk for user in users):  # backends that don't return IDs from bulk inserts
+                users = list(User.objects.filter(username__in=[row['username'] for row in rows]))
+                by_username = {user.username: user for user in users}
+                users = [by_username[row['username']] for row in rows]
+            UserProfile.objects.bulk_create(
+                UserProfile(user=user, phone_no=row.get('phone_no') or None,
+                            business_name=row.get('business_name') or None, is_verify=True)
+                for user, row in zip(users, rows))
+        return len(users)
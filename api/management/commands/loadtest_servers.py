@@ -0,0 +1,82 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.benchmarks import committed_user, make_products, summarize, wait_for_port
+
+
+class Command(BaseCommand):
+    help = ('Serve the project with waitress (WSGI, sync views) and uvicorn (ASGI, async views) in turn '
+            'and load both with the same slow-client traffic. Needs a database both servers can reach.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/products/', help='Endpoint to request.')
+        parser.add_argument('--concurrency', type=int, default=200, help='Simultaneous client connections.')
+        parser.add_argument('--requests', type=int, default=5, help='Requests per client connection slot.')
+        parser.add_argument('--slow-ms', type=int, default=50,
+                            help='Delay between request header lines, to mimic slow mobile clients.')
+        parser.add_argument('--wsgi-threads', type=int, default=8, help='waitress worker threads.')
+        parser.add_argument('--port', type=int, default=8765)
+
+    def handle(self, *args, **options):
+        servers = {
+            'wsgi/waitress': ([sys.executable, '-m', 'waitress', f'--port={options["port"]}',
+                               f'--threads={options["wsgi_threads"]}', 'backend.wsgi:application'],
+                              {'ASYNC_VIEWS': 'false'}),
+            'asgi/uvicorn': ([sys.executable, '-m', 'uvicorn', 'backend.asgi:application',
+                              '--port', str(options['port']), '--workers', '1', '--log-level', 'warning'],
+                             {'ASYNC_VIEWS': 'true'}),
+        }
+        with committed_user('bench-loadtest') as user:
+            make_products(user, 50)
+            token = str(RefreshToken.for_user(user).access_token)
+            for name, (command, env) in servers.items():
+                process = subprocess.Popen(command, cwd=settings.BASE_DIR, env={**os.environ, **env},
+                                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                try:
+                    wait_for_port(options['port'])
+                    row = asyncio.run(self.load(token, **options))
+                finally:
+                    process.terminate()
+                    process.wait()
+                self.stdout.write(f'  server={name}  ' + '  '.join(f'{key}={value}' for key, value in row.items()))
+
+    async def load(self, token, path, concurrency, requests, slow_ms, port, **options):
+        lines = [f'GET {path} HTTP/1.1', f'Host: 127.0.0.1:{port}', f'Authorization: Bearer {token}',
+                 'Connection: close', '']
+        samples, errors = [], 0
+
+        async def one_request():
+            nonlocal errors
+            start = time.perf_counter()
+            try:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                for line in lines:
+                    writer.write(f'{line}\r\n'.encode() if line else b'\r\n')
+                    await writer.drain()
+                    await asyncio.sleep(slow_ms / 1000)
+                response = await reader.read()
+                writer.close()
+            except OSError:
+                errors += 1
+                return
+            if response.startswith(b'HTTP/1.1 200'):
+                samples.append((time.perf_counter() - start) * 1000)
+            else:
+                errors += 1
+
+        async def client():
+            for _ in range(requests):
+                await one_request()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        return {'concurrency': concurrency, 'ok': len(samples), 'errors': errors,
+                'req_per_sec': round(len(samples) / elapsed), **(summarize(samples) if samples else {})}
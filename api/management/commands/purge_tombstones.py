@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.sync import purge_tombstones
+
+
+class Command(BaseCommand):
+    help = f'Delete sync tombstones older than SYNC_TOMBSTONE_DAYS ({settings.SYNC_TOMBSTONE_DAYS} days).'
+
+    def handle(self, *args, **options):
+        deleted = purge_tombstones()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} tombstones.'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from api.models import DailySales, Transaction
+from api.rollups import rebuild_daily_sales
+
+
+class Command(BaseCommand):
+    help = 'Recompute the DailySales rollup table from raw transactions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users',
+                            help='Only rebuild this seller (repeatable). Default: all sellers.')
+
+    def handle(self, *args, **options):
+        written = rebuild_daily_sales(Transaction, DailySales, user_ids=options['users'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} daily sales rows.'))
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.jobs import run_pending, work
+
+
+class Command(BaseCommand):
+    help = 'Run queued background tasks (see api/jobs.py).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.TASK_WORKERS,
+                            help='Size of the worker pool.')
+        parser.add_argument('--processes', action='store_true',
+                            help='Use a process pool instead of threads (for CPU-bound tasks such as PDFs).')
+        parser.add_argument('--poll-interval', type=float, default=settings.TASK_POLL_INTERVAL,
+                            help='Seconds to wait for new jobs when the queue is empty.')
+        parser.add_argument('--once', action='store_true',
+                            help='Run the jobs that are due now in this process, then exit.')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            self.stdout.write(self.style.SUCCESS(f'Ran {run_pending()} job(s).'))
+            return
+        self.stdout.write(f"Worker started with {options['workers']} "
+                          f"{'processes' if options['processes'] else 'threads'}.")
+        try:
+            work(options['workers'], processes=options['processes'], poll_interval=options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+
+from api.seed import SEED_PASSWORD, seed
+
+
+class Command(BaseCommand):
+    help = 'Fill the database with synthetic sellers, products and transactions for benchmarking.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10, help='Sellers to create.')
+        parser.add_argument('--products', type=int, default=2000, help='Products per seller.')
+        parser.add_argument('--transactions', type=int, default=100000, help='Transactions per seller.')
+        parser.add_argument('--days', type=int, default=365, help='Spread transactions over this many days.')
+        parser.add_argument('--prefix', default='seed', help='Username prefix; must not be in use yet.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0, help='Random seed.')
+
+    def handle(self, *args, **options):
+        if User.objects.filter(username__startswith=f'{options["prefix"]}-').exists():
+            raise CommandError(f'Users named {options["prefix"]}-* already exist; pick another --prefix.')
+
+        start = time.perf_counter()
+        sellers = seed(users=options['users'], products=options['products'], transactions=options['transactions'],
+                       days=options['days'], prefix=options['prefix'], batch_size=options['batch_size'],
+                       rng_seed=options['seed'])
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(sellers)} sellers with {options["products"]} products and {options["transactions"]} '
+            f'transactions each in {elapsed:.1f}s. Log in as {sellers[0].email if sellers else "-"} '
+            f'with password "{SEED_PASSWORD}".'))
@@ -0,0 +1,23 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from api.inventory import take_snapshot
+from api.tasks import schedule_inventory_snapshots
+
+
+class Command(BaseCommand):
+    help = "Record every product's stock level for a day, or queue the daily snapshot job."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--day', type=date.fromisoformat, help='Day to record (YYYY-MM-DD, default today).')
+        parser.add_argument('--schedule', action='store_true',
+                            help='Instead queue a snapshot at every local midnight, run by run_worker.')
+
+    def handle(self, *args, **options):
+        if options['schedule']:
+            schedule_inventory_snapshots()
+            self.stdout.write(self.style.SUCCESS('Daily inventory snapshots are scheduled.'))
+            return
+        written = take_snapshot(options['day'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} inventory snapshot rows.'))
@@ -0,0 +1,240 @@
+"""
+Per-route request metrics, exported in the Prometheus text format on /metrics.
+
+PerformanceMiddleware records wall time, DB query count and time, response
+rendering (serialization) time and response size for every request. Values
+are kept in-process as summaries: a running count and sum plus a bounded
+window of recent samples from which p50/p95/p99 are computed at scrape time.
+With several server processes, each one exports its own numbers.
+
+DB queries are timed by an execute wrapper installed on every new connection.
+It reads the current request from a context variable, so it also sees queries
+that async views run through sync_to_async on another thread.
+"""
+import hmac
+import ipaddress
+import logging
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+
+logger = logging.getLogger(__name__)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+METRICS = {
+    'request_duration_seconds': 'Wall time spent handling the request.',
+    'db_queries': 'Database queries issued per request.',
+    'db_duration_seconds': 'Time spent in database queries per request.',
+    'serialization_seconds': 'Time spent rendering the response body.',
+    'response_size_bytes': 'Size of the (non-streaming) response body.',
+}
+
+# SQL statements kept per request for the slow-request log
+MAX_LOGGED_QUERIES = 50
+
+
+class Summary:
+    def __init__(self, window):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.samples.append(value)
+        self.count += 1
+        self.sum += value
+
+    def quantiles(self):
+        ordered = sorted(self.samples)
+        return [(q, ordered[min(len(ordered) - 1, int(len(ordered) * q))]) for q in QUANTILES]
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.summaries = {}  # (metric, labels) -> Summary
+        self.requests = {}  # labels + status -> count
+
+    def observe(self, labels, status_code, values):
+        window = settings.METRICS_WINDOW
+        with self.lock:
+            for metric, value in values.items():
+                summary = self.summaries.get((metric, labels))
+                if summary is None:
+                    summary = self.summaries[(metric, labels)] = Summary(window)
+                summary.observe(value)
+            key = labels + (('status', str(status_code)),)
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+    def clear(self):
+        with self.lock:
+            self.summaries.clear()
+            self.requests.clear()
+
+    def render(self):
+        lines = []
+        with self.lock:
+            lines += ['# HELP silkhair_requests_total Requests handled.', '# TYPE silkhair_requests_total counter']
+            lines += [f'silkhair_requests_total{_labels(key)} {count}' for key, count in sorted(self.requests.items())]
+            for metric, help_text in METRICS.items():
+                name = f'silkhair_{metric}'
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} summary']
+                for (summary_metric, labels), summary in sorted(self.summaries.items()):
+                    if summary_metric != metric:
+                        continue
+                    for quantile, value in summary.quantiles():
+                        lines.append(f'{name}{_labels(labels + (("quantile", str(quantile)),))} {value:.6g}')
+                    lines.append(f'{name}_sum{_labels(labels)} {summary.sum:.6g}')
+                    lines.append(f'{name}_count{_labels(labels)} {summary.count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(pairs):
+    escaped = (key + '="' + value.replace('\\', '\\\\').replace('"', '\\"') + '"' for key, value in pairs)
+    return '{%s}' % ','.join(escaped)
+
+
+registry = Registry()
+
+
+class RequestStats:
+    __slots__ = ('queries', 'db_time', 'render_time', 'sql')
+
+    def __init__(self, keep_sql):
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self.sql = [] if keep_sql else None
+
+
+_current = ContextVar('request_stats', default=None)
+
+
+def _time_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        stats.queries += 1
+        stats.db_time += elapsed
+        if stats.sql is not None and len(stats.sql) < MAX_LOGGED_QUERIES:
+            stats.sql.append({'ms': round(elapsed * 1000, 3), 'sql': sql})
+
+
+def _install_query_timer(sender, connection, **kwargs):
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+connection_created.connect(_install_query_timer)
+
+
+class PerformanceMiddleware:
+    """Record request metrics and log slow requests (settings.SLOW_REQUEST_MS) with their SQL."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        # Connections opened before the middleware was loaded
+        for connection in connections.all(initialized_only=True):
+            _install_query_timer(None, connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats, token, start = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, stats, start)
+        return response
+
+    async def __acall__(self, request):
+        stats, token, start = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, stats, start)
+        return response
+
+    def start(self):
+        stats = RequestStats(keep_sql=bool(settings.SLOW_REQUEST_MS))
+        return stats, _current.set(stats), time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns; time that step
+        stats = _current.get()
+        if stats is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                stats.render_time += time.perf_counter() - started
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def finish(self, request, response, stats, start):
+        elapsed = time.perf_counter() - start
+        match = request.resolver_match
+        labels = (('method', request.method), ('route', match.route if match else 'unmatched'))
+        values = {
+            'request_duration_seconds': elapsed,
+            'db_queries': stats.queries,
+            'db_duration_seconds': stats.db_time,
+            'serialization_seconds': stats.render_time,
+        }
+        if not response.streaming:
+            values['response_size_bytes'] = len(response.content)
+        registry.observe(labels, response.status_code, values)
+
+        slow = settings.SLOW_REQUEST_MS and elapsed * 1000 >= settings.SLOW_REQUEST_MS
+        if slow or logger.isEnabledFor(logging.DEBUG):
+            fields = {
+                'route': labels[1][1], 'method': request.method, 'path': request.path,
+                'status': response.status_code, 'duration_ms': round(elapsed * 1000, 3),
+                'db_queries': stats.queries, 'db_ms': round(stats.db_time * 1000, 3),
+                'serialization_ms': round(stats.render_time * 1000, 3),
+                'response_bytes': values.get('response_size_bytes'),
+            }
+            if slow:
+                logger.warning('Slow request %s %s', request.method, request.path, extra={**fields, 'sql': stats.sql})
+            else:
+                logger.debug('%s %s', request.method, request.path, extra=fields)
+
+
+def metrics_allowed(request):
+    if settings.METRICS_TOKEN:
+        return hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {settings.METRICS_TOKEN}')
+    # Without a token only a scraper on the same host gets in. Behind a proxy every
+    # request comes from a private address, so those can't be trusted here.
+    try:
+        return ipaddress.ip_address(request.META.get('REMOTE_ADDR', '')).is_loopback
+    except ValueError:
+        return False
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint; requires ``Authorization: Bearer <METRICS_TOKEN>``,
+    or a loopback client when no token is set.
+    """
+    if not metrics_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,40 @@
+# Generated by Django 6.0 on 2026-10-18 09:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from api.rollups import rebuild_daily_sales
+
+
+def backfill_daily_sales(apps, schema_editor):
+    rebuild_daily_sales(apps.get_model('api', 'Transaction'), apps.get_model('api', 'DailySales'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_transaction_listing_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('day', models.DateField()),
+                ('status', models.CharField(choices=[('completed', 'Completed'), ('pending', 'Pending'), ('failed', 'Failed')], max_length=10)),
+                ('payment_method', models.CharField(choices=[('credit_card', 'Credit Card'), ('paypal', 'PayPal'), ('bank_transfer', 'Bank Transfer'), ('cash', 'Cash')], max_length=20)),
+                ('transactions', models.PositiveIntegerField(default=0)),
+                ('units', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='api.product')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'day', 'product', 'status', 'payment_method'), name='daily_sales_unique_bucket')],
+            },
+        ),
+        migrations.RunPython(backfill_daily_sales, migrations.RunPython.noop),
+    ]
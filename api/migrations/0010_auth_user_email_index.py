@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-18 10:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_dailysales'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    # LoginView looks users up by email, which auth_user doesn't index
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS api_auth_user_email_idx ON auth_user (email);',
+            'DROP INDEX IF EXISTS api_auth_user_email_idx;',
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0 on 2026-10-18 11:20
+
+from django.db import migrations
+
+from api.search import install_search_indexes, remove_search_indexes
+
+
+def install(apps, schema_editor):
+    install_search_indexes(schema_editor, apps.get_model('api', 'Product'))
+
+
+def remove(apps, schema_editor):
+    remove_search_indexes(schema_editor, apps.get_model('api', 'Product'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_auth_user_email_index'),
+    ]
+
+    # Database-specific (GIN/text_pattern_ops on PostgreSQL, FTS5 on SQLite), so not part of Product.Meta
+    operations = [
+        migrations.RunPython(install, remove),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations
+from django.db.models import Count
+
+
+def add_unique_email(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    duplicates = list(User.objects.exclude(email='').values('email').annotate(n=Count('id'))
+                      .filter(n__gt=1).values_list('email', flat=True)[:20])
+    if duplicates:
+        raise RuntimeError(f'auth_user has duplicate emails, resolve them before migrating: {", ".join(duplicates)}')
+
+    # Accounts created without an email (e.g. createsuperuser) all have '', so leave those out
+    schema_editor.execute("CREATE UNIQUE INDEX api_auth_user_email_uniq ON auth_user (email) WHERE email <> ''")
+    if schema_editor.connection.vendor == 'postgresql':
+        # PostgreSQL serves email = %s lookups from the partial index; SQLite can't and keeps 0010's index
+        schema_editor.execute('DROP INDEX IF EXISTS api_auth_user_email_idx')
+
+
+def remove_unique_email(apps, schema_editor):
+    schema_editor.execute('DROP INDEX IF EXISTS api_auth_user_email_uniq')
+    schema_editor.execute('CREATE INDEX IF NOT EXISTS api_auth_user_email_idx ON auth_user (email)')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_statelessuser'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    # SignupView relies on this constraint instead of checking for an existing email first
+    operations = [
+        migrations.RunPython(add_unique_email, remove_unique_email),
+    ]
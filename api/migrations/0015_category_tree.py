@@ -0,0 +1,44 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def fill_paths(apps, schema_editor):
+    # Existing categories are all roots
+    Category = apps.get_model('api', 'Category')
+    categories = list(Category.objects.all())
+    for category in categories:
+        category.slug = category.slug or slugify(category.name)
+        category.path = f'{category.slug}/'
+    Category.objects.bulk_update(categories, ['slug', 'path'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_auth_user_email_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT,
+                                    related_name='children', to='api.category'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(default='', editable=False, max_length=500),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_paths, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['path'], name='category_path_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['user', 'category', 'id'], name='product_user_category_idx'),
+        ),
+    ]
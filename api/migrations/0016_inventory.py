@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from api.search import install_search_indexes
+
+
+def reinstall_search_triggers(apps, schema_editor):
+    # Adding reorder_level rebuilds api_product on SQLite, which drops the FTS triggers
+    if schema_editor.connection.vendor == 'sqlite':
+        install_search_indexes(schema_editor, apps.get_model('api', 'Product'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_category_tree'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventorySnapshot',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('day', models.DateField()),
+                ('quantity', models.PositiveIntegerField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='reorder_level',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(reinstall_search_triggers, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('quantity__lte', models.F('reorder_level'))), fields=['user', 'id'], name='product_low_stock_idx'),
+        ),
+        migrations.AddField(
+            model_name='inventorysnapshot',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventory_snapshots', to='api.product'),
+        ),
+        migrations.AddField(
+            model_name='inventorysnapshot',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventory_snapshots', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='inventorysnapshot',
+            constraint=models.UniqueConstraint(fields=('product', 'day'), name='inventory_snapshot_unique_day'),
+        ),
+    ]
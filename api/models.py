@@ -1,8 +1,14 @@
-from django.db import models
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Concat, Substr
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
 from django.utils.text import slugify
 
+from .cache import invalidate_categories, invalidate_product_list
+
 
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
@@ -17,18 +23,87 @@ class UserProfile(models.Model):
         return self.user.username
 
 
+class StatelessUser(User):
+    """
+    A User known only by its id, as built from a verified JWT by
+    StatelessJWTAuthentication. The remaining fields are deferred and are
+    all loaded together, in one query, the first time any of them is read.
+    """
+
+    class Meta:
+        proxy = True
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        deferred = self.get_deferred_fields()
+        if fields is not None and deferred.issuperset(fields):
+            fields = deferred
+        super().refresh_from_db(using, fields, from_queryset)
+
+
 class Category(models.Model):
+    """
+    Categories nest through ``parent``. ``path`` is the materialized path of
+    slugs from the root (``hair/wigs/``), so a whole subtree is one prefix
+    scan on category_path_idx. Slugs never contain ``/``.
+    """
     id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=100, unique=True)
     slug = models.SlugField(max_length=120, unique=True, blank=True, null=True)
+    parent = models.ForeignKey('self', on_delete=models.PROTECT, null=True, blank=True, related_name='children')
+    path = models.CharField(max_length=500, editable=False)
+
+    class Meta:
+        indexes = [
+            # varchar_pattern_ops lets PostgreSQL serve LIKE 'prefix%' from the index; ignored elsewhere
+            models.Index(fields=['path'], name='category_path_idx', opclasses=['varchar_pattern_ops']),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def depth(self):
+        return self.path.count('/') - 1
+
+    @staticmethod
+    def subtree_filter(path, prefix=''):
+        """
+        Match ``path`` and everything below it as an index range. Outside
+        PostgreSQL paths compare bytewise, so the subtree is [path, path + 1)
+        with the trailing '/' bumped to '0'; PostgreSQL collations are not
+        bytewise and use the pattern_ops index for startswith instead.
+        """
+        if connection.vendor == 'postgresql':
+            return Q(**{f'{prefix}path__startswith': path})
+        return Q(**{f'{prefix}path__gte': path, f'{prefix}path__lt': path[:-1] + '0'})
 
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
-        super().save(*args, **kwargs)
+        old_path = self.path
+        self.path = f'{self.parent.path if self.parent_id else ""}{self.slug}/'
+        if old_path and self.parent_id and self.parent.path.startswith(old_path):
+            raise ValueError('A category cannot be nested under itself or its subcategories.')
 
-    def __str__(self):
-        return self.name
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if old_path and old_path != self.path:
+                # Moved or renamed: rewrite the prefix of every descendant in one UPDATE
+                Category.objects.filter(self.subtree_filter(old_path)).exclude(pk=self.pk).update(
+                    path=Concat(Value(self.path), Substr('path', len(old_path) + 1)))
+        invalidate_categories()
+
+    def delete(self, *args, **kwargs):
+        # Products cascade without Product.delete(), so record and invalidate them here
+        product_ids = {}
+        for product_id, user_id in self.products.values_list('id', 'user_id'):
+            product_ids.setdefault(user_id, []).append(product_id)
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            for user_id, ids in product_ids.items():
+                Tombstone.record_products(user_id, ids)
+                invalidate_product_list(user_id)
+            invalidate_categories()
+            return super().delete(*args, **kwargs)
 
 
 class Product(models.Model):
@@ -39,10 +114,25 @@ class Product(models.Model):
     sku = models.CharField(max_length=50, unique=True)
     unit_price = models.DecimalField(max_digits=10, decimal_places=2)
     quantity = models.PositiveIntegerField()
+    reorder_level = models.PositiveIntegerField(default=0)  # low stock once quantity falls to this
     description = models.TextField(blank=True, null=True)
     date_added = models.DateTimeField(null=True, blank=True)  # Allow null for existing rows
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id'], name='product_user_id_idx'),
+            models.Index(fields=['user', 'updated_at', 'id'], name='product_user_updated_idx'),
+            models.Index(fields=['user', 'category', 'id'], name='product_user_category_idx'),
+            # Only low-stock rows are indexed, so the reorder list reads a handful of entries
+            models.Index(fields=['user', 'id'], name='product_low_stock_idx',
+                         condition=Q(quantity__lte=F('reorder_level'))),
+        ]
+
+    @property
+    def is_low_stock(self):
+        return self.quantity <= self.reorder_level
+
     def __str__(self):
         return self.product_name
 
@@ -50,6 +140,14 @@ class Product(models.Model):
         if not self.date_added:
             self.date_added = timezone.now()
         super().save(*args, **kwargs)
+        invalidate_product_list(self.user_id)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            Tombstone.record_products(self.user_id, [self.pk])
+            result = super().delete(*args, **kwargs)
+        invalidate_product_list(self.user_id)
+        return result
 
 class Transaction(models.Model):
     STATUS_CHOICES = [
@@ -75,6 +173,243 @@ class Transaction(models.Model):
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')  # Transaction status
     payment_method = models.CharField(max_length=20, choices=PAYMENT_METHOD_CHOICES, default='credit_card')  # Payment method
     transaction_date = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'transaction_date'], name='transaction_user_date_idx'),
+            models.Index(fields=['user', 'status'], name='transaction_user_status_idx'),
+            models.Index(fields=['user', 'updated_at', 'id'], name='transaction_user_updated_idx'),
+        ]
+
+    # Fields that feed the DailySales rollup
+    ROLLUP_FIELDS = ('product_id', 'status', 'payment_method', 'quantity', 'total_price')
+
+    def __str__(self):
+        return f'Transaction {self.id} by {self.customer}'
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_rollup_state()
+        return instance
+
+    def _remember_rollup_state(self):
+        if self.get_deferred_fields().intersection(self.ROLLUP_FIELDS):
+            self._rollup_state = None
+        else:
+            self._rollup_state = tuple(getattr(self, name) for name in self.ROLLUP_FIELDS)
+
+    @staticmethod
+    def _stock_taken(state):
+        """(product_id, units) a sale in ``state`` took out of stock; failed sales take none."""
+        if state is None:
+            return None, 0
+        product_id, status, _, quantity, _ = state
+        return product_id, 0 if status == 'failed' else quantity
+
+    def _move_stock(self, previous, current):
+        """
+        Put back the stock the sale took in its ``previous`` state and take what
+        it takes in its ``current`` one (None: deleted). New sales take theirs in
+        TransactionSerializer.create.
+        """
+        (old_product, old_units), (new_product, new_units) = self._stock_taken(previous), self._stock_taken(current)
+        if (old_product, old_units) == (new_product, new_units):
+            return
+        now = timezone.now()
+        if old_units:
+            Product.objects.filter(id=old_product).update(quantity=F('quantity') + old_units, updated_at=now)
+        if new_units and not (Product.objects.filter(id=new_product, quantity__gte=new_units)
+                              .update(quantity=F('quantity') - new_units, updated_at=now)):
+            raise ValidationError('Not enough stock for this product.')
+        invalidate_product_list(self.user_id)
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        previous = getattr(self, '_rollup_state', None)
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            super().save(*args, **kwargs)
+            # Keep the daily rollup in step: add new sales, move edited ones between buckets
+            self._remember_rollup_state()
+            if adding:
+                DailySales.record(self, self._rollup_state)
+            elif previous is not None and previous != self._rollup_state:
+                DailySales.record(self, previous, sign=-1)
+                DailySales.record(self, self._rollup_state)
+                self._move_stock(previous, self._rollup_state)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            if getattr(self, '_rollup_state', None) is not None:
+                DailySales.record(self, self._rollup_state, sign=-1)
+                self._move_stock(self._rollup_state, None)
+            Tombstone.objects.create(user_id=self.user_id, kind='transaction', object_id=self.pk)
+            return super().delete(*args, **kwargs)
+
+
+class Tombstone(models.Model):
+    """
+    A deleted product or transaction, kept so delta sync (api/sync.py) can
+    tell clients to drop it. Purged after SYNC_TOMBSTONE_DAYS.
+    """
+    KIND_CHOICES = [
+        ('product', 'Product'),
+        ('transaction', 'Transaction'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tombstones')
+    kind = models.CharField(max_length=12, choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'deleted_at', 'id'], name='tombstone_user_deleted_idx'),
+            models.Index(fields=['deleted_at'], name='tombstone_deleted_at_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} {self.object_id} deleted {self.deleted_at}'
+
+    @classmethod
+    def record_products(cls, user_id, product_ids):
+        """
+        Tombstone the seller's products ``product_ids``. Their transactions
+        cascade with them and get no tombstones of their own: clients drop a
+        deleted product's transactions along with it.
+        """
+        now = timezone.now()
+        cls.objects.bulk_create(cls(user_id=user_id, kind='product', object_id=product_id, deleted_at=now)
+                                for product_id in product_ids)
+
+
+class InventorySnapshot(models.Model):
+    """
+    A product's stock level at the start of a local day, written in bulk at
+    midnight by the ``snapshot_inventory`` task so stock history reads one
+    row per day instead of replaying transactions.
+    """
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='inventory_snapshots')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='inventory_snapshots')
+    day = models.DateField()
+    quantity = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'day'], name='inventory_snapshot_unique_day'),
+        ]
+
+    def __str__(self):
+        return f'{self.day} {self.product_id} {self.quantity}'
+
+
+class DailySales(models.Model):
+    """
+    Per-seller, per-product, per-day sales totals split by status and payment
+    method. Maintained incrementally by Transaction.save()/delete(); the
+    ``rebuild_sales_rollups`` command recomputes it from raw transactions.
+    """
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_sales')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
+    day = models.DateField()
+    status = models.CharField(max_length=10, choices=Transaction.STATUS_CHOICES)
+    payment_method = models.CharField(max_length=20, choices=Transaction.PAYMENT_METHOD_CHOICES)
+    transactions = models.PositiveIntegerField(default=0)
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'day', 'product', 'status', 'payment_method'],
+                                    name='daily_sales_unique_bucket'),
+        ]
+
+    def __str__(self):
+        return f'{self.day} {self.product_id} {self.status}'
+
+    @classmethod
+    def record(cls, sale, state, sign=1):
+        """Add (or with ``sign=-1`` remove) one transaction's state to its daily bucket."""
+        product_id, status, payment_method, quantity, total_price = state
+        key = {
+            'user_id': sale.user_id,
+            'product_id': product_id,
+            'day': timezone.localdate(sale.transaction_date),
+            'status': status,
+            'payment_method': payment_method,
+        }
+        totals = {
+            'transactions': F('transactions') + sign,
+            'units': F('units') + sign * quantity,
+            'revenue': F('revenue') + sign * total_price,
+        }
+        if cls.objects.filter(**key).update(**totals) or sign < 0:
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(**key, transactions=1, units=quantity, revenue=total_price)
+        except IntegrityError:
+            # Another request created the bucket first
+            cls.objects.filter(**key).update(**totals)
+
+class Job(models.Model):
+    """
+    A queued call of a function registered with ``@task`` (see api/jobs.py).
+    Rows are claimed by ``manage.py run_worker`` and deleted once the task
+    succeeds; jobs that ran out of attempts stay behind as 'failed'.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    name = models.CharField(max_length=200)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='job_status_run_at_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.id} ({self.status})'
+
+
+class IdempotencyKey(models.Model):
+    """
+    A client's Idempotency-Key with a fingerprint of the request it came with
+    and the response that request got, replayed to retries until
+    ``expires_at`` (see api/idempotency.py).
+    """
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='idempotency_key_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['expires_at'], name='idempotency_key_expires_idx'),
+        ]
 
     def __str__(self):
-        return f'Transaction {self.id} by {self.customer}'
\ No newline at end of file
+        return f'{self.user_id}:{self.key}'
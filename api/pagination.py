@@ -0,0 +1,43 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+# Upper bound for client-selected page sizes (?page_size=)
+MAX_PAGE_SIZE = 100
+
+
+class ProductPageNumberPagination(PageNumberPagination):
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_PAGE_SIZE
+
+
+class ProductCursorPagination(CursorPagination):
+    """
+    Keyset pagination for product listings.
+
+    Each page is a single indexed range scan on (user, id) or
+    (user, updated_at, id), so deep pages cost the same as the first one
+    and no COUNT(*) is issued.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_PAGE_SIZE
+    ordering = ('id',)
+
+    # Orderings a client may request with ?ordering=
+    ORDERINGS = {
+        'id': ('id',),
+        '-id': ('-id',),
+        'updated_at': ('updated_at', 'id'),
+        '-updated_at': ('-updated_at', '-id'),
+    }
+
+    def get_ordering(self, request, queryset, view):
+        return self.ORDERINGS.get(request.query_params.get('ordering'), self.ordering)
+
+
+class TransactionCursorPagination(CursorPagination):
+    """Keyset pagination for transaction listings, newest first."""
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_PAGE_SIZE
+    ordering = ('-transaction_date', '-id')
@@ -0,0 +1,18 @@
+"""
+PDF rendering entry point for worker processes. Kept free of Django imports
+so a freshly spawned worker can import it without settings.
+"""
+import os
+
+
+def render_pdf(html, path):
+    """Render ``html`` with xhtml2pdf and atomically move the result to ``path``."""
+    from xhtml2pdf import pisa
+
+    partial = f'{path}.{os.getpid()}.part'
+    with open(partial, 'wb') as output:
+        result = pisa.CreatePDF(html, dest=output)
+    if result.err:
+        os.remove(partial)
+        raise RuntimeError(f'xhtml2pdf reported {result.err} error(s) rendering {path}')
+    os.replace(partial, path)
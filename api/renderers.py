@@ -0,0 +1,51 @@
+"""
+JSON rendering through orjson when it is installed, with the stdlib json
+module as a fallback. Types orjson doesn't know natively (Decimal, lazy
+strings...) and datetimes go through the same encoder as before, so the
+output matches DRF's JSONRenderer and Django's JsonResponse.
+"""
+import json
+import logging
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - listed in requirements.txt
+    orjson = None
+    logger.warning('orjson is not installed; rendering JSON with the slower stdlib json module.')
+
+
+def dumps(data, encoder=JSONEncoder):
+    """Compact UTF-8 JSON bytes for ``data``; ``encoder`` handles non-native types."""
+    if orjson is not None:
+        return orjson.dumps(data, default=encoder().default,
+                            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, cls=encoder, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer using orjson for compact output; indented requests go through DRF's own path."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data, self.encoder_class)
+
+
+class FastJsonResponse(HttpResponse):
+    """Drop-in for django.http.JsonResponse rendered by ``dumps``."""
+
+    def __init__(self, data, encoder=DjangoJSONEncoder, safe=True, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError('In order to allow non-dict objects to be serialized set the safe parameter to False.')
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=dumps(data, encoder), **kwargs)
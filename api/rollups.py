@@ -0,0 +1,30 @@
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def rebuild_daily_sales(transaction_model, daily_sales_model, user_ids=None, batch_size=1000):
+    """
+    Recompute the DailySales rollup from raw transactions, for all sellers or
+    only ``user_ids``. Models are passed in so migrations can use their
+    historical versions. Returns the number of rollup rows written.
+    """
+    sales = transaction_model.objects.all()
+    rollups = daily_sales_model.objects.all()
+    if user_ids is not None:
+        sales = sales.filter(user_id__in=user_ids)
+        rollups = rollups.filter(user_id__in=user_ids)
+
+    buckets = (sales
+               .annotate(day=TruncDate('transaction_date'))
+               .values('user_id', 'product_id', 'day', 'status', 'payment_method')
+               .annotate(transactions=Count('id'), units=Sum('quantity'), revenue=Sum('total_price'))
+               .order_by())
+
+    with transaction.atomic():
+        rollups.delete()
+        rows = daily_sales_model.objects.bulk_create(
+            (daily_sales_model(**bucket) for bucket in buckets.iterator(chunk_size=batch_size)),
+            batch_size=batch_size,
+        )
+    return len(rows)
@@ -0,0 +1,159 @@
+"""
+Read replicas: serve the safe reads of listing and reporting views from a
+replica database (DATABASE_REPLICAS), keeping that load off the primary.
+
+Writes always go to the primary. Reads go to a replica only during a GET or
+HEAD of a view that opts in -- ReplicaReadsMixin for DRF views,
+``replica_reads = True`` on an async view -- so reads inside write requests
+(stock checks, uniqueness lookups, idempotency keys) never see a lagging copy.
+Streamed bodies are read after the view returns; wrap their iterators in
+use_read_alias (ause_read_alias) to keep them on the view's database.
+
+Read-your-writes: a successful write request pins its user to the primary
+for READ_YOUR_WRITES_SECONDS, so the listings they load right after a change
+include it. Other users may see the change only once it has replicated.
+Cached listings are per seller and only that seller's writes invalidate
+them, so the pin also keeps a lagging replica from refilling their cache
+with the old rows.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+# The database the current request reads from; None means the primary
+_read_alias = ContextVar('read_alias', default=None)
+
+
+def _pin_key(user_id):
+    return f'replica:pinned:{user_id}'
+
+
+def pin_to_primary(user_id):
+    """Send ``user_id``'s reads to the primary for the next READ_YOUR_WRITES_SECONDS."""
+    cache.set(_pin_key(user_id), True, settings.READ_YOUR_WRITES_SECONDS)
+
+
+def read_alias(user_id):
+    """A replica for ``user_id``'s safe reads, or None when there is none or they recently wrote."""
+    if not settings.DATABASE_REPLICAS or cache.get(_pin_key(user_id)):
+        return None
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+async def aread_alias(user_id):
+    if not settings.DATABASE_REPLICAS or await cache.aget(_pin_key(user_id)):
+        return None
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+@contextmanager
+def reads_from(alias):
+    """Route the block's reads to ``alias`` (None: the primary)."""
+    token = _read_alias.set(alias)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def use_read_alias(iterator):
+    """
+    Iterate ``iterator`` reading from the database the current request reads
+    from. Streamed response bodies are consumed after dispatch has reset it.
+    """
+    # Captured now: the generators below only start running once iterated
+    return _stream_from(_read_alias.get(), iter(iterator))
+
+
+def ause_read_alias(iterator):
+    return _astream_from(_read_alias.get(), aiter(iterator))
+
+
+def _stream_from(alias, iterator):
+    while True:
+        # Bound only around each step, so nothing else in the thread sees it
+        with reads_from(alias):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+async def _astream_from(alias, iterator):
+    while True:
+        with reads_from(alias):
+            try:
+                item = await anext(iterator)
+            except StopAsyncIteration:
+                return
+        yield item
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        # Explicit, or saving an instance read from a replica would write to it
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+
+class ReplicaReadsMixin:
+    """For DRF views whose GETs may read from a replica."""
+
+    def dispatch(self, request, *args, **kwargs):
+        with reads_from(None):
+            return super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        # After authentication and permission checks, which stay on the primary
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS:
+            _read_alias.set(read_alias(request.user.id))
+
+
+class ReadYourWritesMiddleware:
+    """Pin the user of every successful write request to the primary (see pin_to_primary)."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if self.is_write(request, response):
+            self.pin(request)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if self.is_write(request, response):
+            # request.user may still be the lazy session user, which loads synchronously
+            await sync_to_async(self.pin)(request)
+        return response
+
+    @staticmethod
+    def is_write(request, response):
+        return bool(settings.DATABASE_REPLICAS) and request.method not in SAFE_METHODS and response.status_code < 400
+
+    @staticmethod
+    def pin(request):
+        # DRF views set request.user once they authenticate the JWT
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            pin_to_primary(user.id)
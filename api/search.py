@@ -0,0 +1,152 @@
+"""
+Product search: ranked full-text search over name/description and prefix
+typeahead on SKU/name.
+
+PostgreSQL uses a tsvector GIN index and text_pattern_ops expression indexes,
+SQLite an FTS5 table kept in sync by triggers. Other databases (or SQLite
+builds without FTS5) fall back to unindexed LIKE queries. The index helpers
+are also called from migrations, so they only take the schema editor and model.
+"""
+from django.db import connection
+from django.db.models import F, Index, Q
+from django.db.models.functions import Upper
+
+from .models import Product
+
+SEARCH_CONFIG = 'english'
+FTS_TABLE = 'api_product_fts'
+
+_SQLITE_FTS_SQL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        product_name, sku, description, content='api_product', content_rowid='id',
+        tokenize="unicode61 tokenchars '-_'", prefix='1 2 3')""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON api_product BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, product_name, sku, description)
+        VALUES (new.id, new.product_name, new.sku, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON api_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, product_name, sku, description)
+        VALUES ('delete', old.id, old.product_name, old.sku, old.description);
+    END""",
+    # Only reindex when searchable columns change, not on every stock update
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF product_name, sku, description
+        ON api_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, product_name, sku, description)
+        VALUES ('delete', old.id, old.product_name, old.sku, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, product_name, sku, description)
+        VALUES (new.id, new.product_name, new.sku, new.description);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+
+def _postgres_indexes():
+    from django.contrib.postgres.indexes import GinIndex, OpClass
+    from django.contrib.postgres.search import SearchVector
+
+    return [
+        GinIndex(SearchVector('product_name', 'description', config=SEARCH_CONFIG), name='product_search_vector_idx'),
+        Index(F('user'), OpClass(Upper('sku'), name='text_pattern_ops'), name='product_sku_prefix_idx'),
+        Index(F('user'), OpClass(Upper('product_name'), name='text_pattern_ops'), name='product_name_prefix_idx'),
+    ]
+
+
+def install_search_indexes(schema_editor, model):
+    """
+    Create the search indexes for the current database. Idempotent on SQLite,
+    where migrations that rebuild api_product drop the triggers and must call
+    this again.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for index in _postgres_indexes():
+            schema_editor.add_index(model, index)
+    elif vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute('SELECT sqlite_compileoption_used(%s)', ['ENABLE_FTS5'])
+            if not cursor.fetchone()[0]:
+                return
+        for statement in _SQLITE_FTS_SQL:
+            schema_editor.execute(statement)
+
+
+def remove_search_indexes(schema_editor, model):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for index in _postgres_indexes():
+            schema_editor.remove_index(model, index)
+    elif vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')  # drops its triggers too
+
+
+def _has_fts():
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+        return cursor.fetchone() is not None
+
+
+def _fts_match(columns, text):
+    """Build an FTS5 MATCH expression from user input, quoting every term."""
+    terms = ['"%s"' % term.replace('"', '""') for term in text.split()]
+    return '{%s} : (%s)' % (' '.join(columns), ' '.join(terms))
+
+
+def _fts_prefix_match(columns, text):
+    """An FTS5 MATCH expression for columns that start with ``text`` (^ anchors to a column's first token)."""
+    return '{%s} : (^"%s"*)' % (' '.join(columns), text.replace('"', '""'))
+
+
+def _fts_ids(user_id, match, limit, ranked=True):
+    # Unranked queries can stop at the first ``limit`` hits instead of scoring every match.
+    # CROSS JOIN pins the join order: walk the FTS matches, then check the owner.
+    order = f'ORDER BY {FTS_TABLE}.rank' if ranked else ''
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT p.id FROM {FTS_TABLE} CROSS JOIN api_product p ON p.id = {FTS_TABLE}.rowid '
+            f'WHERE {FTS_TABLE} MATCH %s AND p.user_id = %s {order} LIMIT %s',
+            [match, user_id, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search_products(user_id, text, limit):
+    """The seller's products best matching ``text``, most relevant first."""
+    products = Product.objects.filter(user_id=user_id)
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+        vector = SearchVector('product_name', 'description', config=SEARCH_CONFIG)
+        query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+        return list(products.annotate(search=vector).filter(search=query)
+                    .annotate(rank=SearchRank(vector, query)).order_by('-rank', 'id')[:limit])
+    if _has_fts():
+        ids = _fts_ids(user_id, _fts_match(['product_name', 'description'], text), limit)
+        found = products.in_bulk(ids)
+        return [found[product_id] for product_id in ids if product_id in found]
+
+    matches = Q()
+    for term in text.split():
+        matches &= Q(product_name__icontains=term) | Q(description__icontains=term)
+    return list(products.filter(matches).order_by('product_name')[:limit])
+
+
+def _starts_with(products, text):
+    # Upper() matches the text_pattern_ops expression indexes on PostgreSQL
+    prefix = text.upper()
+    return (products.annotate(sku_upper=Upper('sku'), name_upper=Upper('product_name'))
+            .filter(Q(sku_upper__startswith=prefix) | Q(name_upper__startswith=prefix)))
+
+
+def typeahead(user_id, text, limit):
+    """Up to ``limit`` of the seller's products whose SKU or name starts with ``text``."""
+    products = Product.objects.filter(user_id=user_id)
+    if _has_fts():
+        ids = _fts_ids(user_id, _fts_prefix_match(['product_name', 'sku'], text), limit, ranked=False)
+        # FTS ignores the punctuation between tokens; keep to exact prefixes like the other backends
+        found = {row['id']: row for row in _starts_with(products.filter(id__in=ids), text)
+                 .values('id', 'product_name', 'sku')}
+        return [found[product_id] for product_id in ids if product_id in found]
+
+    return list(_starts_with(products, text).order_by('product_name').values('id', 'product_name', 'sku')[:limit])
@@ -0,0 +1,99 @@
+"""
+Synthetic dataset generator for benchmarks and local load testing.
+
+Everything is written with bulk_create and a fixed random seed, so the same
+arguments produce the same data. bulk_create skips Transaction.save(), so the
+DailySales rollup is rebuilt for the seeded sellers at the end.
+"""
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .models import Category, DailySales, Product, Transaction, UserProfile
+from .rollups import rebuild_daily_sales
+
+SEED_PASSWORD = 'seed-pass'
+
+CATEGORY_NAMES = ('Shampoo', 'Conditioner', 'Hair Oil', 'Serum', 'Hair Mask', 'Styling', 'Wigs', 'Extensions',
+                  'Brushes', 'Accessories', 'Color', 'Scalp Care')
+PRODUCT_WORDS = ('Silk', 'Argan', 'Keratin', 'Coconut', 'Repair', 'Volume', 'Smooth', 'Shine', 'Curl', 'Gloss',
+                 'Herbal', 'Rose', 'Tea Tree', 'Biotin', 'Onion', 'Aloe')
+CUSTOMERS = ('Asha', 'Bikash', 'Chandra', 'Deepa', 'Elina', 'Gita', 'Hari', 'Isha', 'Kiran', 'Laxmi', 'Manish',
+             'Nisha', 'Prakash', 'Rita', 'Sagar', 'Sita')
+STATUS_WEIGHTS = {'completed': 85, 'pending': 10, 'failed': 5}
+
+
+@contextmanager
+def manual_transaction_dates():
+    """Let bulk_create keep the transaction_date we set instead of auto_now_add's now()."""
+    field = Transaction._meta.get_field('transaction_date')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def seed(users=10, products=2000, transactions=100000, days=365, prefix='seed', batch_size=5000, rng_seed=0):
+    """
+    Create ``users`` sellers (with profiles, all using SEED_PASSWORD), each
+    with ``products`` products and ``transactions`` sales spread over the
+    last ``days`` days. Returns the created users.
+    """
+    rng = random.Random(rng_seed)
+    now = timezone.now()
+    payment_methods = [choice for choice, _ in Transaction.PAYMENT_METHOD_CHOICES]
+    statuses, weights = zip(*STATUS_WEIGHTS.items())
+
+    with transaction.atomic():
+        Category.objects.bulk_create(
+            [Category(name=name, slug=slugify(name), path=f'{slugify(name)}/') for name in CATEGORY_NAMES],
+            ignore_conflicts=True)
+        category_ids = list(Category.objects.filter(name__in=CATEGORY_NAMES).values_list('id', flat=True))
+
+        password = make_password(SEED_PASSWORD)  # hash once, not once per user
+        sellers = User.objects.bulk_create(
+            User(username=f'{prefix}-{n}', email=f'{prefix}-{n}@seed.local', password=password)
+            for n in range(users))
+        if not all(seller.pk for seller in sellers):  # backends that don't return IDs from bulk inserts
+            sellers = list(User.objects.filter(username__startswith=f'{prefix}-').order_by('id'))
+        UserProfile.objects.bulk_create(
+            UserProfile(user=seller, business_name=f'{seller.username} Hair Store', is_verify=True)
+            for seller in sellers)
+
+        for seller in sellers:
+            Product.objects.bulk_create(
+                (Product(user=seller, category_id=rng.choice(category_ids), sku=f'{seller.username}-{i:07d}',
+                         product_name=f'{" ".join(rng.sample(PRODUCT_WORDS, 2))} {i}',
+                         description=' '.join(rng.sample(PRODUCT_WORDS, 6)),
+                         unit_price=Decimal(rng.randint(199, 9999)) / 100, quantity=rng.randint(0, 500),
+                         date_added=now)
+                 for i in range(products)),
+                batch_size=batch_size,
+            )
+            catalog = list(Product.objects.filter(user=seller).values_list('id', 'unit_price'))
+            if not catalog:
+                continue
+
+            def sales():
+                for _ in range(transactions):
+                    product_id, unit_price = rng.choice(catalog)
+                    quantity = rng.randint(1, 5)
+                    yield Transaction(
+                        user=seller, product_id=product_id, quantity=quantity, total_price=unit_price * quantity,
+                        customer=rng.choice(CUSTOMERS), email=f'customer{rng.randint(1, 5000)}@seed.local',
+                        status=rng.choices(statuses, weights)[0], payment_method=rng.choice(payment_methods),
+                        transaction_date=now - timedelta(seconds=rng.randint(0, days * 86400)))
+
+            with manual_transaction_dates():
+                Transaction.objects.bulk_create(sales(), batch_size=batch_size)
+
+        rebuild_daily_sales(Transaction, DailySales, user_ids=[seller.pk for seller in sellers])
+    return sellers
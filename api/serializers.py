@@ -1,6 +1,15 @@
+import decimal
+
 from django.contrib.auth.models import User
-from rest_framework import serializers
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.settings import ISO_8601, api_settings
 from .models import UserProfile, Product, Transaction
+from .cache import invalidate_product_list
+from .tasks import send_low_stock_alert, send_receipt
 
 class UserProfileSerializer(serializers.ModelSerializer):
     class Meta:
@@ -21,13 +30,129 @@ class UserSerializer(serializers.ModelSerializer):
         UserProfile.objects.create(user=user, **profile_data)
         return user
 
-class ProductSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """
+    Partial responses for ``?fields=a,b``: a serializer created with
+    ``fields=[...]`` only renders those fields. ``MODEL_FIELDS`` maps a
+    serializer field to the model fields it reads, for QuerySet.only().
+    """
+    MODEL_FIELDS = {}
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def requested_fields(cls, query_params):
+        """The validated ``fields`` parameter as a list, or None when absent."""
+        value = query_params.get('fields')
+        if not value:
+            return None
+        fields = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = [name for name in fields if name not in cls.Meta.fields]
+        if unknown or not fields:
+            raise ValidationError({'fields': f'Unknown field(s): {", ".join(unknown)}. '
+                                             f'Choose from: {", ".join(cls.Meta.fields)}.'})
+        return fields
+
+    @classmethod
+    def only_fields(cls, fields=None):
+        """Model fields to load for ``fields`` (default: every serializer field)."""
+        return [column for name in fields or cls.Meta.fields for column in cls.MODEL_FIELDS.get(name, (name,))]
+
+class RowSerializer:
+    """
+    Read-only fast path for a SparseFieldsMixin serializer. Rows come from
+    ``.values()`` and each field gets one precomputed converter, instead of
+    DRF building and walking field objects for every instance; the output is
+    the same as ``serializer_class(instance).data``. ``VALUE_SOURCES`` on the
+    serializer maps fields whose value lives elsewhere (e.g. a related name).
+    """
+
+    def __init__(self, serializer_class, fields=None):
+        sources = getattr(serializer_class, 'VALUE_SOURCES', {})
+        declared = serializer_class(fields=fields).fields
+        self.columns = [(name, sources.get(name, name), self.converter(field)) for name, field in declared.items()]
+
+    @staticmethod
+    def converter(field):
+        """A function rendering a non-null value like ``field`` does, or None when it's returned as is."""
+        if isinstance(field, serializers.DecimalField) and field.decimal_places is not None and not (
+                field.localize or field.normalize_output or not getattr(field, 'coerce_to_string', True)):
+            exponent = decimal.Decimal(1).scaleb(-field.decimal_places)
+            context = decimal.Context(prec=field.max_digits, rounding=field.rounding)
+            return lambda value: format(value.quantize(exponent, context=context), 'f')
+        if isinstance(field, serializers.DateTimeField) and getattr(field, 'format', api_settings.DATETIME_FORMAT) \
+                == ISO_8601 and field.default_timezone() is not None:
+            tz = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+
+            def iso(value):
+                text = value.astimezone(tz).isoformat()
+                return text[:-6] + 'Z' if text.endswith('+00:00') else text
+            return iso
+        if isinstance(field, (serializers.CharField, serializers.IntegerField, serializers.ChoiceField,
+                              serializers.PrimaryKeyRelatedField, serializers.StringRelatedField)):
+            return None  # already a str/int straight from the database
+        return field.to_representation
+
+    def values(self, queryset, *extra):
+        """``queryset`` as dict rows with the columns needed here, plus ``extra`` ones (e.g. cursor fields)."""
+        return queryset.values(*dict.fromkeys([source for _, source, _ in self.columns] + list(extra)))
+
+    def to_representation(self, row):
+        data = {}
+        for name, source, convert in self.columns:
+            value = row[source]
+            data[name] = value if convert is None or value is None else convert(value)
+        return data
+
+    def many(self, rows):
+        return [self.to_representation(row) for row in rows]
+
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Product
+        fields = ['id', 'user', 'product_name', 'category', 'sku', 'unit_price', 'quantity', 'reorder_level',
+                  'description']
+
+class ProductBulkSerializer(serializers.ModelSerializer):
+    """
+    Row serializer for bulk upserts. Category existence and SKU/name
+    uniqueness are checked once per batch by ApiProductBulkView, so
+    validating a row issues no queries.
+    """
+    category = serializers.IntegerField(source='category_id')
+    sku = serializers.CharField(max_length=50)
+
     class Meta:
         model = Product
-        fields = ['id', 'user', 'product_name', 'category', 'sku', 'unit_price', 'quantity', 'description']
+        fields = ['product_name', 'category', 'sku', 'unit_price', 'quantity', 'reorder_level', 'description']
+
+class OutOfStock(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Not enough stock for this product.'
+
+class TransactionProductField(serializers.PrimaryKeyRelatedField):
+    """Accepts one of the seller's product IDs and displays the product name."""
+
+    def use_pk_only_optimization(self):
+        return False
+
+    def to_representation(self, value):
+        return str(value)
 
-class TransactionSerializer(serializers.ModelSerializer):
-    product = serializers.StringRelatedField()  # Display product name instead of ID
+    def get_queryset(self):
+        products = Product.objects.only('id', 'user_id', 'product_name', 'unit_price', 'quantity', 'reorder_level')
+        request = self.context.get('request')
+        return products.filter(user=request.user) if request else products
+
+class TransactionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    product = TransactionProductField()  # Display product name instead of ID
+
+    MODEL_FIELDS = {'product': ('product', 'product__product_name')}
+    VALUE_SOURCES = {'product': 'product__product_name'}
 
     class Meta:
         model = Transaction
@@ -43,4 +168,34 @@ class TransactionSerializer(serializers.ModelSerializer):
             'payment_method',
             'transaction_date'
         ]
-        read_only_fields = ['id', 'user', 'transaction_date']
\ No newline at end of file
+        read_only_fields = ['id', 'user', 'total_price', 'transaction_date']
+        extra_kwargs = {'quantity': {'min_value': 1}}
+
+    def create(self, validated_data):
+        product = validated_data['product']
+        quantity = validated_data['quantity']
+
+        with transaction.atomic():
+            # Failed payments don't consume stock
+            if validated_data.get('status') != 'failed':
+                # Conditional decrement: concurrent buyers of the same product can't oversell it
+                reserved = Product.objects.filter(id=product.id, quantity__gte=quantity).update(
+                    quantity=F('quantity') - quantity, updated_at=timezone.now())
+                if not reserved:
+                    raise OutOfStock()
+                invalidate_product_list(product.user_id)
+                # Alert once, on the sale that crosses the reorder level. Compare the level
+                # this decrement left, not the one validation read: the row stays locked
+                # until commit, so no other sale can come between the update and this read.
+                left, reorder_level = (Product.objects.select_for_update().filter(id=product.id)
+                                       .values_list('quantity', 'reorder_level').get())
+                if left + quantity > reorder_level >= left:
+                    send_low_stock_alert.delay(product.id)
+
+            # Price is computed server-side from the product's unit price
+            validated_data['total_price'] = product.unit_price * quantity
+            sale = super().create(validated_data)
+            # Queued in the same transaction, so a rolled-back sale sends no receipt
+            if sale.status != 'failed':
+                send_receipt.delay(sale.id)
+            return sale
@@ -0,0 +1,114 @@
+"""
+Delta sync: the products, transactions and deletions a client hasn't seen yet.
+
+A sync token is an opaque cursor holding one ``(timestamp, id)`` position
+per stream: products and transactions by ``updated_at``, tombstones by
+``deleted_at``. Each stream is read as a keyset range on its
+``(user, <timestamp>, id)`` index. Timestamps are set when a row is saved,
+not when its transaction commits, so once a stream is caught up its
+position is held SYNC_OVERLAP_SECONDS behind the clock: a row saved just
+before one sync but committed after it is sent by the next one. Delivery is
+at-least-once, and clients apply changes by id. A deleted product's
+transactions are deleted with it and only reported through its tombstone.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Product, Tombstone, Transaction
+from .serializers import ProductSerializer, RowSerializer, TransactionSerializer
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+class InvalidSyncToken(ValueError):
+    pass
+
+
+class ExpiredSyncToken(InvalidSyncToken):
+    """The token predates the oldest tombstones still kept; the client must sync from scratch."""
+
+
+def encode_token(positions):
+    payload = {stream: [stamp.isoformat(), last_id] for stream, (stamp, last_id) in positions.items()}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+
+
+def decode_token(token):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+        positions = {stream: (parse_datetime(payload[stream][0]), int(payload[stream][1])) for stream in STREAMS}
+    except (binascii.Error, UnicodeError, ValueError, TypeError, KeyError, IndexError):
+        raise InvalidSyncToken('Invalid sync token.')
+    if any(stamp is None or timezone.is_naive(stamp) for stamp, _ in positions.values()):
+        raise InvalidSyncToken('Invalid sync token.')
+    if positions['deleted'][0] < timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_DAYS):
+        raise ExpiredSyncToken('Sync token expired, start a full sync.')
+    return positions
+
+
+# stream: (model, timestamp column, serializer of its rows; None for tombstones)
+STREAMS = {
+    'products': (Product, 'updated_at', ProductSerializer),
+    'transactions': (Transaction, 'updated_at', TransactionSerializer),
+    'deleted': (Tombstone, 'deleted_at', None),
+}
+
+
+def _render_deleted(rows):
+    deleted = {'products': [], 'transactions': []}
+    for row in rows:
+        deleted[f'{row["kind"]}s'].append(row['object_id'])
+    return deleted
+
+
+def _read(user_id, stream, since, limit):
+    """Up to ``limit + 1`` of the stream's rows after position ``since``, and the function rendering them."""
+    model, column, serializer_class = STREAMS[stream]
+    stamp, last_id = since
+    # >= plus an exclusion keeps the index range scan that an OR of the two conditions may lose
+    queryset = (model.objects.filter(user_id=user_id, **{f'{column}__gte': stamp})
+                .exclude(**{column: stamp, 'id__lte': last_id}).order_by(column, 'id'))
+    if serializer_class is None:
+        return list(queryset.values(column, 'id', 'kind', 'object_id')[:limit + 1]), _render_deleted
+    rows = RowSerializer(serializer_class)
+    return list(rows.values(queryset, column, 'id')[:limit + 1]), rows.many
+
+
+def changes(user_id, token=None, limit=None):
+    """
+    Everything that changed for the seller after ``token`` (from the start
+    without one), at most ``limit`` rows per stream, and the token for the
+    next call. ``has_more`` asks the client to call again right away.
+    """
+    limit = limit or settings.SYNC_PAGE_SIZE
+    now = timezone.now()
+    if token:
+        positions = decode_token(token)
+    else:
+        # A fresh client has nothing to delete: only deletions from now on matter
+        positions = {'products': (EPOCH, 0), 'transactions': (EPOCH, 0), 'deleted': (now, 0)}
+    settled = now - timedelta(seconds=settings.SYNC_OVERLAP_SECONDS)
+
+    result, has_more = {}, False
+    for stream, (_, column, _) in STREAMS.items():
+        page, render = _read(user_id, stream, positions[stream], limit)
+        if len(page) > limit:
+            page = page[:limit]
+            positions[stream] = (page[-1][column], page[-1]['id'])
+            has_more = True
+        else:
+            positions[stream] = (settled, 0)
+        result[stream] = render(page)
+    return {**result, 'next': encode_token(positions), 'has_more': has_more}
+
+
+def purge_tombstones():
+    """Delete tombstones older than SYNC_TOMBSTONE_DAYS; tokens that old are rejected anyway."""
+    cutoff = timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_DAYS)
+    return Tombstone.objects.filter(deleted_at__lt=cutoff).delete()[0]
@@ -0,0 +1,83 @@
+"""Background tasks queued by the views; run by ``manage.py run_worker``."""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.mail import EmailMessage, send_mail
+from django.template.loader import render_to_string
+
+from .inventory import next_snapshot_time, take_snapshot
+from .jobs import task
+from .models import DailySales, Product, Transaction
+from .rollups import rebuild_daily_sales
+
+
+@task(max_attempts=5)
+def send_welcome_email(user_id):
+    user = User.objects.get(id=user_id)
+    send_mail(
+        'Welcome to SilkHair',
+        f'Hi {user.username},\n\nYour SilkHair seller account is ready. Sign in with {user.email}.\n',
+        settings.DEFAULT_FROM_EMAIL,
+        [user.email],
+    )
+
+
+@task(max_attempts=5)
+def send_receipt(transaction_id):
+    """Email the customer a receipt with the invoice PDF attached."""
+    from io import BytesIO
+
+    from xhtml2pdf import pisa
+
+    sale = Transaction.objects.select_related('product', 'user__profile').filter(id=transaction_id).first()
+    if sale is None:  # deleted before the worker got to it
+        return
+    seller = sale.user
+    invoice = BytesIO()
+    html = render_to_string('api/invoice.html', {'seller': seller, 'sale': sale})
+    if pisa.CreatePDF(html, dest=invoice).err:
+        raise RuntimeError(f'Could not render the invoice for transaction {sale.id}')
+
+    message = EmailMessage(
+        f'Your receipt #{sale.id}',
+        f'Hi {sale.customer},\n\nThank you for your purchase of {sale.quantity} x {sale.product.product_name} '
+        f'({sale.total_price}). Your invoice is attached.\n',
+        settings.DEFAULT_FROM_EMAIL,
+        [sale.email],
+    )
+    message.attach(f'invoice-{sale.id}.pdf', invoice.getvalue(), 'application/pdf')
+    message.send()
+
+
+@task()
+def rebuild_sales_rollups(user_ids=None):
+    rebuild_daily_sales(Transaction, DailySales, user_ids=user_ids)
+
+
+@task(max_attempts=5)
+def send_low_stock_alert(product_id):
+    """Tell the seller a sale took a product down to its reorder level."""
+    product = Product.objects.select_related('user').filter(id=product_id).first()
+    if product is None or not product.is_low_stock:  # deleted or restocked in the meantime
+        return
+    send_mail(
+        f'Low stock: {product.product_name}',
+        f'Hi {product.user.username},\n\n{product.product_name} ({product.sku}) is down to {product.quantity} '
+        f'unit(s), at or below its reorder level of {product.reorder_level}.\n',
+        settings.DEFAULT_FROM_EMAIL,
+        [product.user.email],
+    )
+
+
+@task()
+def snapshot_inventory(reschedule=False):
+    """Record today's stock levels; with ``reschedule``, queue the same run for next midnight."""
+    # Queue tomorrow's run first, so a run that ends up failing doesn't end the chain
+    if reschedule:
+        schedule_inventory_snapshots()
+    take_snapshot()
+
+
+def schedule_inventory_snapshots():
+    """Queue the daily snapshot run unless one is already waiting."""
+    if not snapshot_inventory.is_scheduled():
+        snapshot_inventory.schedule(next_snapshot_time(), reschedule=True)
@@ -1,3 +1,1024 @@
-from django.test import TestCase
+import importlib
+import json
+import tempfile
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection, router, transaction
+from django.db.models import Sum
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import clear_url_caches, resolve
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import exports
+from .async_views import AsyncTransactionView
+from .authentication import StatelessJWTAuthentication
+from .inventory import take_snapshot
+from .jobs import run_pending, task
+from .models import Category, DailySales, Job, Product, Tombstone, Transaction
+from .rollups import rebuild_daily_sales
+from .routers import ause_read_alias, read_alias, reads_from, use_read_alias
+from .renderers import FastJSONRenderer
+from .seed import SEED_PASSWORD, seed
+from .serializers import ProductSerializer, RowSerializer, TransactionSerializer
+from .sync import encode_token
+from .throttling import consume
+from .tasks import snapshot_inventory
+
+
+class SellerTestCase(APITestCase):
+    """A signed-in seller with a category, plus helpers to add their products and sales."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='seller', email='seller@example.com', password='secret-pass')
+        self.category = Category.objects.create(name='Hair')
+        self.client.force_authenticate(user=self.user)
+
+    def add_products(self, count):
+        # bulk_create bypasses Product.save(), so drop cached listings by hand
+        cache.clear()
+        start = Product.objects.count()
+        Product.objects.bulk_create(
+            Product(user=self.user, category=self.category, product_name=f'Product {i}', sku=f'SKU-{i}',
+                    unit_price=Decimal('10.00'), quantity=50)
+            for i in range(start, start + count)
+        )
+
+    def add_transactions(self, count):
+        self.add_products(count)
+        products = Product.objects.filter(user=self.user).order_by('-id')[:count]
+        Transaction.objects.bulk_create(
+            Transaction(user=self.user, customer='Customer', email='customer@example.com', product=product,
+                        quantity=1, total_price=product.unit_price, status='completed')
+            for product in products
+        )
+
+    def count_queries(self, method, url, data=None, expected_status=200):
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data, format='json')
+        self.assertEqual(response.status_code, expected_status, getattr(response, 'data', None))
+        return len(queries)
+
+    def assertConstantQueries(self, url, add_rows):
+        """The query count of GET ``url`` must not grow with the number of rows."""
+        add_rows(1)
+        few = self.count_queries('get', url)
+        add_rows(20)
+        many = self.count_queries('get', url)
+        self.assertEqual(few, many, f'GET {url} issues {few} queries for 1 row but {many} for 21')
+
+
+class QueryCountTestCase(SellerTestCase):
+    """
+    Query-count regression harness for the views in api/views.py.
+
+    List endpoints must issue the same number of queries whatever the number
+    of rows, so an N+1 shows up as a failing test instead of a slow page.
+    """
+
+    def test_product_list(self):
+        self.assertConstantQueries('/api/products/', self.add_products)
+
+    def test_product_cursor_list(self):
+        self.assertConstantQueries('/api/products/?pagination=cursor', self.add_products)
+
+    def test_transaction_list(self):
+        self.assertConstantQueries('/api/transactions/', self.add_transactions)
+
+    def test_transaction_cursor_list(self):
+        self.assertConstantQueries('/api/transactions/?pagination=cursor', self.add_transactions)
+
+    def test_transaction_stream(self):
+        self.assertConstantQueries('/api/transactions/?stream=ndjson', self.add_transactions)
+
+    def test_product_create(self):
+        data = {'product_name': 'New', 'category': self.category.id, 'sku': 'NEW-1',
+                'unit_price': '5.00', 'quantity': 3}
+        # name check, user and category lookups, sku uniqueness, insert
+        self.assertEqual(self.count_queries('post', '/api/products/', data, expected_status=201), 5)
+
+    def test_product_update(self):
+        self.add_products(1)
+        product = Product.objects.get(user=self.user)
+        # fetch, update
+        self.assertEqual(self.count_queries('put', f'/api/products/?id={product.id}', {'quantity': 7}), 2)
+
+    def test_product_delete(self):
+        self.add_transactions(1)
+        product = Product.objects.get(user=self.user)
+        # lookup, tombstone, then the product and its cascades
+        self.assertLessEqual(self.count_queries('delete', f'/api/products/?id={product.id}'), 6)
+
+    def test_product_bulk_upsert(self):
+        def payload(count):
+            return [{'product_name': f'Bulk {i}', 'category': self.category.id, 'sku': f'BULK-{i}',
+                     'unit_price': '5.00', 'quantity': i} for i in range(count)]
+
+        few = self.count_queries('post', '/api/products/bulk/', payload(1))
+        many = self.count_queries('post', '/api/products/bulk/', payload(50))
+        self.assertEqual(few, many)
+        self.assertEqual(Product.objects.filter(user=self.user).count(), 50)
+
+    def test_transaction_create(self):
+        self.add_products(1)
+        product = Product.objects.get(user=self.user)
+        data = {'customer': 'Customer', 'email': 'customer@example.com', 'product': product.id, 'quantity': 30}
+        # product lookup, then stock decrement and read-back, insert, a new DailySales bucket and the receipt job
+        self.assertEqual(self.count_queries('post', '/api/transactions/', data, expected_status=201), 11)
+
+        # Only 20 left: the second sale must be rejected without touching stock
+        self.count_queries('post', '/api/transactions/', data, expected_status=409)
+        product.refresh_from_db()
+        self.assertEqual(product.quantity, 20)
+        transaction = Transaction.objects.get(user=self.user)
+        self.assertEqual(transaction.total_price, Decimal('300.00'))
+
+    def test_sales_analytics(self):
+        self.assertConstantQueries('/api/analytics/sales/?period=month', self.add_transactions)
+        Transaction.objects.filter(user=self.user).update(status='completed')
+        rebuild_daily_sales(Transaction, DailySales)
+        self.assertEqual(len(self.client.get('/api/analytics/sales/?top=2').data['top_products']), 2)
+        self.assertEqual(self.client.get('/api/analytics/sales/?top=0').data['top_products'], [])
+        for top in ('-1', 'ten'):
+            response = self.client.get(f'/api/analytics/sales/?top={top}')
+            self.assertEqual((response.status_code, response.data['error']),
+                             (400, 'top must be a non-negative integer.'))
+
+    def test_daily_sales_rollup_matches_rebuild(self):
+        self.add_products(2)
+        first, second = Product.objects.filter(user=self.user)
+        for product, quantity in ((first, 2), (second, 1), (first, 3)):
+            self.client.post('/api/transactions/', {'customer': 'Customer', 'email': 'customer@example.com',
+                                                   'product': product.id, 'quantity': quantity}, format='json')
+        sale = Transaction.objects.filter(product=first).first()
+        sale.status = 'completed'
+        sale.save()
+
+        fields = ('product_id', 'status', 'payment_method', 'transactions', 'units', 'revenue')
+        incremental = set(DailySales.objects.filter(transactions__gt=0).values_list(*fields))
+        rebuild_daily_sales(Transaction, DailySales)
+        self.assertEqual(incremental, set(DailySales.objects.values_list(*fields)))
+
+    def test_product_list_cache(self):
+        self.add_products(3)
+        self.count_queries('get', '/api/products/')
+        # Served from cache, no product queries at all
+        self.assertEqual(self.count_queries('get', '/api/products/'), 0)
+
+        etag = self.client.get('/api/products/')['ETag']
+        response = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        product = Product.objects.filter(user=self.user).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(f'/api/products/?id={product.id}', {'quantity': 1}, format='json')
+        response = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['quantity'], 1)
+
+    def test_product_detail(self):
+        self.add_products(2)
+        product = Product.objects.filter(user=self.user).last()
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/products/{product.id}')
+        self.assertEqual(response.data['sku'], product.sku)
+        response = self.client.get(f'/api/products/{product.id}', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.client.get('/api/products/999999').status_code, 404)
+
+    def test_sparse_fields(self):
+        self.add_transactions(2)
+        response = self.client.get('/api/products/?fields=id,sku')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'sku'})
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/transactions/?pagination=cursor&fields=id,quantity,status')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'quantity', 'status'})
+        self.assertNotIn('api_product', queries[-1]['sql'])  # no join when the product isn't requested
+        self.assertNotIn('"customer"', queries[-1]['sql'])
+
+        response = self.client.get('/api/transactions/?fields=product,total_price')
+        self.assertEqual(set(response.data[0]), {'product', 'total_price'})
+        self.assertEqual(self.client.get('/api/transactions/?fields=password').status_code, 400)
+
+    def test_fast_serialization_matches_drf(self):
+        self.add_transactions(3)
+        Product.objects.filter(user=self.user).update(description='Crème ✨', unit_price=Decimal('12.3'))
+        for serializer_class, queryset in ((ProductSerializer, Product.objects.filter(user=self.user)),
+                                           (TransactionSerializer, Transaction.objects.filter(user=self.user))):
+            rows = RowSerializer(serializer_class)
+            expected = serializer_class(queryset.order_by('id'), many=True).data
+            fast = rows.many(rows.values(queryset.order_by('id')))
+            self.assertEqual(fast, expected)
+            self.assertEqual(FastJSONRenderer().render(fast), JSONRenderer().render(expected))
+
+
+class StockTestCase(SellerTestCase):
+
+    def test_sale_changes_move_stock(self):
+        self.add_products(2)
+        first, second = Product.objects.filter(user=self.user).order_by('id')
+        data = {'customer': 'Customer', 'email': 'customer@example.com', 'product': first.id, 'quantity': 5}
+        self.count_queries('post', '/api/transactions/', {**data, 'quantity': 0}, expected_status=400)
+        self.count_queries('post', '/api/transactions/', data, expected_status=201)
+        sale = Transaction.objects.get(user=self.user)
+
+        def stock():
+            return list(Product.objects.filter(user=self.user).order_by('id').values_list('quantity', flat=True))
+
+        self.assertEqual(stock(), [45, 50])
+        sale.quantity = 8
+        sale.save()
+        self.assertEqual(stock(), [42, 50])
+        sale.product = second
+        sale.save()
+        self.assertEqual(stock(), [50, 42])
+        sale.status = 'failed'
+        sale.save()
+        self.assertEqual(stock(), [50, 50])
+        sale.status = 'completed'
+        sale.quantity = 51
+        with self.assertRaises(ValidationError), transaction.atomic():
+            sale.save()
+        sale = Transaction.objects.get(id=sale.id)
+        self.assertEqual((sale.status, stock()), ('failed', [50, 50]))
+        sale.status = 'completed'
+        sale.save()
+        sale.delete()
+        self.assertEqual(stock(), [50, 50])
+
+
+class SearchTestCase(SellerTestCase):
+
+    def test_product_search_and_typeahead(self):
+        Product.objects.bulk_create([
+            Product(user=self.user, category=self.category, product_name='Argan Hair Oil', sku='OIL-001',
+                    description='Silky shine for dry hair', unit_price=Decimal('12.00'), quantity=5),
+            Product(user=self.user, category=self.category, product_name='Keratin Mask', sku='MSK-001',
+                    description='Repairs damaged hair overnight', unit_price=Decimal('20.00'), quantity=5),
+        ])
+        response = self.client.get('/api/products/search/?q=repairs damaged')
+        self.assertEqual([row['sku'] for row in response.data['results']], ['MSK-001'])
+
+        response = self.client.get('/api/products/typeahead/?q=oil-0')
+        self.assertEqual([row['sku'] for row in response.data['results']], ['OIL-001'])
+        response = self.client.get('/api/products/typeahead/?q=Kera')
+        self.assertEqual([row['product_name'] for row in response.data['results']], ['Keratin Mask'])
+        # Prefixes of the name or SKU only, not of a later word, whichever the database
+        response = self.client.get('/api/products/typeahead/?q=hair')
+        self.assertEqual(response.data['results'], [])
+        response = self.client.get('/api/products/typeahead/?q=argan ha')
+        self.assertEqual([row['sku'] for row in response.data['results']], ['OIL-001'])
+
+        self.assertEqual(self.client.get('/api/products/search/').status_code, 400)
+
+
+class CategoryTestCase(SellerTestCase):
+
+    def test_categories(self):
+        wigs = Category.objects.create(name='Wigs', parent=self.category)
+        lace = Category.objects.create(name='Lace Wigs', parent=wigs)
+        self.assertEqual(lace.path, 'hair/wigs/lace-wigs/')
+        self.add_products(2)
+        product = Product.objects.filter(user=self.user).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            product.category = lace
+            product.save()
+
+        rows = {row['slug']: row for row in self.client.get('/api/categories/').data}
+        self.assertEqual((rows['hair']['product_count'], rows['hair']['total_product_count']), (1, 2))
+        self.assertEqual((rows['wigs']['total_stock'], rows['lace-wigs']['depth']), (50, 2))
+        with self.assertNumQueries(0):
+            self.client.get('/api/categories/')
+
+        # Moving a category rewrites its subtree and invalidates the cached tree
+        with self.captureOnCommitCallbacks(execute=True):
+            wigs.parent = None
+            wigs.save()
+        self.assertEqual(Category.objects.get(pk=lace.pk).path, 'wigs/lace-wigs/')
+        rows = {row['slug']: row for row in self.client.get('/api/categories/').data}
+        self.assertEqual(rows['hair']['total_product_count'], 1)
+
+        response = self.client.get('/api/categories/wigs/products/?subtree=true')
+        self.assertEqual([row['id'] for row in response.data['results']], [product.id])
+        self.assertEqual(self.client.get('/api/categories/wigs/products/').data['count'], 0)
+        self.assertEqual(self.client.get('/api/categories/missing/products/').status_code, 404)
+
+
+class DeltaSyncTestCase(SellerTestCase):
+
+    def test_delta_sync(self):
+        self.add_transactions(3)
+        with self.settings(SYNC_OVERLAP_SECONDS=0):
+            seen = {'products': set(), 'transactions': set()}
+            url, has_more = '/api/sync/?limit=2', True
+            while has_more:
+                with self.assertNumQueries(3):  # one keyset range per stream
+                    data = self.client.get(url).data
+                for stream in seen:
+                    seen[stream].update(row['id'] for row in data[stream])
+                url, has_more = f'/api/sync/?since={data["next"]}', data['has_more']
+            self.assertEqual({stream: len(ids) for stream, ids in seen.items()}, {'products': 3, 'transactions': 3})
+
+            cascaded, sale, refund = Transaction.objects.filter(user=self.user).order_by('id')
+            refund_id = refund.id
+            cascaded.product.delete()  # its sale goes with it, without a tombstone of its own
+            refund.delete()
+            sale.status = 'failed'
+            sale.save()
+            data = self.client.get(url).data
+        # Failing or deleting a sale puts its units back, which changes the product too
+        self.assertEqual(sorted(row['id'] for row in data['products']), sorted([sale.product_id, refund.product_id]))
+        self.assertEqual([row['id'] for row in data['transactions']], [sale.id])
+        self.assertEqual(data['deleted'], {'products': [cascaded.product_id], 'transactions': [refund_id]})
+
+        self.assertEqual(self.client.get('/api/sync/?since=garbage').status_code, 400)
+        expired = encode_token({stream: (timezone.now() - timedelta(days=365), 0)
+                                for stream in ('products', 'transactions', 'deleted')})
+        self.assertEqual(self.client.get(f'/api/sync/?since={expired}').status_code, 410)
+
+
+class IdempotencyTestCase(SellerTestCase):
+
+    def test_idempotent_create(self):
+        self.add_products(1)
+        product = Product.objects.get(user=self.user)
+        sale = {'customer': 'Customer', 'email': 'customer@example.com', 'product': product.id, 'quantity': 2}
+        first = self.client.post('/api/transactions/', sale, format='json', HTTP_IDEMPOTENCY_KEY='sale-1')
+        self.assertEqual(first.status_code, 201)
+        with self.assertNumQueries(1):  # the stored response, no serializer or product queries
+            retry = self.client.post('/api/transactions/', dict(reversed(sale.items())), format='json',
+                                     HTTP_IDEMPOTENCY_KEY='sale-1')
+        self.assertEqual((retry.status_code, retry.data, retry['Idempotent-Replayed']), (201, first.data, 'true'))
+        self.assertEqual(Product.objects.get(id=product.id).quantity, 48)
+
+        response = self.client.post('/api/transactions/', {**sale, 'quantity': 3}, format='json',
+                                    HTTP_IDEMPOTENCY_KEY='sale-1')
+        self.assertEqual(response.status_code, 422)
+        # Failures aren't stored, so the key can be retried
+        response = self.client.post('/api/transactions/', {**sale, 'quantity': 999}, format='json',
+                                    HTTP_IDEMPOTENCY_KEY='sale-2')
+        self.assertEqual(response.status_code, 409)
+        response = self.client.post('/api/transactions/', sale, format='json', HTTP_IDEMPOTENCY_KEY='sale-2')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 2)
+
+        new_product = {'product_name': 'Serum', 'category': self.category.id, 'sku': 'SERUM-1',
+                       'unit_price': '12.00', 'quantity': 5}
+        for _ in range(2):
+            response = self.client.post('/api/products/', new_product, format='json', HTTP_IDEMPOTENCY_KEY='serum')
+            self.assertEqual(response.status_code, 201)
+        self.assertEqual(Product.objects.filter(sku='SERUM-1').count(), 1)
+
+
+class ProductBulkTestCase(SellerTestCase):
+
+    def row(self, sku, **fields):
+        return {'product_name': f'Product {sku}', 'category': self.category.id, 'sku': sku,
+                'unit_price': '5.00', 'quantity': 1, **fields}
+
+    def bulk(self, method, data, **kwargs):
+        return getattr(self.client, method)('/api/products/bulk/', data, format='json', **kwargs)
+
+    def test_upsert_reports_created_and_updated(self):
+        response = self.bulk('post', [self.row('A-1'), self.row('A-2')])
+        self.assertEqual([row['status'] for row in response.data['results']], ['created', 'created'])
+
+        response = self.bulk('post', {'products': [self.row('A-2', quantity=9), self.row('A-3')]})
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results']
+        self.assertEqual([(row['sku'], row['status']) for row in results], [('A-2', 'updated'), ('A-3', 'created')])
+        self.assertEqual(results[0]['id'], Product.objects.get(sku='A-2').id)
+        self.assertEqual(Product.objects.get(sku='A-2').quantity, 9)
+        self.assertEqual(Product.objects.filter(user=self.user).count(), 3)
+
+    def test_upsert_row_errors(self):
+        other = User.objects.create_user(username='other', email='other@example.com', password='secret-pass')
+        Product.objects.create(user=other, category=self.category, product_name='Theirs', sku='THEIRS-1',
+                               unit_price=Decimal('5.00'), quantity=1)
+        Product.objects.create(user=self.user, category=self.category, product_name='Mine', sku='MINE-1',
+                               unit_price=Decimal('5.00'), quantity=1)
+        response = self.bulk('post', [
+            self.row('B-1'),
+            self.row('THEIRS-1'),                        # SKU owned by another seller
+            self.row('B-2', product_name='Product B-1'),  # name repeated in the batch
+            self.row('B-3', product_name='Mine'),        # name of another of the seller's products
+            self.row('B-4', category=999999),
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'], [
+            {},
+            {'sku': ['product with this sku already exists.']},
+            {'product_name': ['Duplicate product name in this batch.']},
+            {'product_name': ['You already have a product with this name.']},
+            {'category': ['Invalid pk "999999" - object does not exist.']},
+        ])
+        # Nothing is written unless every row is valid
+        self.assertFalse(Product.objects.filter(sku__startswith='B-').exists())
+
+    def test_ndjson_upsert(self):
+        body = '\n'.join(json.dumps(self.row(f'N-{i}')) for i in range(3))
+        response = self.client.post('/api/products/bulk/', body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(Product.objects.filter(user=self.user).values_list('sku', flat=True)),
+                         ['N-0', 'N-1', 'N-2'])
+
+    def test_bulk_delete(self):
+        self.bulk('post', [self.row('D-1'), self.row('D-2')])
+        deleted = Product.objects.get(sku='D-1').id
+        response = self.bulk('delete', {'skus': ['D-1', 'MISSING']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [{'sku': 'D-1', 'status': 'deleted'},
+                                                    {'sku': 'MISSING', 'status': 'not_found'}])
+        self.assertEqual(list(Product.objects.filter(user=self.user).values_list('sku', flat=True)), ['D-2'])
+        self.assertEqual(list(Tombstone.objects.filter(user=self.user).values_list('kind', 'object_id')),
+                         [('product', deleted)])
+        self.assertEqual(self.bulk('delete', {'skus': []}).status_code, 400)
+
+
+class ExportTestCase(SellerTestCase):
+
+    def test_exports(self):
+        self.assertConstantQueries('/api/exports/transactions.csv', self.add_transactions)
+        response = self.client.get('/api/exports/products.ndjson')
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(len(lines), Product.objects.filter(user=self.user).count())
+        self.assertEqual(self.client.get('/api/exports/products.xml').status_code, 404)
+
+
+class MetricsTestCase(SellerTestCase):
+
+    def test_metrics(self):
+        self.add_products(3)
+        with self.settings(SLOW_REQUEST_MS=1e-6), self.assertLogs('api.metrics', 'WARNING') as logs:
+            self.client.get('/api/products/')
+        self.assertIn('FROM "api_product"', str(logs.records[0].sql))
+
+        body = self.client.get('/metrics').content.decode()
+        route = 'method="GET",route="api/products/"'
+        self.assertIn(f'silkhair_request_duration_seconds{{{route},quantile="0.99"}}', body)
+        self.assertRegex(body, rf'silkhair_db_queries_count{{{route}}} [1-9]')
+
+        # Without a token only loopback clients may scrape; with one, only holders of it
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='203.0.113.7').status_code, 403)
+        with self.settings(METRICS_TOKEN='scrape-me'):
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+            response = self.client.get('/metrics', REMOTE_ADDR='203.0.113.7', HTTP_AUTHORIZATION='Bearer scrape-me')
+            self.assertEqual(response.status_code, 200)
+
+
+class InvoicePDFTestCase(SellerTestCase):
+
+    def render(self, url):
+        """Poll ``url`` until the PDF is ready and return its bytes."""
+        self.assertEqual(self.client.get(url).status_code, 202)
+        for _ in range(100):
+            response = self.client.get(url)
+            if response.status_code != 202:
+                break
+            time.sleep(0.1)
+        self.assertEqual(response.status_code, 200)
+        content = b''.join(response.streaming_content)
+        response.close()
+        return content
+
+    def test_invoice_pdf(self):
+        self.add_transactions(1)
+        sale = Transaction.objects.get(user=self.user)
+        with tempfile.TemporaryDirectory() as export_dir, self.settings(EXPORT_DIR=Path(export_dir)):
+            url = f'/api/exports/invoices/{sale.id}.pdf'
+            self.assertTrue(self.render(url).startswith(b'%PDF'))
+
+            # The finished render is dropped from the pending renders
+            for _ in range(50):
+                pending = [path for path in exports._pending if Path(export_dir) in path.parents]
+                if not pending:
+                    break
+                time.sleep(0.1)
+            self.assertEqual(pending, [])
+
+            # Editing what the invoice shows renders a new version in place of the old file
+            rendered = list(Path(export_dir).rglob('*.pdf'))
+            sale.product.product_name = 'Renamed'
+            sale.product.save()
+            self.render(url)
+            self.assertEqual(len(list(Path(export_dir).rglob('*.pdf'))), 1)
+            self.assertFalse(rendered[0].exists())
+
+    def test_statement_version(self):
+        self.add_transactions(1)
+        sale = Transaction.objects.get(user=self.user)
+        day = timezone.localtime(sale.transaction_date)
+        with tempfile.TemporaryDirectory() as export_dir, self.settings(EXPORT_DIR=Path(export_dir)):
+            url = f'/api/exports/statements/{day.year}/{day.month}.pdf'
+            self.render(url)
+            self.assertEqual(self.client.get(url).status_code, 200)
+            # Not only sales: the product names and the seller's details are printed too
+            for change in (lambda: Product.objects.get(id=sale.product_id).save(),
+                           lambda: User.objects.filter(id=self.user.id).update(email='shop@example.com')):
+                change()
+                self.render(url)
+            self.assertEqual(len(list(Path(export_dir).rglob('*.pdf'))), 1)
+
+
+class AuthQueryCountTestCase(APITestCase):
+
+    def test_signup(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/signup/', {'username': 'new', 'email': 'new@example.com',
+                                                         'password': 'secret-pass'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertLessEqual(len(queries), 5)  # user, profile and job inserts inside one transaction
+        # The welcome email is queued, not sent in the request
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(mail.outbox[0].to, ['new@example.com'])
+
+    def test_duplicate_signup(self):
+        User.objects.create_user(username='taken', email='taken@example.com', password='secret-pass')
+        User.objects.create_user(username='email', email='other@example.com', password='secret-pass')
+        for data, error in (({'username': 'taken', 'email': 'new@example.com'}, 'Username already exists.'),
+                            ({'username': 'email', 'email': 'new@example.com'}, 'Username already exists.'),
+                            ({'username': 'new', 'email': 'taken@example.com'}, 'Email already exists.')):
+            response = self.client.post('/api/signup/', {**data, 'password': 'secret-pass'}, format='json')
+            self.assertEqual((response.status_code, response.data['error']), (400, error))
+        self.assertEqual(User.objects.count(), 2)
+        self.assertFalse(Job.objects.exists())
+
+    def test_import_users(self):
+        User.objects.create_user(username='taken', email='taken@example.com', password='secret-pass')
+        rows = ['username,email,password,business_name',
+                'first,first@example.com,first-pass,First Shop',
+                'taken,new@example.com,secret-pass,',             # username already in the database
+                'second,taken@EXAMPLE.com,secret-pass,',          # email already in the database (domain case-folded)
+                'third,first@example.com,secret-pass,',           # email repeated in the file
+                'first,fourth@example.com,secret-pass,',          # username repeated in the file
+                'fifth,,secret-pass,',                            # missing email
+                'sixth,sixth@example.com,sixth-pass,']
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as source:
+            source.write('\n'.join(rows))
+        self.addCleanup(Path(source.name).unlink)
+
+        stdout, stderr = StringIO(), StringIO()
+        # Small batches so duplicates span batches; the passwords are hashed in spawned worker processes
+        call_command('import_users', source.name, workers=2, batch_size=3, stdout=stdout, stderr=stderr)
+        self.assertIn('Created 2 user(s), skipped 5 row(s).', stdout.getvalue())
+        self.assertEqual(len(stderr.getvalue().splitlines()), 5)
+
+        first = User.objects.get(username='first')
+        self.assertTrue(first.check_password('first-pass'))
+        self.assertEqual((first.email, first.profile.business_name), ('first@example.com', 'First Shop'))
+        self.assertTrue(User.objects.get(username='sixth').check_password('sixth-pass'))
+        self.assertEqual(User.objects.count(), 3)
+
+    def test_login_and_refresh(self):
+        User.objects.create_user(username='seller', email='seller@example.com', password='secret-pass')
+        with self.assertNumQueries(1):  # user lookup
+            response = self.client.post('/api/login/', {'email': 'seller@example.com', 'password': 'secret-pass'},
+                                        format='json')
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(1):  # active-user check
+            response = self.client.post('/api/token/refresh/', {'refresh': response.data['refresh']}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_login_throttling(self):
+        User.objects.create_user(username='seller', email='seller@example.com', password='secret-pass')
+        cache.clear()
+        self.addCleanup(cache.clear)
+        attempt = {'email': 'seller@example.com', 'password': 'guess'}
+        with self.settings(THROTTLE_RATES={**settings.THROTTLE_RATES, 'login_account': '2/min'}):
+            for _ in range(2):
+                self.assertEqual(self.client.post('/api/login/', attempt, format='json').status_code, 401)
+            with self.assertNumQueries(0):  # rejected before the user lookup and the password check
+                response = self.client.post('/api/login/', attempt, format='json')
+            self.assertEqual(response.status_code, 429)
+            self.assertGreater(int(response['Retry-After']), 0)
+            # Other accounts from the same address still get through
+            response = self.client.post('/api/login/', {'email': 'other@example.com', 'password': 'guess'},
+                                        format='json')
+            self.assertEqual(response.status_code, 404)
+
+        signup = {'username': 'new', 'email': 'new@example.com', 'password': 'secret-pass'}
+        with self.settings(THROTTLE_RATES={**settings.THROTTLE_RATES, 'signup_account': '1/hour',
+                                           'signup_ip': '3/hour'}):
+            self.assertEqual(self.client.post('/api/signup/', signup, format='json').status_code, 201)
+            with self.assertNumQueries(0):  # rejected before hashing and the unique checks
+                response = self.client.post('/api/signup/', {**signup, 'username': 'new2'}, format='json')
+            self.assertEqual(response.status_code, 429)
+            response = self.client.post('/api/signup/', {**signup, 'username': 'new3', 'email': 'new3@example.com'},
+                                        format='json')
+            self.assertEqual(response.status_code, 201)
+            # The address has used up its signups too
+            response = self.client.post('/api/signup/', {**signup, 'username': 'new4', 'email': 'new4@example.com'},
+                                        format='json')
+            self.assertEqual(response.status_code, 429)
+
+    def test_throttle_counts_are_atomic(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        with self.settings(THROTTLE_RATES={**settings.THROTTLE_RATES, 'login_ip': '20/min'}):
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                waits = list(pool.map(lambda _: consume('login_ip', '10.0.0.1'), range(80)))
+        self.assertEqual(waits.count(0), 20)
+
+    def test_throttles_behind_proxy(self):
+        cache.clear()
+        self.addCleanup(cache.clear)  # the spent allowance would throttle later logins
+
+        def logins(forwarded_for):
+            return [self.client.post('/api/login/', {'email': f'user{i}@example.com', 'password': 'guess'},
+                                     format='json', HTTP_X_FORWARDED_FOR=forwarded_for(i)).status_code
+                    for i in range(3)]
+
+        with self.settings(THROTTLE_RATES={**settings.THROTTLE_RATES, 'login_ip': '2/min'},
+                           REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1}):
+            # The proxy appends the address it saw; entries before it come from the client
+            self.assertEqual(logins(lambda i: f'10.0.0.{i}, 203.0.113.1'), [404, 404, 429])
+            self.assertEqual(logins(lambda i: '203.0.113.2'), [404, 404, 429])
+        with self.settings(THROTTLE_RATES={**settings.THROTTLE_RATES, 'login_ip': '2/min'},
+                           REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 0}):
+            # Without a proxy X-Forwarded-For is ignored: all of these come from REMOTE_ADDR
+            cache.clear()
+            self.assertEqual(logins(lambda i: f'10.0.0.{i}'), [404, 404, 429])
+
+    def test_stateless_jwt(self):
+        user = User.objects.create_user(username='seller', email='seller@example.com', password='secret-pass')
+        token = RefreshToken.for_user(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        with self.assertNumQueries(2):  # the page and its ETag, no user lookup
+            response = self.client.get('/api/products/?pagination=cursor')
+        self.assertEqual(response.status_code, 200)
+
+        lazy = StatelessJWTAuthentication().get_user(token)
+        with self.assertNumQueries(1):  # every other field arrives with the first one read
+            self.assertEqual((lazy.email, lazy.username, lazy.is_active), (user.email, 'seller', True))
+        self.assertEqual(Product.objects.filter(user=lazy).count(), 0)
+
+
+class TransactionFilterTestCase(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='seller', email='seller@example.com', password='secret-pass')
+        category = Category.objects.create(name='Hair')
+        self.oil, self.wig = (
+            Product.objects.create(user=self.user, category=category, product_name=name, sku=name.upper(),
+                                   unit_price=Decimal('10.00'), quantity=50)
+            for name in ('Oil', 'Wig'))
+        # (product, status, payment method, date)
+        for product, state, method, day in (
+                (self.oil, 'completed', 'cash', '2024-03-01T10:00:00Z'),
+                (self.oil, 'pending', 'paypal', '2024-03-02T10:00:00Z'),
+                (self.wig, 'completed', 'paypal', '2024-03-03T10:00:00Z'),
+                (self.wig, 'failed', 'credit_card', '2024-03-04T23:30:00Z')):
+            sale = Transaction.objects.create(user=self.user, product=product, customer='Customer',
+                                              email='c@example.com', quantity=1, total_price=Decimal('10.00'),
+                                              status=state, payment_method=method)
+            Transaction.objects.filter(id=sale.id).update(transaction_date=day)
+        self.client.force_authenticate(user=self.user)
+
+    def matching(self, query):
+        response = self.client.get(f'/api/transactions/?fields=status,payment_method,transaction_date&{query}')
+        self.assertEqual(response.status_code, 200)
+        if response.data == {'message': 'No data'}:
+            return []
+        return sorted((row['transaction_date'][:10], row['status'], row['payment_method']) for row in response.data)
+
+    def test_filters(self):
+        self.assertEqual(self.matching('status=completed'),
+                         [('2024-03-01', 'completed', 'cash'), ('2024-03-03', 'completed', 'paypal')])
+        self.assertEqual(self.matching('payment_method=paypal&status=pending'),
+                         [('2024-03-02', 'pending', 'paypal')])
+        self.assertEqual([day for day, *_ in self.matching(f'product={self.wig.id}')], ['2024-03-03', '2024-03-04'])
+        # A bare date_to includes that whole day; a datetime is an exact bound
+        self.assertEqual([day for day, *_ in self.matching('date_from=2024-03-02&date_to=2024-03-04')],
+                         ['2024-03-02', '2024-03-03', '2024-03-04'])
+        self.assertEqual([day for day, *_ in self.matching('date_to=2024-03-04T12:00:00Z')],
+                         ['2024-03-01', '2024-03-02', '2024-03-03'])
+        self.assertEqual(self.matching('status=failed&payment_method=cash'), [])
+
+    def test_invalid_filters(self):
+        for query, param in (('status=refunded', 'status'), ('payment_method=bitcoin', 'payment_method'),
+                             ('product=oil', 'product'), ('date_from=yesterday', 'date_from'),
+                             ('date_to=2024-13-01', 'date_to')):
+            response = self.client.get(f'/api/transactions/?{query}')
+            self.assertEqual(response.status_code, 400, query)
+            self.assertIn(param, response.data)
+
+
+def _reload_urls():
+    # api/urls.py picks the sync or async views when it is imported
+    import backend.urls
+    from . import urls
+    for module in (urls, backend.urls):
+        importlib.reload(module)
+    clear_url_caches()
+
+
+@contextmanager
+def async_views():
+    """Serve the API with the views in async_views.py for the block."""
+    try:
+        with override_settings(ASYNC_VIEWS=True):
+            _reload_urls()
+            yield
+    finally:
+        _reload_urls()
+
+
+class AsyncViewTestCase(APITestCase):
+    """The async views must answer every request exactly like the views they replace."""
+    # Values that differ between two otherwise identical runs
+    VOLATILE = {'id', 'transaction_date', 'refresh', 'access'}
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='seller', email='seller@example.com', password='secret-pass')
+        category = Category.objects.create(name='Hair')
+        self.oil = Product.objects.create(user=self.user, category=category, product_name='Oil', sku='OIL-1',
+                                          unit_price=Decimal('8.00'), quantity=5)
+        self.wig = Product.objects.create(user=self.user, category=category, product_name='Wig', sku='WIG-1',
+                                          unit_price=Decimal('50.00'), quantity=1)
+        for product, state, method in ((self.oil, 'completed', 'cash'), (self.wig, 'pending', 'paypal')):
+            Transaction.objects.create(user=self.user, product=product, customer='Customer', email='c@example.com',
+                                       quantity=1, total_price=product.unit_price,
+                                       status=state, payment_method=method)
+        self.category = category
+        self.auth = {'Authorization': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+
+    def requests(self):
+        new_product = {'category': self.category.id, 'product_name': 'Serum', 'sku': 'SER-1',
+                       'unit_price': '12.50', 'quantity': 3}
+        sale = {'customer': 'Buyer', 'email': 'buyer@example.com', 'product': self.oil.id, 'quantity': 1,
+                'status': 'completed'}
+        return [
+            ('GET', '/api/products/', None, {}),
+            ('GET', '/api/products/?pagination=cursor&fields=sku,quantity', None, {}),
+            ('GET', '/api/products/?page_size=1&page=2', None, {}),
+            ('GET', '/api/products/?page=9', None, {}),
+            ('GET', '/api/products/?fields=nope', None, {}),
+            ('GET', f'/api/products/{self.oil.id}?fields=sku', None, {}),
+            ('GET', '/api/products/999999', None, {}),
+            ('POST', '/api/products/', new_product, {}),
+            ('POST', '/api/products/', new_product, {}),
+            ('POST', '/api/products/', {'product_name': 'Gel'}, {}),
+            ('PUT', f'/api/products/?id={self.wig.id}', {'quantity': 4}, {}),
+            ('PUT', '/api/products/?id=abc', {'quantity': 4}, {}),
+            ('PUT', '/api/products/?id=999999', {'quantity': 4}, {}),
+            ('PUT', '/api/products/', {'quantity': 4}, {}),
+            ('PUT', f'/api/products/?id={self.wig.id}', {'quantity': -1}, {}),
+            ('DELETE', '/api/products/?id=999999', None, {}),
+            ('DELETE', '/api/products/?id=abc', None, {}),
+            ('GET', '/api/transactions/', None, {}),
+            ('GET', '/api/transactions/?status=completed&fields=status,payment_method', None, {}),
+            ('GET', '/api/transactions/?payment_method=paypal', None, {}),
+            ('GET', '/api/transactions/?status=refunded', None, {}),
+            ('GET', '/api/transactions/?date_from=tomorrow', None, {}),
+            ('GET', '/api/transactions/?status=failed', None, {}),
+            ('GET', '/api/transactions/?pagination=cursor&fields=quantity', None, {}),
+            ('GET', '/api/transactions/?stream=ndjson&fields=quantity,status', None, {}),
+            ('POST', '/api/transactions/', sale, {'Idempotency-Key': 'sale-1'}),
+            ('POST', '/api/transactions/', sale, {'Idempotency-Key': 'sale-1'}),
+            ('POST', '/api/transactions/', {**sale, 'quantity': 2}, {'Idempotency-Key': 'sale-1'}),
+            ('POST', '/api/transactions/', {**sale, 'quantity': 99}, {}),
+            ('POST', '/api/transactions/', {**sale, 'product': None}, {}),
+            ('DELETE', f'/api/products/?id={self.wig.id}', None, {}),
+            ('POST', '/api/login/', {'email': 'seller@example.com', 'password': 'wrong'}, None),
+            ('POST', '/api/login/', {'email': 'nobody@example.com', 'password': 'wrong'}, None),
+            ('POST', '/api/login/', {'email': 'seller@example.com', 'password': 'secret-pass'}, None),
+        ]
+
+    def normalize(self, data):
+        if isinstance(data, dict):
+            return {key: '*' if key in self.VOLATILE else self.normalize(value) for key, value in data.items()}
+        if isinstance(data, list):
+            return [self.normalize(value) for value in data]
+        return data
+
+    def outcome(self, response):
+        if response.streaming:
+            if response.is_async:
+                content = async_to_sync(self.collect)(response.streaming_content)
+            else:
+                content = b''.join(response.streaming_content)
+            body = [json.loads(line) for line in content.splitlines()]
+        else:
+            body = json.loads(response.content) if response.content else None
+        return (response.status_code, self.normalize(body),
+                response.has_header('ETag'), response.get('Idempotent-Replayed'))
+
+    @staticmethod
+    async def collect(chunks):
+        return b''.join([chunk async for chunk in chunks])
+
+    def run_requests(self, call):
+        # Each run starts from the same rows and an empty cache
+        cache.clear()
+        outcomes = []
+        with transaction.atomic():
+            for method, url, body, headers in self.requests():
+                headers = {**self.auth, **headers} if headers is not None else {}
+                response = call(method, url, json.dumps(body) if body is not None else '',
+                                content_type='application/json', headers=headers)
+                outcomes.append(((method, url), self.outcome(response)))
+            transaction.set_rollback(True)
+        return outcomes
+
+    def test_async_views_match_sync_views(self):
+        expected = self.run_requests(Client().generic)
+        self.assertEqual([status for _, (status, *_) in expected], [
+            200, 200, 200, 404, 400, 200, 404, 201, 400, 400, 200, 400, 404, 400, 400, 404, 400,
+            200, 200, 200, 400, 400, 200, 200, 200, 201, 201, 422, 409, 400, 200, 401, 404, 200])
+        with async_views():
+            self.assertIs(resolve('/api/transactions/').func.view_class, AsyncTransactionView)
+            client = AsyncClient()
+
+            async def request(*args, **kwargs):
+                return await client.generic(*args, **kwargs)
+            actual = self.run_requests(async_to_sync(request))
+        for (request, want), (_, got) in zip(expected, actual):
+            self.assertEqual(got, want, request)
+
+    def test_async_etag(self):
+        with async_views():
+            client = AsyncClient()
+            response = async_to_sync(client.get)('/api/products/', headers=self.auth)
+            self.assertEqual(response.status_code, 200)
+            response = async_to_sync(client.get)('/api/products/',
+                                                 headers={**self.auth, 'If-None-Match': response['ETag']})
+            self.assertEqual(response.status_code, 304)
+
+
+class SeedTestCase(APITestCase):
+
+    def test_seed(self):
+        seller = seed(users=2, products=5, transactions=30, prefix='t')[1]
+        self.assertEqual(Product.objects.filter(user=seller).count(), 5)
+        self.assertEqual(Transaction.objects.filter(user=seller).count(), 30)
+        self.assertEqual(DailySales.objects.filter(user=seller).aggregate(n=Sum('transactions'))['n'], 30)
+        self.assertGreater(Transaction.objects.filter(user=seller).dates('transaction_date', 'day').count(), 1)
+
+        response = self.client.post('/api/login/', {'email': seller.email, 'password': SEED_PASSWORD}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+
+calls = []
+
+
+class ReplicaTestCase(APITestCase):
+    """
+    The routing test needs a second database: run it with e.g.
+    DB_ENGINE=django.db.backends.sqlite3 DB_NAME=primary.sqlite3 DB_REPLICA_NAME=replica.sqlite3.
+    Test databases are not replicated, so the replica stays empty.
+    """
+    databases = {'default', 'replica'} if 'replica' in settings.DATABASES else {'default'}
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='seller', email='seller@example.com', password='secret-pass')
+        self.client.force_authenticate(user=self.user)
+        self.product = {'category': Category.objects.create(name='Hair').id, 'product_name': 'Oil',
+                        'sku': 'OIL-1', 'unit_price': '8.00', 'quantity': 5}
+
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    def test_writes_pin_the_user_to_the_primary(self):
+        with reads_from(read_alias(self.user.id)):
+            self.assertEqual(router.db_for_read(Product), 'replica')
+            self.assertEqual(router.db_for_write(Product), 'default')
+        self.assertEqual(router.db_for_read(Product), 'default')
+
+        self.assertEqual(self.client.post('/api/products/', self.product, format='json').status_code, 201)
+        self.assertIsNone(read_alias(self.user.id))
+        self.assertEqual(read_alias(User.objects.create_user(username='other').id), 'replica')
+
+    def test_streams_keep_the_read_alias(self):
+        async def aroutes():
+            for _ in range(2):
+                yield router.db_for_read(Product)
+
+        async def collect(iterator):
+            return [item async for item in iterator]
+
+        # The iterators run after the view has returned and reset its alias
+        with reads_from('replica'):
+            stream = use_read_alias(router.db_for_read(Product) for _ in range(2))
+            astream = ause_read_alias(aroutes())
+        self.assertEqual(list(stream), ['replica', 'replica'])
+        self.assertEqual(async_to_sync(collect)(astream), ['replica', 'replica'])
+        self.assertEqual(router.db_for_read(Product), 'default')
+
+    @unittest.skipUnless('replica' in settings.DATABASES, 'needs DB_REPLICA_NAME or DB_REPLICA_HOST')
+    def test_streamed_reads_use_the_replica(self):
+        product = Product.objects.create(user=self.user, category_id=self.product['category'], product_name='Wig',
+                                         sku='WIG-1', unit_price=Decimal('50.00'), quantity=1)
+        Transaction.objects.create(user=self.user, customer='Customer', email='customer@example.com',
+                                   product=product, quantity=1, total_price=product.unit_price)
+        # The replica is empty, so anything read from the primary would show up
+        for url, header in (('/api/transactions/?stream=ndjson', 0), ('/api/exports/transactions.ndjson', 0),
+                            ('/api/exports/products.csv', 1)):
+            response = self.client.get(url)
+            self.assertEqual(len(b''.join(response.streaming_content).splitlines()), header, url)
+
+    @unittest.skipUnless('replica' in settings.DATABASES, 'needs DB_REPLICA_NAME or DB_REPLICA_HOST')
+    def test_safe_reads_use_the_replica_until_a_write(self):
+        Product.objects.create(user=self.user, category_id=self.product['category'], product_name='Wig',
+                               sku='WIG-1', unit_price=Decimal('50.00'), quantity=1)
+        self.assertEqual(self.client.get('/api/products/?pagination=cursor').data['results'], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/products/', self.product, format='json')
+        response = self.client.get('/api/products/?pagination=cursor')
+        self.assertEqual(sorted(row['sku'] for row in response.data['results']), ['OIL-1', 'WIG-1'])
+
+
+@task(max_attempts=2, backoff=60)
+def flaky(value):
+    calls.append(value)
+    raise ValueError(value)
+
+
+class JobTestCase(APITestCase):
+
+    def test_receipt_is_queued(self):
+        user = User.objects.create_user(username='seller', email='seller@example.com', password='secret-pass')
+        product = Product.objects.create(user=user, category=Category.objects.create(name='Hair'),
+                                         product_name='Oil', sku='OIL-1', unit_price=Decimal('8.00'), quantity=5)
+        self.client.force_authenticate(user=user)
+        self.client.post('/api/transactions/', {'customer': 'Customer', 'email': 'customer@example.com',
+                                                'product': product.id, 'quantity': 2}, format='json')
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(mail.outbox[0].to, ['customer@example.com'])
+        self.assertEqual(mail.outbox[0].attachments[0][2], 'application/pdf')
+        self.assertFalse(Job.objects.exists())
+
+    def test_low_stock_alert_and_snapshots(self):
+        user = User.objects.create_user(username='seller', email='seller@example.com', password='secret-pass')
+        product = Product.objects.create(user=user, category=Category.objects.create(name='Hair'),
+                                         product_name='Oil', sku='OIL-1', unit_price=Decimal('8.00'), quantity=5,
+                                         reorder_level=3)
+        self.client.force_authenticate(user=user)
+        self.assertEqual(self.client.get('/api/products/low-stock/').data, [])
+        sale = {'customer': 'Customer', 'email': 'customer@example.com', 'product': product.id, 'quantity': 2}
+        self.client.post('/api/transactions/', sale, format='json')
+        self.client.post('/api/transactions/', {**sale, 'quantity': 1}, format='json')  # already below: no alert
+        self.assertEqual(Job.objects.filter(name='api.tasks.send_low_stock_alert').count(), 1)
+        run_pending()
+        self.assertEqual([message.subject for message in mail.outbox if message.to == [user.email]], ['Low stock: Oil'])
+
+        cache.clear()  # the sales' invalidation waits for a commit that never comes in tests
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/products/low-stock/?fields=id,quantity')
+        self.assertEqual(response.data, [{'id': product.id, 'quantity': 2}])
+
+        self.assertEqual(take_snapshot(), 1)
+        Product.objects.filter(id=product.id).update(quantity=9)
+        self.assertEqual(take_snapshot(), 1)  # same day: overwritten, not duplicated
+        response = self.client.get(f'/api/products/{product.id}/stock-history/?days=7')
+        self.assertEqual([row['quantity'] for row in response.data['history']], [9])
+
+        snapshot_inventory.delay(reschedule=True)
+        run_pending()
+        self.assertGreater(Job.objects.get(name='api.tasks.snapshot_inventory').run_at, timezone.now())
+
+    def test_failed_snapshot_keeps_the_schedule(self):
+        snapshot_inventory.delay(reschedule=True)
+        with mock.patch('api.tasks.take_snapshot', side_effect=RuntimeError('disk full')), \
+                self.assertLogs('api.jobs', 'ERROR'):
+            Job.objects.update(max_attempts=1)
+            run_pending()
+        self.assertEqual(Job.objects.get(status='failed').name, 'api.tasks.snapshot_inventory')
+        self.assertTrue(snapshot_inventory.is_scheduled())
+
+    def test_retry_with_backoff(self):
+        flaky.delay('boom')
+        with self.assertLogs('api.jobs', 'WARNING'):
+            self.assertEqual(run_pending(), 1)
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=50))
+        self.assertIn('ValueError: boom', job.last_error)
+
+        # Not due yet; once it is, the second failure is final
+        self.assertEqual(run_pending(), 0)
+        Job.objects.update(run_at=timezone.now())
+        with self.assertLogs('api.jobs', 'ERROR'):
+            self.assertEqual(run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+        self.assertEqual(calls, ['boom', 'boom'])
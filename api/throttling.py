@@ -0,0 +1,148 @@
+"""
+Sliding-window rate limits for the unauthenticated, password-hashing endpoints.
+
+Every (scope, key) pair -- a client IP, or the email a login names -- may
+make ``N`` attempts per ``period`` (THROTTLE_RATES). Attempts are counted in
+fixed windows of one period. The count over the last period is estimated as
+the current window's count plus the previous window's count, weighted by the
+share of the previous window still inside the period. This stops a burst of
+2N attempts straddling a window boundary.
+
+Counting uses the cache's atomic ``add`` and ``incr``, so concurrent
+requests can't all spend the same allowance. These are atomic on the locmem
+and redis backends. Point THROTTLE_CACHE at a shared cache (e.g. the redis
+alias) so all server processes count together. Rejected attempts are
+counted too: a client that keeps hammering stays blocked.
+
+Checks run before the password is hashed or verified, so a rejected attempt
+costs no CPU beyond a few cache operations.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+_PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'10/min' -> (10, 60): attempts allowed per period, and the period in seconds."""
+    count, period = rate.split('/')
+    return int(count), _PERIODS[period[0]]
+
+
+def _windows(scope, key, now):
+    """Cache keys of the current and previous window, the rate, and how far into the window ``now`` is (0-1)."""
+    rate = settings.THROTTLE_RATES.get(scope) if settings.THROTTLE_ENABLED else None
+    if not rate or not key:
+        return None
+    limit, period = parse_rate(rate)
+    digest = hashlib.md5(str(key).lower().encode(), usedforsecurity=False).hexdigest()
+    window, offset = divmod(now, period)
+    prefix = f'throttle:{scope}:{digest}:'
+    return f'{prefix}{int(window)}', f'{prefix}{int(window) - 1}', limit, period, offset / period
+
+
+def _wait(count, previous, limit, period, elapsed):
+    """
+    Seconds until one more attempt fits, given ``count`` attempts (this one
+    included) in the current window and ``previous`` in the one before; 0
+    when this attempt is within the limit.
+    """
+    if previous * (1 - elapsed) + count <= limit:
+        return 0
+    if count < limit:
+        # The previous window's share decays first
+        return period * (1 - (limit - count) / previous - elapsed)
+    # Once this window is the previous one, its share has to decay enough
+    return period * (1 - elapsed + 1 - (limit - 1) / count)
+
+
+def _timeout(period):
+    # Kept while it is the current or the previous window
+    return 2 * period + 1
+
+
+def consume(scope, key):
+    """
+    Count one attempt by ``key`` in ``scope``. Returns 0 when the attempt
+    may proceed, otherwise the seconds to wait before the next one.
+    """
+    windows = _windows(scope, key, time.time())
+    if windows is None:
+        return 0
+    current, before, limit, period, elapsed = windows
+    store = caches[settings.THROTTLE_CACHE]
+    store.add(current, 0, _timeout(period))
+    try:
+        count = store.incr(current)
+    except ValueError:  # evicted between the two calls
+        store.add(current, 1, _timeout(period))
+        count = 1
+    return _wait(count, store.get(before, 0), limit, period, elapsed)
+
+
+async def aconsume(scope, key):
+    windows = _windows(scope, key, time.time())
+    if windows is None:
+        return 0
+    current, before, limit, period, elapsed = windows
+    store = caches[settings.THROTTLE_CACHE]
+    await store.aadd(current, 0, _timeout(period))
+    try:
+        count = await store.aincr(current)
+    except ValueError:
+        await store.aadd(current, 1, _timeout(period))
+        count = 1
+    return _wait(count, await store.aget(before, 0), limit, period, elapsed)
+
+
+def client_ip(request):
+    """The client address, honouring REST_FRAMEWORK['NUM_PROXIES'] like DRF's throttles."""
+    return BaseThrottle().get_ident(request)
+
+
+class WindowThrottle(BaseThrottle):
+    """A DRF throttle counting each request against ``scope``'s limit for ``get_key(request)``."""
+    scope = None
+
+    def get_key(self, request):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        self.retry_after = consume(self.scope, self.get_key(request))
+        return not self.retry_after
+
+    def wait(self):
+        return self.retry_after
+
+
+class IPThrottle(WindowThrottle):
+    def get_key(self, request):
+        return client_ip(request)
+
+
+class AccountThrottle(WindowThrottle):
+    """Keyed by the email in the request body, whichever IP the attempts come from."""
+
+    def get_key(self, request):
+        email = request.data.get('email') if hasattr(request.data, 'get') else None
+        return email if isinstance(email, str) else None
+
+
+class LoginIPThrottle(IPThrottle):
+    scope = 'login_ip'
+
+
+class LoginAccountThrottle(AccountThrottle):
+    scope = 'login_account'
+
+
+class SignupIPThrottle(IPThrottle):
+    scope = 'signup_ip'
+
+
+class SignupAccountThrottle(AccountThrottle):
+    scope = 'signup_account'
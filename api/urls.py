@@ -1,7 +1,20 @@
+from django.conf import settings
 from django.urls import path
-from .views import SignupView, ApiProductView, LoginView, ApiTransactionView
+from .views import (
+    SignupView, ApiProductView, ApiProductBulkView, ApiProductSearchView, ApiProductTypeaheadView, LoginView,
+    ApiTransactionView, ApiSalesAnalyticsView, ApiTransactionExportView, ApiProductExportView, ApiStatementView,
+    ApiInvoiceView, ApiCategoryView, ApiCategoryProductsView, ApiLowStockView, ApiStockHistoryView,
+    ApiSyncView,
+)
 from rest_framework_simplejwt.views import TokenRefreshView
 
+if settings.ASYNC_VIEWS:
+    from .async_views import (  # noqa: F811
+        AsyncLoginView as LoginView,
+        AsyncProductView as ApiProductView,
+        AsyncTransactionView as ApiTransactionView,
+    )
+
 urlpatterns = [
     path('signup/', SignupView.as_view(), name='user-register'),
     path('login/', LoginView.as_view(), name='token_obtain_pair'),
@@ -9,6 +22,23 @@ urlpatterns = [
 
     path('products/', ApiProductView.as_view(), name='ApiProductView'),
     path('products/<int:product_id>', ApiProductView.as_view(), name='ApiProductView'),
+    path('products/bulk/', ApiProductBulkView.as_view(), name='ApiProductBulkView'),
+    path('products/search/', ApiProductSearchView.as_view(), name='ApiProductSearchView'),
+    path('products/typeahead/', ApiProductTypeaheadView.as_view(), name='ApiProductTypeaheadView'),
+    path('products/low-stock/', ApiLowStockView.as_view(), name='ApiLowStockView'),
+    path('products/<int:product_id>/stock-history/', ApiStockHistoryView.as_view(), name='ApiStockHistoryView'),
     
+    path('categories/', ApiCategoryView.as_view(), name='ApiCategoryView'),
+    path('categories/<slug:slug>/products/', ApiCategoryProductsView.as_view(), name='ApiCategoryProductsView'),
+
     path('transactions/', ApiTransactionView.as_view(), name='ApiTransactionView'),
+
+    path('sync/', ApiSyncView.as_view(), name='ApiSyncView'),
+
+    path('analytics/sales/', ApiSalesAnalyticsView.as_view(), name='ApiSalesAnalyticsView'),
+
+    path('exports/transactions.<str:kind>', ApiTransactionExportView.as_view(), name='ApiTransactionExportView'),
+    path('exports/products.<str:kind>', ApiProductExportView.as_view(), name='ApiProductExportView'),
+    path('exports/statements/<int:year>/<int:month>.pdf', ApiStatementView.as_view(), name='ApiStatementView'),
+    path('exports/invoices/<int:transaction_id>.pdf', ApiInvoiceView.as_view(), name='ApiInvoiceView'),
 ]
\ No newline at end of file
@@ -1,13 +1,37 @@
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Q, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.http import FileResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from .models import Product, UserProfile, Transaction
-from .serializers import ProductSerializer, TransactionSerializer
-from rest_framework_simplejwt.tokens import RefreshToken
-from datetime import timedelta
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.parsers import JSONParser
+from rest_framework.exceptions import ValidationError
+from .models import Category, DailySales, Product, Tombstone, UserProfile, Transaction
+from .serializers import OutOfStock, ProductSerializer, ProductBulkSerializer, RowSerializer, TransactionSerializer
+from .renderers import dumps
+from .parsers import NDJSONParser
+from .login import get_login_user, login_result
+from .throttling import LoginAccountThrottle, LoginIPThrottle, SignupAccountThrottle, SignupIPThrottle
+from datetime import datetime, timedelta
+from .pagination import ProductPageNumberPagination, ProductCursorPagination, TransactionCursorPagination
+from .filters import filter_daily_sales, filter_transactions
+from .search import search_products, typeahead
+from .cache import category_list_key, etag_matches, invalidate_product_list, make_etag, product_list_key
+from .tasks import send_welcome_email
+from .idempotency import idempotent
+from .routers import ReplicaReadsMixin, use_read_alias
+from .inventory import low_stock, stock_history
+from .sync import ExpiredSyncToken, InvalidSyncToken, changes
+from .exports import EXPORT_CHUNK_SIZE, STREAMERS, data_version, export_path, request_pdf
 
 # OTP Expiry Time (5 minutes)
 OTP_EXPIRY_TIME = timedelta(minutes=5)
@@ -15,8 +39,22 @@ OTP_EXPIRY_TIME = timedelta(minutes=5)
 # -----------------------------
 # Signup View
 # -----------------------------
+# The partial unique index on auth_user.email created by migration 0014
+EMAIL_UNIQUE_INDEX = 'api_auth_user_email_uniq'
+
+
+def email_taken(exc, email):
+    """Whether the signup IntegrityError ``exc`` came from the email constraint rather than the username one."""
+    constraint = getattr(getattr(exc.__cause__, 'diag', None), 'constraint_name', None)
+    if constraint:
+        return constraint == EMAIL_UNIQUE_INDEX
+    # SQLite doesn't report the constraint, so look up which value is taken
+    return User.objects.filter(email=email).exists()
+
+
 class SignupView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [SignupIPThrottle, SignupAccountThrottle]
 
     def post(self, request, *args, **kwargs):
         username = request.data.get('username')
@@ -30,26 +68,23 @@ class SignupView(APIView):
         if not username or not email or not password:
             return Response({'error': 'Username, email, and password are required.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Check if username already exists
-        if User.objects.filter(username=username).exists():
-            return Response({'error': 'Username already exists.'}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Check if email already exists
-        if User.objects.filter(email=email).exists():
-            return Response({'error': 'Email already exists.'}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Create the user
-        user = User.objects.create_user(username=username, email=email, password=password)
-        user.save()
-
-        # Create the user profile with all fields
-        user_profile = UserProfile.objects.create(
-            user=user,
-            phone_no=phone_no,
-            business_name=business_name,
-            is_verify=True,
-            login_type=login_type
-        )
+        # Hash before opening the transaction; uniqueness is left to the
+        # username and email constraints (migration 0014) instead of pre-checks
+        user = User(username=username, email=User.objects.normalize_email(email), password=make_password(password))
+        try:
+            with transaction.atomic():
+                user.save()
+                UserProfile.objects.create(
+                    user=user,
+                    phone_no=phone_no,
+                    business_name=business_name,
+                    is_verify=True,
+                    login_type=login_type
+                )
+                send_welcome_email.delay(user.id)
+        except IntegrityError as exc:
+            field = 'Email' if email_taken(exc, user.email) else 'Username'
+            return Response({'error': f'{field} already exists.'}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response({
             'message': 'User created successfully.',
@@ -63,127 +98,695 @@ class SignupView(APIView):
 # -----------------------------
 class LoginView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [LoginIPThrottle, LoginAccountThrottle]
 
     def post(self, request, *args, **kwargs):
         email = request.data.get('email')
         password = request.data.get('password')
 
-        try:
-            user = User.objects.get(email=email)
-            if not user.check_password(password):
-                return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
-        except User.DoesNotExist:
-            return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
-
-        if user.check_password(password):
-            refresh = RefreshToken.for_user(user)
-            access_token = str(refresh.access_token)
-
-            return Response({
-                'message': 'Login successful!',
-                'user_id': user.id,
-                'email': user.email,
-                'username': user.username,
-                'refresh': str(refresh),
-                'access': access_token
-            }, status=status.HTTP_200_OK)
-        else:
-            return Response({'error': 'invalid password'}, status=status.HTTP_400_BAD_REQUEST)
-        
+        user = get_login_user(email)
+        # The password hash is the expensive step of login: verify it exactly once
+        status_code, payload = login_result(user, user is not None and user.check_password(password))
+        return Response(payload, status=status_code)
+
 # -----------------------------
 # Product API View
 # -----------------------------
-class ApiProductView(APIView):
+def cached_response(request, cache_key, build):
+    """
+    Serve ``build()``'s ``(etag, payload)`` from the cache under ``cache_key``,
+    answering 304 when the client already has that ETag.
+    """
+    cached = cache.get(cache_key)
+    if cached is None:
+        cached = build()
+        cache.set(cache_key, cached, settings.PRODUCT_LIST_CACHE_TIMEOUT)
+
+    etag, payload = cached
+    response = Response(status=status.HTTP_304_NOT_MODIFIED) if etag_matches(request, etag) else Response(payload)
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def product_page(request, products, fields, cache_key):
+    """
+    ``(etag, payload)`` for one page of ``products``, number or cursor
+    paginated; shared with AsyncProductView. Raises NotFound past the last page.
+    """
+    rows = RowSerializer(ProductSerializer, fields)
+
+    # ?pagination=cursor opts into keyset pagination (no COUNT, flat deep pages)
+    if request.query_params.get('pagination') == 'cursor':
+        paginator = ProductCursorPagination()
+        page = rows.values(products, 'id', 'updated_at')  # cursor positions
+    else:
+        paginator = ProductPageNumberPagination()
+        page = rows.values(products.order_by('id'))
+
+    result_page = paginator.paginate_queryset(page, request)
+    last_change = products.aggregate(last_change=Max('updated_at'))['last_change']
+    return make_etag(cache_key, last_change), paginator.get_paginated_response(rows.many(result_page)).data
+
+
+def product_list_response(request, cache_key, get_products, fields):
+    """A cached page of ``get_products()``, number or cursor paginated."""
+    return cached_response(request, cache_key, lambda: product_page(request, get_products(), fields, cache_key))
+
+
+class ApiProductView(ReplicaReadsMixin, APIView):
+    """
+    The seller's products. The lookups and writes are static methods
+    returning ``(status, payload)`` so AsyncProductView runs the same code.
+    """
     permission_classes = [IsAuthenticated]
 
-    def get(self, request, *args, **kwargs):
-        paginator = PageNumberPagination()
-        paginator.page_size = 10
+    @staticmethod
+    def get_queryset(request, fields=None):
         products = Product.objects.filter(user=request.user)
-        result_page = paginator.paginate_queryset(products, request)
-        serializer = ProductSerializer(result_page, many=True)
-        return paginator.get_paginated_response(serializer.data)
+        if fields is not None:
+            # updated_at feeds the ETag and the ?ordering= cursor
+            products = products.only(*ProductSerializer.only_fields(fields), 'updated_at')
+        return products
+
+    def get(self, request, product_id=None, *args, **kwargs):
+        fields = ProductSerializer.requested_fields(request.query_params)
+        if product_id is not None:
+            return self.get_detail(request, product_id, fields)
+
+        # Pages are cached per seller and URL until one of their products changes
+        cache_key = product_list_key(request.user.id, request.build_absolute_uri())
+        return product_list_response(request, cache_key, lambda: self.get_queryset(request, fields), fields)
+
+    @staticmethod
+    def detail_etag(request, product):
+        return make_etag(request.get_full_path(), product.updated_at)
+
+    def get_detail(self, request, product_id, fields):
+        product = self.get_queryset(request, fields).filter(id=product_id).first()
+        if product is None:
+            return Response({'error': 'Product not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+        etag = self.detail_etag(request, product)
+        if etag_matches(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(ProductSerializer(product, fields=fields).data)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
 
+    @idempotent
     def post(self, request, *args, **kwargs):
-        product_data = request.data.copy()
-        product_data['user'] = request.user.id
+        status_code, payload = self.create(request.user, request.data)
+        return Response(payload, status=status_code)
+
+    @staticmethod
+    def create(user, data):
+        product_data = data.copy()
+        product_data['user'] = user.id
 
-        if Product.objects.filter(user=request.user, product_name=product_data['product_name']).exists():
-            return Response({'error': 'You already have a product with this name.'}, status=status.HTTP_400_BAD_REQUEST)
+        if Product.objects.filter(user=user, product_name=product_data.get('product_name')).exists():
+            return status.HTTP_400_BAD_REQUEST, {'error': 'You already have a product with this name.'}
 
         serializer = ProductSerializer(data=product_data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response({'message': 'Product created successfully!',
-                             'product': serializer.data}, status=status.HTTP_201_CREATED)
-        else:
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        if not serializer.is_valid():
+            return status.HTTP_400_BAD_REQUEST, serializer.errors
+        serializer.save()
+        return status.HTTP_201_CREATED, {'message': 'Product created successfully!', 'product': serializer.data}
+
+    @staticmethod
+    def get_own_product(user, product_id, action):
+        """
+        ``(product, None)`` for the seller's product with the ?id= value
+        ``product_id``, or ``(None, (status, payload))`` when there isn't one.
+        """
+        if not product_id:
+            return None, (status.HTTP_400_BAD_REQUEST, {'error': 'Product ID is required'})
+        try:
+            return Product.objects.get(id=int(product_id), user=user), None
+        except ValueError:
+            return None, (status.HTTP_400_BAD_REQUEST, {'error': 'Invalid Product ID'})
+        except Product.DoesNotExist:
+            return None, (status.HTTP_404_NOT_FOUND,
+                          {'error': f'Product not found or you do not have permission to {action} it.'})
+
+    @staticmethod
+    def update(product, data):
+        serializer = ProductSerializer(product, data=data, partial=True)  # Use partial=True for partial updates
+        if not serializer.is_valid():
+            return status.HTTP_400_BAD_REQUEST, serializer.errors
+        serializer.save()
+        return status.HTTP_200_OK, {'message': 'Product updated successfully!', 'product': serializer.data}
+
+    @staticmethod
+    def remove(product):
+        product.delete()
+        return status.HTTP_200_OK, {'message': 'Product deleted successfully!'}
 
     def put(self, request, *args, **kwargs):
-        # Get the product ID from the query parameters
-        product_id = request.query_params.get('id')
-        if not product_id:
-            return Response({'error': 'Product ID is required'}, status=status.HTTP_400_BAD_REQUEST)
+        product, error = self.get_own_product(request.user, request.query_params.get('id'), 'edit')
+        status_code, payload = error or self.update(product, request.data)
+        return Response(payload, status=status_code)
 
-        try:
-            # Convert product_id to an integer
-            product_id = int(product_id)
+    def delete(self, request, *args, **kwargs):
+        product, error = self.get_own_product(request.user, request.query_params.get('id'), 'delete')
+        status_code, payload = error or self.remove(product)
+        return Response(payload, status=status_code)
+
+# -----------------------------
+# Product search views
+# -----------------------------
+class ApiProductSearchView(APIView):
+    """Ranked full-text search over the seller's product names and descriptions: ?q=&limit="""
+    permission_classes = [IsAuthenticated]
+
+    DEFAULT_LIMIT = 20
+    MAX_LIMIT = 100
 
-            # Ensure the product exists and belongs to the authenticated user
-            product = Product.objects.get(id=product_id, user=request.user)
+    def get_search_params(self, request):
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            raise ValidationError({'q': 'This parameter is required.'})
+        try:
+            limit = int(request.query_params.get('limit', self.DEFAULT_LIMIT))
         except ValueError:
-            return Response({'error': 'Invalid Product ID'}, status=status.HTTP_400_BAD_REQUEST)
-        except Product.DoesNotExist:
-            return Response({'error': 'Product not found or you do not have permission to edit it.'}, status=status.HTTP_404_NOT_FOUND)
-
-        # Update the product with the provided data
-        serializer = ProductSerializer(product, data=request.data, partial=True)  # Use partial=True for partial updates
-        if serializer.is_valid():
-            serializer.save()
-            return Response({'message': 'Product updated successfully!',
-                             'product': serializer.data}, status=status.HTTP_200_OK)
-        else:
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            raise ValidationError({'limit': 'A valid integer is required.'})
+        return text, max(1, min(limit, self.MAX_LIMIT))
+
+    def get(self, request, *args, **kwargs):
+        text, limit = self.get_search_params(request)
+        products = search_products(request.user.id, text, limit)
+        return Response({'results': ProductSerializer(products, many=True).data}, status=status.HTTP_200_OK)
+
+
+class ApiProductTypeaheadView(ApiProductSearchView):
+    """Prefix matches on SKU or product name, for search-as-you-type: ?q=&limit="""
+    DEFAULT_LIMIT = 10
+
+    def get(self, request, *args, **kwargs):
+        text, limit = self.get_search_params(request)
+        return Response({'results': typeahead(request.user.id, text, limit)}, status=status.HTTP_200_OK)
+
+# -----------------------------
+# Bulk Product API View
+# -----------------------------
+class ApiProductBulkView(APIView):
+    """
+    Batch upsert/delete of the user's products keyed by SKU.
+
+    The whole batch is validated in one pass, checked against the database
+    with one set-based query and written in a single transaction; nothing is
+    written unless every row is valid.
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser, NDJSONParser]
+
+    MAX_ROWS = 10000
+    BATCH_SIZE = 1000
+    UPSERT_FIELDS = ['product_name', 'category', 'unit_price', 'quantity', 'reorder_level', 'description',
+                     'updated_at']
+
+    def get_rows(self, request, key):
+        rows = request.data.get(key) if isinstance(request.data, dict) else request.data
+        if not isinstance(rows, list) or not rows:
+            return None, Response({'error': 'Expected a non-empty list.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > self.MAX_ROWS:
+            return None, Response({'error': f'At most {self.MAX_ROWS} rows per request.'},
+                                  status=status.HTTP_400_BAD_REQUEST)
+        return rows, None
+
+    def post(self, request, *args, **kwargs):
+        rows, error = self.get_rows(request, 'products')
+        if error:
+            return error
+
+        serializer = ProductBulkSerializer(data=rows, many=True)
+        if not serializer.is_valid():
+            return Response({'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        items = serializer.validated_data
+
+        skus = [item['sku'] for item in items]
+        names = [item['product_name'] for item in items]
+        known_categories = set(Category.objects.filter(id__in={item['category_id'] for item in items})
+                               .values_list('id', flat=True))
+        existing_by_sku = {}
+        sku_by_name = {}
+        for product_id, sku, user_id, name in (
+                Product.objects.filter(Q(sku__in=skus) | Q(user=request.user, product_name__in=names))
+                .values_list('id', 'sku', 'user_id', 'product_name')):
+            existing_by_sku[sku] = (product_id, user_id)
+            if user_id == request.user.id:
+                sku_by_name[name] = sku
+
+        errors = [{} for _ in items]
+        batch_skus, batch_names = set(), set()
+        for row_errors, item in zip(errors, items):
+            sku, name = item['sku'], item['product_name']
+            if sku in batch_skus:
+                row_errors['sku'] = ['Duplicate SKU in this batch.']
+            elif sku in existing_by_sku and existing_by_sku[sku][1] != request.user.id:
+                row_errors['sku'] = ['product with this sku already exists.']
+            if name in batch_names:
+                row_errors['product_name'] = ['Duplicate product name in this batch.']
+            elif sku_by_name.get(name, sku) != sku:
+                row_errors['product_name'] = ['You already have a product with this name.']
+            if item['category_id'] not in known_categories:
+                row_errors['category'] = [f'Invalid pk "{item["category_id"]}" - object does not exist.']
+            batch_skus.add(sku)
+            batch_names.add(name)
+        if any(errors):
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        now = timezone.now()
+        with transaction.atomic():
+            products = Product.objects.bulk_create(
+                [Product(user=request.user, date_added=now, **item) for item in items],
+                batch_size=self.BATCH_SIZE,
+                update_conflicts=True,
+                unique_fields=['sku'],
+                update_fields=self.UPSERT_FIELDS,
+            )
+            # A SKU claimed by another seller after the check above must not be overwritten
+            if Product.objects.filter(sku__in=skus).exclude(user=request.user).exists():
+                transaction.set_rollback(True)
+                return Response({'error': 'Some SKUs were taken by another seller, please retry.'},
+                                status=status.HTTP_409_CONFLICT)
+
+        invalidate_product_list(request.user.id)
+        results = [{
+            'sku': product.sku,
+            'id': product.pk or existing_by_sku[product.sku][0],
+            'status': 'updated' if product.sku in existing_by_sku else 'created',
+        } for product in products]
+        return Response({'message': 'Products saved successfully!', 'results': results}, status=status.HTTP_200_OK)
 
     def delete(self, request, *args, **kwargs):
-        product_id = request.query_params.get('id')  # Get the product ID from the query parameters
-        if not product_id:
-            return Response({'error': 'Product ID is required'}, status=status.HTTP_400_BAD_REQUEST)
+        skus, error = self.get_rows(request, 'skus')
+        if error:
+            return error
+
+        found = dict(Product.objects.filter(user=request.user, sku__in=skus).values_list('sku', 'id'))
+        with transaction.atomic():
+            Tombstone.record_products(request.user.id, list(found.values()))
+            Product.objects.filter(id__in=found.values()).delete()
+        invalidate_product_list(request.user.id)
+        results = [{'sku': sku, 'status': 'deleted' if sku in found else 'not_found'} for sku in skus]
+        return Response({'message': 'Products deleted successfully!', 'results': results}, status=status.HTTP_200_OK)
+
+# -----------------------------
+# Inventory views
+# -----------------------------
+class ApiLowStockView(ReplicaReadsMixin, APIView):
+    """All of the seller's products at or below their reorder level, lowest stock first."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        fields = ProductSerializer.requested_fields(request.query_params)
+        cache_key = product_list_key(request.user.id, request.build_absolute_uri())
+
+        def build():
+            rows = RowSerializer(ProductSerializer, fields)
+            products = low_stock(ApiProductView.get_queryset(request, fields)).order_by('quantity', 'id')
+            return make_etag(cache_key), rows.many(rows.values(products))
+
+        return cached_response(request, cache_key, build)
+
+
+class ApiStockHistoryView(ReplicaReadsMixin, APIView):
+    """Daily stock levels of one product from inventory snapshots: ?days= (default 30)."""
+    permission_classes = [IsAuthenticated]
+    MAX_DAYS = 366
 
+    def get(self, request, product_id, *args, **kwargs):
         try:
-            product = Product.objects.get(id=product_id, user=request.user)  # Ensure the product belongs to the user
-        except Product.DoesNotExist:
-            return Response({'error': 'Product not found or you do not have permission to delete it.'}, status=status.HTTP_404_NOT_FOUND)
+            days = min(max(int(request.query_params.get('days', 30)), 1), self.MAX_DAYS)
+        except ValueError:
+            return Response({'error': 'days must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        product = Product.objects.filter(id=product_id, user=request.user).only('quantity', 'reorder_level').first()
+        if product is None:
+            return Response({'error': 'Product not found.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            'product': product.id,
+            'quantity': product.quantity,
+            'reorder_level': product.reorder_level,
+            'history': stock_history(product, days),
+        })
+
+
+# -----------------------------
+# Category views
+# -----------------------------
+class ApiCategoryView(ReplicaReadsMixin, APIView):
+    """
+    The category tree, parents before children, with the seller's product
+    count and stock in each category, directly and including subcategories.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        # Cached until the seller's products or any category change
+        cache_key = category_list_key(request.user.id, request.build_absolute_uri())
+        return cached_response(request, cache_key, lambda: (make_etag(cache_key), self.tree(request.user.id)))
+
+    @staticmethod
+    def tree(user_id):
+        totals = {row['category_id']: row for row in Product.objects.filter(user_id=user_id)
+                  .values('category_id').annotate(product_count=Count('id'), stock=Sum('quantity')).order_by()}
+
+        rows = {}
+        for category in Category.objects.order_by('path'):
+            total = totals.get(category.id, {})
+            count, stock = total.get('product_count', 0), total.get('stock') or 0
+            rows[category.path] = {
+                'id': category.id, 'name': category.name, 'slug': category.slug, 'parent': category.parent_id,
+                'depth': category.depth, 'product_count': count, 'stock': stock,
+                'total_product_count': count, 'total_stock': stock,
+            }
+
+        # Roll every category's own counts up into each of its ancestors
+        for path, row in rows.items():
+            slugs = path.split('/')[:-1]
+            for depth in range(1, len(slugs)):
+                ancestor = rows['/'.join(slugs[:depth]) + '/']
+                ancestor['total_product_count'] += row['product_count']
+                ancestor['total_stock'] += row['stock']
+        return list(rows.values())
+
+
+class ApiCategoryProductsView(ReplicaReadsMixin, APIView):
+    """The seller's products in one category; ?subtree=true includes its subcategories."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, slug, *args, **kwargs):
+        category = Category.objects.filter(slug=slug).values('id', 'path').first()
+        if category is None:
+            return Response({'error': 'Category not found.'}, status=status.HTTP_404_NOT_FOUND)
+        fields = ProductSerializer.requested_fields(request.query_params)
+        subtree = request.query_params.get('subtree') in ('1', 'true')
+
+        def get_products():
+            products = ApiProductView.get_queryset(request, fields)
+            if subtree:
+                return products.filter(category__in=Category.objects.filter(
+                    Category.subtree_filter(category['path'])).values('id'))
+            return products.filter(category_id=category['id'])
+
+        # Keyed on the category version too, since moving a category changes its subtree
+        cache_key = category_list_key(request.user.id, request.build_absolute_uri())
+        return product_list_response(request, cache_key, get_products, fields)
 
-        product.delete()
-        return Response({'message': 'Product deleted successfully!'}, status=status.HTTP_200_OK)
 
 # -----------------------------
 # transaction views
 # -----------------------------
-class ApiTransactionView(APIView):
+class ApiTransactionView(ReplicaReadsMixin, APIView):
+    """
+    The seller's transactions. AsyncTransactionView shares the listing
+    helpers and ``create``.
+    """
     permission_classes = [IsAuthenticated]  # Ensure only authenticated users can access
 
-    def get(self, request, *args, **kwargs):
-        # Debug: Print the authenticated user
-        print(f"Authenticated user: {request.user}")
+    # Rows fetched per round trip when streaming an export
+    STREAM_CHUNK_SIZE = 2000
+
+    def get_queryset(self, fields=None):
+        transactions = Transaction.objects.filter(user=self.request.user)
+        if fields is None or 'product' in fields:
+            # Join the product in the same query; TransactionSerializer renders it by name
+            transactions = transactions.select_related('product')
+        # transaction_date is the cursor position
+        return transactions.only(*TransactionSerializer.only_fields(fields), 'transaction_date')
+
+    def list_rows(self, params):
+        """
+        The RowSerializer for ?fields= and the transactions matching the
+        filters in ``params``. Invalid values raise ValidationError.
+        """
+        fields = TransactionSerializer.requested_fields(params)
+        # Reads skip model instances: values() rows rendered by precomputed converters
+        return RowSerializer(TransactionSerializer, fields), filter_transactions(self.get_queryset(fields), params)
+
+    @staticmethod
+    def stream_rows(rows, transactions):
+        """The values() rows streamed by ?stream=ndjson, newest first."""
+        return rows.values(transactions.order_by('-transaction_date', '-id'))
+
+    @staticmethod
+    def ndjson_line(rows, row):
+        return dumps(rows.to_representation(row), DjangoJSONEncoder) + b'\n'
+
+    def cursor_page(self, request, rows, transactions):
+        paginator = TransactionCursorPagination()
+        result_page = paginator.paginate_queryset(rows.values(transactions, 'transaction_date', 'id'), request,
+                                                  view=self)
+        return paginator.get_paginated_response(rows.many(result_page)).data
+
+    @staticmethod
+    def list_payload(data):
+        # Empty result, no extra EXISTS query
+        return data or {'message': 'No data'}
 
+    def get(self, request, *args, **kwargs):
         # Fetch transactions for the authenticated user
-        transactions = Transaction.objects.filter(user=request.user)
-        print(f"Transactions: {transactions}")  # Debug: Print the transactions queryset
+        rows, transactions = self.list_rows(request.query_params)
+
+        # ?stream=ndjson streams one JSON object per line in constant memory
+        if request.query_params.get('stream') == 'ndjson':
+            values = self.stream_rows(rows, transactions).iterator(chunk_size=self.STREAM_CHUNK_SIZE)
+            return StreamingHttpResponse(use_read_alias(self.ndjson_line(rows, row) for row in values),
+                                         content_type='application/x-ndjson')
 
-        if not transactions.exists():  # Check if the queryset is empty
-            return Response({'message': 'No data'}, status=status.HTTP_200_OK)
+        if request.query_params.get('pagination') == 'cursor':
+            return Response(self.cursor_page(request, rows, transactions))
 
-        serializer = TransactionSerializer(transactions, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response(self.list_payload(rows.many(rows.values(transactions))), status=status.HTTP_200_OK)
 
+    @idempotent
     def post(self, request, *args, **kwargs):
-        transaction_data = request.data.copy()
-        transaction_data['user'] = request.user.id  # Automatically set the user
-
-        serializer = TransactionSerializer(data=transaction_data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        status_code, payload = self.create(request, request.data)
+        return Response(payload, status=status_code)
+
+    @staticmethod
+    def create(request, data):
+        serializer = TransactionSerializer(data=data, context={'request': request})
+        if not serializer.is_valid():
+            return status.HTTP_400_BAD_REQUEST, serializer.errors
+        try:
+            serializer.save(user=request.user)
+        except OutOfStock as exc:
+            return status.HTTP_409_CONFLICT, {'error': exc.detail}
+        return status.HTTP_201_CREATED, serializer.data
+
+# -----------------------------
+# Delta sync view
+# -----------------------------
+class ApiSyncView(APIView):
+    """
+    Products, transactions and deletions changed since ?since=<token> (all of
+    them without one). Call again with the returned ``next`` token, right
+    away while ``has_more`` is true.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            limit = min(int(request.query_params.get('limit', settings.SYNC_PAGE_SIZE)), settings.SYNC_PAGE_SIZE)
+        except ValueError:
+            return Response({'error': 'limit must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            data = changes(request.user.id, request.query_params.get('since'), max(limit, 1))
+        except ExpiredSyncToken as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_410_GONE)
+        except InvalidSyncToken as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data)
+
+
+# -----------------------------
+# Sales analytics view
+# -----------------------------
+class ApiSalesAnalyticsView(ReplicaReadsMixin, APIView):
+    """
+    Revenue over time, top products and status / payment method breakdowns,
+    read from the DailySales rollup instead of raw transactions.
+    """
+    permission_classes = [IsAuthenticated]
+
+    PERIODS = {'day': None, 'week': TruncWeek, 'month': TruncMonth}
+    MAX_TOP_PRODUCTS = 50
+
+    def get(self, request, *args, **kwargs):
+        period = request.query_params.get('period', 'day')
+        if period not in self.PERIODS:
+            return Response({'error': f'period must be one of: {", ".join(self.PERIODS)}.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            top = int(request.query_params.get('top', 10))
+        except ValueError:
+            top = -1
+        if top < 0:
+            return Response({'error': 'top must be a non-negative integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        top = min(top, self.MAX_TOP_PRODUCTS)
+
+        rollups = filter_daily_sales(DailySales.objects.filter(user=request.user), request.query_params)
+        # Revenue and units only count completed sales
+        completed = rollups.filter(status='completed')
+        totals = {'revenue': Sum('revenue'), 'units': Sum('units'), 'transactions': Sum('transactions')}
+
+        trunc = self.PERIODS[period]
+        bucket = trunc('day') if trunc else F('day')
+        revenue = (completed.annotate(period=bucket).values('period')
+                   .annotate(**totals).order_by('period'))
+        top_products = (completed.values('product_id', product_name=F('product__product_name'))
+                        .annotate(**totals).order_by('-revenue')[:top])
+        by_status = rollups.values('status').annotate(count=Sum('transactions')).order_by()
+        by_payment_method = rollups.values('payment_method').annotate(count=Sum('transactions')).order_by()
+
+        return Response({
+            'period': period,
+            'revenue': [self.format_totals(row) for row in revenue],
+            'top_products': [self.format_totals(row) for row in top_products],
+            'by_status': {row['status']: row['count'] for row in by_status if row['count']},
+            'by_payment_method': {row['payment_method']: row['count'] for row in by_payment_method if row['count']},
+        }, status=status.HTTP_200_OK)
+
+    @staticmethod
+    def format_totals(row):
+        # Render money the way the model serializers do: as a 2-decimal string
+        row['revenue'] = f"{row['revenue']:.2f}"
+        return row
+
+# -----------------------------
+# Export views
+# -----------------------------
+class ApiTransactionExportView(ReplicaReadsMixin, APIView):
+    """All matching transactions as CSV or NDJSON, streamed from a server-side cursor."""
+    permission_classes = [IsAuthenticated]
+
+    COLUMNS = {
+        'id': 'id',
+        'transaction_date': 'transaction_date',
+        'customer': 'customer',
+        'email': 'email',
+        'product': 'product__product_name',
+        'quantity': 'quantity',
+        'total_price': 'total_price',
+        'status': 'status',
+        'payment_method': 'payment_method',
+    }
+    ORDERING = ('-transaction_date', '-id')
+    FILENAME = 'transactions'
+
+    def get_queryset(self, request):
+        return filter_transactions(Transaction.objects.filter(user=request.user), request.query_params)
+
+    def get(self, request, kind, *args, **kwargs):
+        if kind not in STREAMERS:
+            return Response({'error': f'Export type must be one of: {", ".join(STREAMERS)}.'},
+                            status=status.HTTP_404_NOT_FOUND)
+        stream, content_type = STREAMERS[kind]
+        rows = (self.get_queryset(request).order_by(*self.ORDERING)
+                .values_list(*self.COLUMNS.values()).iterator(chunk_size=EXPORT_CHUNK_SIZE))
+        response = StreamingHttpResponse(use_read_alias(stream(list(self.COLUMNS), rows)), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{self.FILENAME}.{kind}"'
+        return response
+
+
+class ApiProductExportView(ApiTransactionExportView):
+    """The seller's catalog as CSV or NDJSON."""
+
+    COLUMNS = {
+        'id': 'id',
+        'sku': 'sku',
+        'product_name': 'product_name',
+        'category': 'category__name',
+        'unit_price': 'unit_price',
+        'quantity': 'quantity',
+        'reorder_level': 'reorder_level',
+        'description': 'description',
+        'updated_at': 'updated_at',
+    }
+    ORDERING = ('id',)
+    FILENAME = 'products'
+
+    def get_queryset(self, request):
+        return Product.objects.filter(user=request.user)
+
+
+class PdfExportView(APIView):
+    """
+    Base for PDF documents. The first request schedules the render and gets a
+    202 with Retry-After; once the file is on disk it is served directly.
+    """
+    permission_classes = [IsAuthenticated]
+
+    RETRY_AFTER = 2
+
+    def pdf_response(self, path, build_html, filename):
+        state = request_pdf(path, build_html)
+        if state == 'ready':
+            return FileResponse(open(path, 'rb'), as_attachment=True, filename=filename,
+                                content_type='application/pdf')
+        if state == 'failed':
+            return Response({'error': 'Could not render the document, try again.'},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        response = Response({'status': 'rendering'}, status=status.HTTP_202_ACCEPTED)
+        response['Retry-After'] = str(self.RETRY_AFTER)
+        return response
+
+
+def seller_details(user):
+    """The seller fields printed on statements and invoices, for their data versions."""
+    return list(User.objects.filter(id=user.id).values_list('username', 'email', 'profile__business_name'))
+
+
+class ApiStatementView(PdfExportView):
+    """Monthly statement of the seller's transactions."""
+
+    def get(self, request, year, month, *args, **kwargs):
+        try:
+            start = timezone.make_aware(datetime(year, month, 1))
+        except ValueError:
+            return Response({'error': 'Invalid month.'}, status=status.HTTP_400_BAD_REQUEST)
+        end = timezone.make_aware(datetime(year + month // 12, month % 12 + 1, 1))
+
+        sales = Transaction.objects.filter(user=request.user, transaction_date__gte=start, transaction_date__lt=end)
+        # Adding or editing a sale, or renaming its product, moves the latest updated_at; removing one the count
+        changes = sales.aggregate(count=Count('id'), sales=Max('updated_at'), products=Max('product__updated_at'))
+        version = data_version([changes, seller_details(request.user)])
+
+        def build_html():
+            transactions = (sales.order_by('transaction_date', 'id')
+                            .values('id', 'transaction_date', 'customer', 'product__product_name', 'quantity',
+                                    'status', 'payment_method', 'total_price'))
+            totals = (DailySales.objects.filter(user=request.user, day__gte=start.date(), day__lt=end.date(),
+                                                status='completed')
+                      .aggregate(units=Sum('units'), revenue=Sum('revenue')))
+            return render_to_string('api/statement.html', {
+                'seller': request.user, 'period': start, 'transactions': transactions, 'totals': totals,
+            })
+
+        name = f'statement-{year}-{month:02d}'
+        return self.pdf_response(export_path(request.user.id, f'{name}-{version}.pdf'), build_html, f'{name}.pdf')
+
+
+class ApiInvoiceView(PdfExportView):
+    """Invoice for a single transaction."""
+
+    def get(self, request, transaction_id, *args, **kwargs):
+        sale = (Transaction.objects.filter(user=request.user, id=transaction_id)
+                .select_related('product').first())
+        if sale is None:
+            return Response({'error': 'Transaction not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+        version = data_version([(
+            sale.customer, sale.email, sale.quantity, sale.total_price, sale.status, sale.payment_method,
+            sale.product.sku, sale.product.product_name, sale.product.unit_price,
+        ), *seller_details(request.user)])
+
+        def build_html():
+            return render_to_string('api/invoice.html', {'seller': request.user, 'sale': sale})
+
+        name = f'invoice-{sale.id}'
+        return self.pdf_response(export_path(request.user.id, f'{name}-{version}.pdf'), build_html, f'{name}.pdf')
@@ -13,4 +13,11 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
+# Serving profile: ASGI deployments use the async API views unless told otherwise, e.g.
+#   uvicorn backend.asgi:application --workers 1
+os.environ.setdefault('ASYNC_VIEWS', 'true')
+# Every request's sync code runs on a fresh thread under ASGI, so a persistent
+# connection would never be reused: close them per request (or set DB_POOL)
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
+
 application = get_asgi_application()
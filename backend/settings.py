@@ -2,6 +2,7 @@
 Django settings for backend project.
 """
 
+import copy
 from pathlib import Path
 from datetime import timedelta
 from dotenv import load_dotenv
@@ -33,13 +34,28 @@ CSRF_TRUSTED_ORIGINS = [
 ]
 
 
+# Trust the access token's user id instead of loading the user on every
+# request (api/authentication.py); set JWT_STATELESS=false to check the DB.
+JWT_STATELESS = os.getenv('JWT_STATELESS', 'True').lower() == 'true'
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
+        "api.authentication.StatelessJWTAuthentication" if JWT_STATELESS else
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    # Reverse proxies in front of the app; the client address for the per-IP
+    # throttles is the X-Forwarded-For entry the outermost one appended. Render
+    # runs one, and without it every client would share the proxy's REMOTE_ADDR
+    # and so one throttle bucket. Set 0 when clients connect directly, since
+    # they can put anything in X-Forwarded-For.
+    "NUM_PROXIES": int(os.getenv('THROTTLE_NUM_PROXIES', '1')),
 }
 
 SIMPLE_JWT = {
@@ -47,6 +63,25 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
 }
 
+# Serve the API with the async views in api/async_views.py (for ASGI deployments)
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'False').lower() == 'true'
+
+# Threads used to verify password hashes off the event loop under ASGI
+LOGIN_HASH_WORKERS = int(os.getenv('LOGIN_HASH_WORKERS', os.cpu_count() or 4))
+
+# Sliding-window throttling of login and signup (api/throttling.py), checked
+# before any password hashing. Rates are "<attempts>/<period>" (s, min, hour,
+# day). *_ip is per client address, *_account per email submitted. Counts need
+# atomic incr: use a locmem or redis THROTTLE_CACHE, not the file backend.
+THROTTLE_ENABLED = os.getenv('THROTTLE_ENABLED', 'True').lower() == 'true'
+THROTTLE_CACHE = os.getenv('THROTTLE_CACHE', 'default')
+THROTTLE_RATES = {
+    'login_ip': os.getenv('THROTTLE_LOGIN_IP', '30/min'),
+    'login_account': os.getenv('THROTTLE_LOGIN_ACCOUNT', '10/min'),
+    'signup_ip': os.getenv('THROTTLE_SIGNUP_IP', '20/hour'),
+    'signup_account': os.getenv('THROTTLE_SIGNUP_ACCOUNT', '5/hour'),
+}
+
 
 # Application definition
 
@@ -66,12 +101,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     "corsheaders.middleware.CorsMiddleware",
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.routers.ReadYourWritesMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -107,6 +144,12 @@ DATABASES = {
         'PASSWORD': os.getenv('DB_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', 'localhost'),
         'PORT': os.getenv('DB_PORT', '5432'),
+        # Reuse connections across requests instead of paying the TLS + SCRAM handshake every time.
+        # Not under ASGI: each request's sync code runs on a new thread, so persistent connections
+        # are never reused and pile up until max_connections. There (and with ASYNC_VIEWS) the
+        # default is 0 -- backend/asgi.py sets it -- and DB_POOL is the way to reuse connections.
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '0' if ASYNC_VIEWS else '60')),
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'True').lower() == 'true',
         'OPTIONS': {
             'sslmode': 'require',
             'channel_binding': 'require',
@@ -114,6 +157,71 @@ DATABASES = {
     }
 }
 
+# Optional psycopg 3 connection pool. requirements.txt installs psycopg2-binary,
+# which Django refuses to pool with (ImproperlyConfigured), so a deploy setting
+# DB_POOL=true must also `pip install "psycopg[binary,pool]"`; Django then
+# prefers psycopg 3. A pool replaces persistent connections, so CONN_MAX_AGE must be 0.
+if os.getenv('DB_POOL', 'False').lower() == 'true':
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+        'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+        'timeout': int(os.getenv('DB_POOL_TIMEOUT', '10')),
+    }
+
+# Optional read replica (api/routers.py): set DB_REPLICA_HOST, or DB_REPLICA_NAME
+# for a second local database; the other DB_REPLICA_* settings default to the
+# primary's. Only GETs of views using ReplicaReadsMixin read from it, and users
+# stick to the primary for READ_YOUR_WRITES_SECONDS after a write of theirs,
+# which should exceed the replication lag. The pin is kept in the default cache,
+# so use the redis backend when several server processes share a replica.
+# REPLICA_READS=false sends every read back to the primary, e.g. while the
+# replica is far behind.
+_replica = {key: os.getenv(f'DB_REPLICA_{key}') for key in ('NAME', 'USER', 'PASSWORD', 'HOST', 'PORT')}
+if _replica['HOST'] or _replica['NAME']:
+    # Deep copy: the aliases mustn't share OPTIONS (e.g. the pool settings above) or TEST
+    DATABASES['replica'] = copy.deepcopy(DATABASES['default'])
+    DATABASES['replica'].update({key: value for key, value in _replica.items() if value})
+REPLICA_READS = os.getenv('REPLICA_READS', 'True').lower() == 'true'
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default'] if REPLICA_READS else []
+DATABASE_ROUTERS = ['api.routers.ReplicaRouter']
+READ_YOUR_WRITES_SECONDS = int(os.getenv('READ_YOUR_WRITES_SECONDS', '5'))
+
+
+# Cache (API response caching). CACHE_BACKEND is 'locmem' (default, per process,
+# LRU-culled), 'file' or 'redis'; CACHE_LOCATION is the directory or redis URL.
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+CACHES = {
+    'default': {
+        'locmem': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'silkhair',
+            'OPTIONS': {'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', '10000'))},
+        },
+        'file': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_LOCATION', str(BASE_DIR / '.cache')),
+        },
+        'redis': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('CACHE_LOCATION', 'redis://127.0.0.1:6379'),
+        },
+    }[CACHE_BACKEND],
+}
+
+# Seconds a cached product listing page is kept (writes invalidate it earlier)
+PRODUCT_LIST_CACHE_TIMEOUT = int(os.getenv('PRODUCT_LIST_CACHE_TIMEOUT', '300'))
+
+# Delta sync (api/sync.py): rows per stream per response, how far behind the
+# clock a caught-up client's token is held so late commits aren't missed, and
+# how long deletions are kept (older tokens must resync from scratch)
+SYNC_PAGE_SIZE = int(os.getenv('SYNC_PAGE_SIZE', '500'))
+SYNC_OVERLAP_SECONDS = int(os.getenv('SYNC_OVERLAP_SECONDS', '30'))
+SYNC_TOMBSTONE_DAYS = int(os.getenv('SYNC_TOMBSTONE_DAYS', '90'))
+
+# Seconds a POST's Idempotency-Key and stored response are replayed to retries
+IDEMPOTENCY_KEY_TTL = int(os.getenv('IDEMPOTENCY_KEY_TTL', str(24 * 3600)))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -162,9 +270,46 @@ EMAIL_PORT = 587
 EMAIL_USE_TLS = True
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', '')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
+DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', EMAIL_HOST_USER or 'webmaster@localhost')
 
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/6.0/ref/settings/#default-auto-field
 
-DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
\ No newline at end of file
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Request metrics (api/metrics.py). Percentiles are computed over the last
+# METRICS_WINDOW requests per route. /metrics requires METRICS_TOKEN as a bearer
+# token; when it is unset, only clients on the loopback interface can scrape.
+METRICS_WINDOW = int(os.getenv('METRICS_WINDOW', '1024'))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+# Log requests slower than this (ms) with their SQL; 0 disables the slow log
+SLOW_REQUEST_MS = int(os.getenv('SLOW_REQUEST_MS', '0'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'api.log.JSONFormatter'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'json'},
+    },
+    'loggers': {
+        # LOG_LEVEL=DEBUG also logs every request with its metrics
+        'api': {'handlers': ['console'], 'level': os.getenv('LOG_LEVEL', 'INFO'), 'propagate': False},
+    },
+}
+
+
+# Exports: rendered PDF statements / invoices are kept under EXPORT_DIR and
+# rendered by a pool of EXPORT_PDF_WORKERS processes.
+EXPORT_DIR = Path(os.getenv('EXPORT_DIR', str(BASE_DIR / 'exports')))
+EXPORT_PDF_WORKERS = int(os.getenv('EXPORT_PDF_WORKERS', '2'))
+
+# Background tasks (api/jobs.py, manage.py run_worker)
+TASK_WORKERS = int(os.getenv('TASK_WORKERS', '4'))
+TASK_POLL_INTERVAL = float(os.getenv('TASK_POLL_INTERVAL', '1'))
+# A job locked for longer than this is assumed to belong to a dead worker and is requeued
+TASK_LOCK_TIMEOUT = int(os.getenv('TASK_LOCK_TIMEOUT', '600'))